@@ -1,23 +1,138 @@
 import os
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions as pg_ext
+
+# --- Connection Pool Config ---
+# The pools live at module level so they survive between warm invocations of
+# the same Lambda container. Each container only ever runs one invocation at a
+# time, so a small cap keeps bursts of concurrent containers from draining the
+# server's max_connections.
+POOL_MAX_CONN = int(os.environ.get("DB_POOL_MAX_CONN", 2))
+# Idle connections kept open between invocations (psycopg2 closes any beyond this).
+POOL_MIN_CONN = min(int(os.environ.get("DB_POOL_MIN_CONN", 1)), POOL_MAX_CONN)
+# Connections that have sat idle longer than this are pinged before reuse.
+POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", 30))
+
+_pools = {}
+_last_used = {}
+
+
+def _connection_kwargs():
+    """Reads the default connection details from the Lambda's environment variables."""
+    try:
+        return {
+            "host": os.environ['DB_ENDPOINT'],
+            "user": os.environ['DB_USERNAME'],
+            "password": os.environ['DB_PASSWORD'],
+            "dbname": os.environ['DB_NAME'],
+            "port": os.environ.get('DB_PORT', 5432),
+        }
+    except KeyError as e:
+        print(f"ERROR: Missing required environment variable: {e}")
+        raise
+
 
 def get_db_connection():
     """
     Establishes and returns a connection to the PostgreSQL database.
     Reads connection details from the Lambda function's environment variables.
+    Prefer db_connection() in handlers, which reuses pooled connections.
     """
     try:
-        conn = psycopg2.connect(
-            host=os.environ['DB_ENDPOINT'],
-            user=os.environ['DB_USERNAME'],
-            password=os.environ['DB_PASSWORD'],
-            dbname=os.environ['DB_NAME'],
-            port=os.environ.get('DB_PORT', 5432)
-        )
+        conn = psycopg2.connect(**_connection_kwargs())
         return conn
-    except KeyError as e:
-        print(f"ERROR: Missing required environment variable: {e}")
+    except KeyError:
         raise
     except Exception as e:
         print(f"ERROR: Could not connect to PostgreSQL instance. {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+def _get_pool(connect_kwargs):
+    """Returns the pool for a set of connection settings, creating it on first use."""
+    key = tuple(sorted((k, str(v)) for k, v in connect_kwargs.items()))
+    pool = _pools.get(key)
+    if pool is None or pool.closed:
+        try:
+            pool = pg_pool.ThreadedConnectionPool(POOL_MIN_CONN, POOL_MAX_CONN, **connect_kwargs)
+        except Exception as e:
+            print(f"ERROR: Could not connect to PostgreSQL instance. {e}")
+            raise
+        _pools[key] = pool
+    return pool
+
+
+def _is_healthy(conn):
+    """Cheap liveness check. Only pings the server if the connection has been idle a while."""
+    if conn.closed:
+        return False
+    last_used = _last_used.get(id(conn))
+    if last_used is None or time.monotonic() - last_used < POOL_PING_AFTER:
+        # Brand-new connections and recently used ones are trusted as-is.
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1;")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _acquire(pool):
+    """Takes a connection from the pool, replacing any stale ones it finds."""
+    for _ in range(POOL_MAX_CONN + 1):
+        conn = pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        print("WARNING: Discarding stale pooled database connection.")
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("Could not obtain a healthy database connection from the pool.")
+
+
+def _release(pool, conn, broken=False):
+    """Returns a connection to the pool in a clean state, or drops it if it can't be reused."""
+    if not conn.closed and not broken:
+        try:
+            if conn.info.transaction_status != pg_ext.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            broken = True
+    if conn.closed or broken:
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+        return
+    _last_used[id(conn)] = time.monotonic()
+    pool.putconn(conn)
+
+
+@contextmanager
+def db_connection(**connect_kwargs):
+    """
+    Yields a pooled connection to the PostgreSQL database.
+    Any transaction left open when the block exits is rolled back, so handlers
+    still need to call conn.commit() themselves. Pass connection settings to use
+    a separate pool (e.g. a restricted account); defaults come from the environment.
+
+        with db_connection() as conn:
+            cur = conn.cursor()
+            ...
+    """
+    pool = _get_pool(connect_kwargs or _connection_kwargs())
+    conn = _acquire(pool)
+    try:
+        yield conn
+    except psycopg2.OperationalError:
+        # Lost the socket mid-request; don't hand this connection out again.
+        _release(pool, conn, broken=True)
+        raise
+    except BaseException:
+        _release(pool, conn)
+        raise
+    else:
+        _release(pool, conn)
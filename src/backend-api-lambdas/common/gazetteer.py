@@ -0,0 +1,475 @@
+"""
+Offline gazetteer snapshot for the country-search Lambda.
+
+The snapshot is one binary file built from the locations / provinces / countries
+tables. Lambdas memory-map it once per container and answer prefix, fuzzy and
+transliteration lookups (plus the stored MGRS and its lat/lon) without touching
+Postgres.
+
+Build it:      python -m common.gazetteer export gazetteer.bin
+Benchmark it:  python -m common.gazetteer bench gazetteer.bin [query country]
+               (times a rebuild, the load and an average search, as given and misspelled)
+
+File layout (little-endian):
+    header     magic "GAZ1", version, record/country/trigram counts, section offsets
+    countries  one row per country, its records are a contiguous range
+    records    fixed-size rows sorted by (country, location_norm)
+    key index  record numbers sorted by (country, location_key)
+    norm grams trigrams of location_norm, sorted, each pointing at a postings run
+    key grams  the same for location_key
+    postings   ascending record numbers for each trigram
+    strings    UTF-8 blob that the rows point into
+"""
+
+from collections import Counter
+
+import bisect
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import unicodedata
+
+MAGIC = b"GAZ1"
+VERSION = 2
+# magic, version, n_records, n_countries, n_norm_grams, n_key_grams, 7 section offsets
+_HEADER = struct.Struct("<4sIIIIIQQQQQQQ")
+# country: lower-cased name (off,len), name (off,len), first record, end record
+_COUNTRY = struct.Struct("<IHIHII")
+# record: country no, name, norm, key, province, mgrs (each off,len), lat, lon,
+# trigram counts of norm and key
+_RECORD = struct.Struct("<IIHIHIHIHIHffHH")
+_KEY_ENTRY = struct.Struct("<I")
+# trigram (off,len), first posting, posting count
+_GRAM = struct.Struct("<IHII")
+_POSTING = struct.Struct("<I")
+
+# Only the Arabic article; English "the" is kept by both this and gazetteer_key
+_ARTICLES = re.compile(r" (al|el|ad|ed|ar|er|as|es|ash|esh|at|et|az|ez|an|en) ")
+# Letters unaccent() folds that NFKD leaves alone
+_FOLD = str.maketrans({"æ": "ae", "œ": "oe", "ø": "o", "đ": "d", "ð": "d", "ł": "l", "ß": "ss", "þ": "th", "ı": "i", "ħ": "h"})
+
+
+# --- Normalization (mirrors gazetteer_norm / gazetteer_key in sql/004) ---
+
+def normalize(text):
+    """Lower-cased, accent-free, punctuation collapsed to single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower().translate(_FOLD)
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+def translit_key(text):
+    """Spelling-insensitive skeleton: "Khan Younis" and "Khan Yunis" both give "khn yns"."""
+    k = f" {normalize(text)} "
+    # Run twice so back-to-back articles ("... al as ...") both go; gazetteer_key does the same
+    k = _ARTICLES.sub(" ", _ARTICLES.sub(" ", k))
+    k = k.replace("ph", "f").replace("dj", "j").replace("ck", "k").replace("q", "k")
+    k = re.sub(r"(?<=\w)[aeiouyw]", "", k)
+    k = re.sub(r"(.)\1+", r"\1", k)
+    return k.strip()
+
+
+def _trigrams(text):
+    """Trigram set in the same spirit as pg_trgm (each word padded with spaces)."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    ta, tb = _trigrams(a), _trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+# --- MGRS -> lat/lon (WGS84) ---
+
+_COL_LETTERS = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+_ROW_LETTERS = "ABCDEFGHJKLMNPQRSTUV"
+_MIN_NORTHING = {
+    "C": 1100000, "D": 2000000, "E": 2800000, "F": 3700000, "G": 4600000, "H": 5500000,
+    "J": 6400000, "K": 7300000, "L": 8200000, "M": 9100000, "N": 0, "P": 800000,
+    "Q": 1700000, "R": 2600000, "S": 3500000, "T": 4400000, "U": 5300000, "V": 6200000,
+    "W": 7000000, "X": 7900000,
+}
+_MGRS = re.compile(r"^(\d{1,2})([C-HJ-NP-X])([A-HJ-NP-Z])([A-HJ-NP-V])(\d*)$")
+
+
+def mgrs_to_latlon(mgrs):
+    """Centre of the given MGRS square as (lat, lon), or (None, None) if it can't be parsed."""
+    m = _MGRS.match(re.sub(r"\s+", "", (mgrs or "").upper()))
+    if not m or len(m.group(5)) % 2:
+        return None, None
+    zone, band, col, row, digits = int(m.group(1)), m.group(2), m.group(3), m.group(4), m.group(5)
+    if not 1 <= zone <= 60:
+        return None, None
+
+    grid_set = zone % 6 or 6
+    col_origin = "AJS"[(grid_set - 1) % 3]
+    row_origin = "F" if grid_set % 2 == 0 else "A"
+    easting = (_COL_LETTERS.index(col) - _COL_LETTERS.index(col_origin) + 1) * 100000
+    northing = (_ROW_LETTERS.index(row) - _ROW_LETTERS.index(row_origin)) % 20 * 100000
+    while northing < _MIN_NORTHING[band]:
+        northing += 2000000
+
+    precision = len(digits) // 2
+    if precision:
+        scale = 10 ** (5 - precision)
+        easting += int(digits[:precision]) * scale + scale / 2
+        northing += int(digits[precision:]) * scale + scale / 2
+    else:
+        easting += 50000
+        northing += 50000
+    return _utm_to_latlon(zone, band >= "N", easting, northing)
+
+
+def _utm_to_latlon(zone, northern, easting, northing):
+    a, f, k0 = 6378137.0, 1 / 298.257223563, 0.9996
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+    x = easting - 500000.0
+    y = northing if northern else northing - 10000000.0
+
+    mu = (y / k0) / (a * (1 - e2 / 4 - 3 * e2 ** 2 / 64 - 5 * e2 ** 3 / 256))
+    e1 = (1 - math.sqrt(1 - e2)) / (1 + math.sqrt(1 - e2))
+    phi1 = (mu + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * math.sin(2 * mu)
+            + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * math.sin(4 * mu)
+            + (151 * e1 ** 3 / 96) * math.sin(6 * mu)
+            + (1097 * e1 ** 4 / 512) * math.sin(8 * mu))
+
+    sin1, cos1, tan1 = math.sin(phi1), math.cos(phi1), math.tan(phi1)
+    n1 = a / math.sqrt(1 - e2 * sin1 ** 2)
+    t1 = tan1 ** 2
+    c1 = ep2 * cos1 ** 2
+    r1 = a * (1 - e2) / (1 - e2 * sin1 ** 2) ** 1.5
+    d = x / (n1 * k0)
+
+    lat = phi1 - (n1 * tan1 / r1) * (
+        d ** 2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1 ** 2 - 9 * ep2) * d ** 4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1 ** 2 - 252 * ep2 - 3 * c1 ** 2) * d ** 6 / 720
+    )
+    lon = (d - (1 + 2 * t1 + c1) * d ** 3 / 6
+           + (5 - 2 * c1 + 28 * t1 - 3 * c1 ** 2 + 8 * ep2 + 24 * t1 ** 2) * d ** 5 / 120) / cos1
+    lon_origin = (zone - 1) * 6 - 180 + 3
+    return round(math.degrees(lat), 6), round(lon_origin + math.degrees(lon), 6)
+
+
+# --- Building ---
+
+def build_snapshot(rows, path):
+    """
+    Writes a snapshot from (location, mgrs, province, country) rows.
+    Returns the number of records written.
+    """
+    strings = bytearray()
+    interned = {}
+
+    def put(text):
+        raw = (text or "").encode("utf-8")[:65535]
+        if raw not in interned:
+            interned[raw] = len(strings)
+            strings.extend(raw)
+        return interned[raw], len(raw)
+
+    by_country = {}
+    for location, mgrs, province, country in rows:
+        by_country.setdefault((country or "").lower(), (country, []))[1].append((location, mgrs, province))
+
+    country_rows, records, key_order = [], [], []
+    norm_postings, key_postings = {}, {}
+    for country_no, country_lower in enumerate(sorted(by_country)):
+        country_name, locs = by_country[country_lower]
+        entries = sorted(
+            ((normalize(loc), translit_key(loc), loc, mgrs, province) for loc, mgrs, province in locs),
+            key=lambda e: (e[0], e[2]),
+        )
+        first = len(records)
+        for norm, key, loc, mgrs, province in entries:
+            norm_grams, key_grams = _trigrams(norm), _trigrams(key)
+            for gram in norm_grams:
+                norm_postings.setdefault(gram, []).append(len(records))
+            for gram in key_grams:
+                key_postings.setdefault(gram, []).append(len(records))
+            lat, lon = mgrs_to_latlon(mgrs)
+            records.append(_RECORD.pack(
+                country_no, *put(loc), *put(norm), *put(key), *put(province), *put(mgrs),
+                math.nan if lat is None else lat, math.nan if lon is None else lon,
+                len(norm_grams), len(key_grams),
+            ))
+        key_order.extend(sorted(range(first, len(records)), key=lambda i: entries[i - first][1]))
+        country_rows.append(_COUNTRY.pack(*put(country_lower), *put(country_name), first, len(records)))
+
+    postings = []
+
+    def gram_table(by_gram):
+        table = []
+        for gram in sorted(by_gram):
+            table.append(_GRAM.pack(*put(gram), len(postings), len(by_gram[gram])))
+            postings.extend(by_gram[gram])
+        return table
+
+    norm_grams, key_grams = gram_table(norm_postings), gram_table(key_postings)
+
+    countries_off = _HEADER.size
+    records_off = countries_off + len(country_rows) * _COUNTRY.size
+    keys_off = records_off + len(records) * _RECORD.size
+    norm_grams_off = keys_off + len(key_order) * _KEY_ENTRY.size
+    key_grams_off = norm_grams_off + len(norm_grams) * _GRAM.size
+    postings_off = key_grams_off + len(key_grams) * _GRAM.size
+    strings_off = postings_off + len(postings) * _POSTING.size
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_HEADER.pack(MAGIC, VERSION, len(records), len(country_rows), len(norm_grams), len(key_grams),
+                              countries_off, records_off, keys_off, norm_grams_off, key_grams_off,
+                              postings_off, strings_off))
+        fh.writelines(country_rows)
+        fh.writelines(records)
+        fh.writelines(_KEY_ENTRY.pack(i) for i in key_order)
+        fh.writelines(norm_grams)
+        fh.writelines(key_grams)
+        fh.write(struct.pack(f"<{len(postings)}I", *postings))
+        fh.write(strings)
+    os.replace(tmp, path)
+    return len(records)
+
+
+def export_from_db(path):
+    """Reads the gazetteer tables through common.db and writes a snapshot to `path`."""
+    from common.db import db_connection
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT l.location, l.mgrs, p.province, c.country
+            FROM locations l
+            JOIN provinces p ON l.province_id = p.id
+            JOIN countries c ON p.country_id = c.id;
+        """)
+        rows = cur.fetchall()
+    return build_snapshot(rows, path)
+
+
+# --- Lookups ---
+
+# Offsets of the (off, len) string pairs inside a packed record
+_NAME, _NORM, _KEY, _PROVINCE, _MGRS_STR = 1, 3, 5, 7, 9
+# Offsets of the trigram counts
+_NORM_GRAMS, _KEY_GRAMS = 13, 14
+
+
+class Gazetteer:
+    """Read-only view over a memory-mapped snapshot. Only the small country table is decoded up front."""
+
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.n_records, n_countries, n_norm_grams, n_key_grams,
+         countries_off, self._records_off, self._keys_off, norm_grams_off, key_grams_off,
+         self._postings_off, self._strings_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer snapshot")
+        if version != VERSION:
+            raise ValueError(f"{path} is a version {version} snapshot, re-export it")
+        self._norm_grams = (norm_grams_off, n_norm_grams, _NORM_GRAMS)
+        self._key_grams = (key_grams_off, n_key_grams, _KEY_GRAMS)
+
+        self._countries = {}
+        for i in range(n_countries):
+            lower_off, lower_len, name_off, name_len, first, end = _COUNTRY.unpack_from(
+                self._mm, countries_off + i * _COUNTRY.size)
+            self._countries[self._str(lower_off, lower_len)] = (self._str(name_off, name_len), first, end)
+
+    def _str(self, off, length):
+        start = self._strings_off + off
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _raw(self, i):
+        return _RECORD.unpack_from(self._mm, self._records_off + i * _RECORD.size)
+
+    def _field(self, r, field):
+        return self._str(r[field], r[field + 1])
+
+    def _norm_at(self, i):
+        return self._field(self._raw(i), _NORM)
+
+    def _key_entry(self, j):
+        """(record number, transliteration key) for position j of the key index."""
+        i = _KEY_ENTRY.unpack_from(self._mm, self._keys_off + j * _KEY_ENTRY.size)[0]
+        return i, self._field(self._raw(i), _KEY)
+
+    def _prefix_range(self, getter, first, end, prefix):
+        """Positions in [first, end) whose sorted value starts with prefix."""
+        j = bisect.bisect_left(_View(getter, first, end), prefix) + first
+        while j < end and getter(j).startswith(prefix):
+            yield j
+            j += 1
+
+    def _postings(self, table, gram, first, end):
+        """Record numbers in [first, end) whose trigram set (in the given gram table) contains gram."""
+        table_off, n, _count_field = table
+        gram_at = lambda k: self._field(_GRAM.unpack_from(self._mm, table_off + k * _GRAM.size), 0)
+        k = bisect.bisect_left(_View(gram_at, 0, n), gram)
+        if k == n or gram_at(k) != gram:
+            return ()
+        _off, _len, start, count = _GRAM.unpack_from(self._mm, table_off + k * _GRAM.size)
+        posting_at = lambda j: _POSTING.unpack_from(self._mm, self._postings_off + j * _POSTING.size)[0]
+        lo = bisect.bisect_left(_View(posting_at, start, start + count), first) + start
+        hi = bisect.bisect_left(_View(posting_at, lo, start + count), end) + lo
+        return struct.unpack_from(f"<{hi - lo}I", self._mm, self._postings_off + lo * _POSTING.size)
+
+    def _similar(self, table, text, first, end):
+        """
+        Records whose trigram similarity to text reaches pg_trgm's 0.3, worked out from
+        the postings: similarity is shared / (len(grams) + count - shared), and the
+        union is at least len(grams), which rules most records out before they're read.
+        """
+        grams = _trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings(table, gram, first, end))
+        count_field = table[2]
+        return {
+            i for i, n in shared.items()
+            if n * 10 >= len(grams) * 3 and n * 10 >= 3 * (len(grams) + self._raw(i)[count_field] - n)
+        }
+
+    def rows(self):
+        """Yields (location, mgrs, province, country) for every record, e.g. to rebuild the file."""
+        for country_name, first, end in self._countries.values():
+            for i in range(first, end):
+                r = self._raw(i)
+                yield self._field(r, _NAME), self._field(r, _MGRS_STR) or None, self._field(r, _PROVINCE), country_name
+
+    def search(self, country, location, limit=25):
+        """
+        Same ranking as the fuzzy SQL mode: exact > prefix > similarity, where
+        similarity is the better of the name and transliteration-key trigram scores.
+        """
+        entry = self._countries.get((country or "").lower())
+        query = normalize(location)
+        if not entry or not query:
+            return []
+        country_name, first, end = entry
+        qkey = translit_key(location)
+
+        candidates = set(self._prefix_range(self._norm_at, first, end, query))
+        if qkey:
+            key_at = lambda j: self._key_entry(j)[1]
+            candidates.update(self._key_entry(j)[0] for j in self._prefix_range(key_at, first, end, qkey))
+
+        # Typo tolerance: whatever shares enough trigrams with the name or the key
+        candidates |= self._similar(self._norm_grams, query, first, end)
+        if qkey:
+            candidates |= self._similar(self._key_grams, qkey, first, end)
+
+        scored = []
+        for i in candidates:
+            r = self._raw(i)
+            norm, key = self._field(r, _NORM), self._field(r, _KEY)
+            sim = max(similarity(norm, query), similarity(key, qkey))
+            # Same filter as the SQL WHERE: a name prefix, or pg_trgm's default 0.3 threshold
+            if not norm.startswith(query) and sim < 0.3:
+                continue
+            bonus = 1 if norm == query else 0.5 if norm.startswith(query) else 0
+            scored.append((bonus + sim, self._field(r, _NAME), r))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+
+        results = []
+        for score, name, r in scored[:limit]:
+            lat, lon = r[11], r[12]
+            results.append({
+                "location": name,
+                # A missing MGRS is stored as an empty string; SQL returns it as null
+                "mgrs": self._field(r, _MGRS_STR) or None,
+                "province": self._field(r, _PROVINCE),
+                "country": country_name,
+                "lat": None if math.isnan(lat) else round(lat, 6),
+                "lon": None if math.isnan(lon) else round(lon, 6),
+                "score": round(score, 3),
+            })
+        return results
+
+
+class _View:
+    """Lets bisect search a slice of the snapshot without materializing it."""
+
+    def __init__(self, getter, first, end):
+        self._get, self._first, self._len = getter, first, end - first
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        return self._get(self._first + i)
+
+
+_loaded = None
+
+
+def load(path=None):
+    """Returns the container-wide Gazetteer, mapping the snapshot on first use."""
+    global _loaded
+    if _loaded is None:
+        _loaded = Gazetteer(path or os.environ.get("GAZETTEER_SNAPSHOT", "/opt/gazetteer.bin"))
+    return _loaded
+
+
+# --- Command line ---
+
+def _bench(path, query, country, rounds=200):
+    started = time.perf_counter()
+    gaz = Gazetteer(path)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    # Build time without the database: rebuild a copy from the snapshot's own rows
+    rows = list(gaz.rows())
+    started = time.perf_counter()
+    build_snapshot(rows, f"{path}.bench")
+    build_ms = (time.perf_counter() - started) * 1000
+    os.remove(f"{path}.bench")
+
+    # The query as given, then with its last two letters swapped so it has to go through the trigram index
+    searches = [query]
+    if len(query) > 2:
+        searches.append(query[:-2] + query[-1] + query[-2])
+    timings = []
+    for q in searches:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            found = gaz.search(country, q)
+        timings.append((q, (time.perf_counter() - started) * 1000 / rounds, len(found)))
+        if q == query:
+            results = found
+
+    print(f"records: {gaz.n_records}, file: {os.path.getsize(path) / 1024:.0f} KiB")
+    print(f"build: {build_ms:.1f} ms, load: {load_ms:.2f} ms")
+    for q, lookup_ms, n in timings:
+        print(f"search({country!r}, {q!r}): {lookup_ms:.3f} ms avg over {rounds}, {n} results")
+    for rec in results[:5]:
+        print(f"  {rec['score']:.3f}  {rec['location']}  {rec['mgrs']}  ({rec['lat']}, {rec['lon']})")
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "export":
+        started = time.perf_counter()
+        n = export_from_db(argv[1])
+        print(f"Wrote {n} locations to {argv[1]} in {time.perf_counter() - started:.1f}s")
+    elif len(argv) >= 2 and argv[0] == "bench":
+        _bench(argv[1], *(argv[2:4] if len(argv) >= 4 else ("kabul", "Afghanistan")))
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
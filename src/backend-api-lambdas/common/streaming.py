@@ -0,0 +1,101 @@
+"""
+Chunked HTTP adapter for the Lambdas that stream their responses.
+
+API Gateway buffers a Lambda's whole response, so the streaming paths run as a
+small HTTP server instead: locally (python tipjar-api-resource-<name>.py) or as
+the app behind the Lambda Web Adapter with a RESPONSE_STREAM function URL.
+
+A Lambda hands over its lambda_handler plus one function, stream(event), that
+decides per request:
+    None                 not a streaming request, send it through lambda_handler
+    a response dict      answer as-is, e.g. a 400 from validating the request
+    (headers, chunks)    stream the byte chunks as a chunked body after the headers
+"""
+
+import base64
+import os
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+from common.utils import with_cors
+
+
+def build_event(method, path, headers, body):
+    """API Gateway style event for a request, with /resource/{id} mapped to pathParameters."""
+    url = urlsplit(path)
+    parts = url.path.strip("/").split("/")
+    return {
+        "httpMethod": method,
+        "path": url.path,
+        "pathParameters": {"id": parts[1]} if len(parts) == 2 else None,
+        "queryStringParameters": dict(parse_qsl(url.query)),
+        "headers": dict(headers),
+        "body": body,
+    }
+
+
+def make_handler(lambda_handler, stream):
+    """Request handler class that streams whatever stream(event) claims."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # needed for chunked transfer encoding
+
+        def _send_plain(self, response):
+            response = with_cors(response)
+            payload = response["body"] or ""
+            payload = base64.b64decode(payload) if response.get("isBase64Encoded") else payload.encode("utf-8")
+            self.send_response(response["statusCode"])
+            for k, v in response["headers"].items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _send_chunked(self, headers, chunks):
+            self.send_response(200)
+            for k, v in with_cors({"headers": headers})["headers"].items():
+                self.send_header(k, v)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+                    self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _handle(self, method):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+            event = build_event(method, self.path, self.headers, raw)
+            result = stream(event)
+            if result is None:
+                self._send_plain(lambda_handler(event, None))
+            elif isinstance(result, dict):
+                self._send_plain(result)
+            else:
+                self._send_chunked(*result)
+
+        def do_OPTIONS(self):
+            self._send_plain(lambda_handler({"httpMethod": "OPTIONS"}, None))
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    return Handler
+
+
+def serve(lambda_handler, stream, name, port=None):
+    """Serves lambda_handler over HTTP until the process is stopped."""
+    port = int(port or os.environ.get("PORT", 8080))
+    print(f"{name} server listening on :{port}")
+    # One request at a time: the Web Adapter forwards a single invocation per
+    # container, and each streamed response holds one of the few pooled connections.
+    HTTPServer(("", port), make_handler(lambda_handler, stream)).serve_forever()
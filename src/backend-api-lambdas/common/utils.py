@@ -1,4 +1,6 @@
 import json
+from datetime import timezone
+from email.utils import format_datetime
 
 """
 Set your CORS info here. You can keep the 'Allow-Origin' set as '*'
@@ -7,8 +9,9 @@ If that's the case you'll need to directly specify the URL of the page.
 """
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization,X-Api-Key,X-Amz-Date,X-Amz-Security-Token",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization,X-Api-Key,X-Amz-Date,X-Amz-Security-Token,If-None-Match",
     "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,OPTIONS",
+    "Access-Control-Expose-Headers": "ETag,Last-Modified",
 }
 
 def with_cors(response):
@@ -38,4 +41,55 @@ def parse_body(event):
     Safely parses the JSON body from an API Gateway event, returning an
     empty dictionary if the body is missing or empty.
     """
-    return json.loads(event.get("body") or "{}")
\ No newline at end of file
+    return json.loads(event.get("body") or "{}")
+
+def get_header(event, name):
+    """Case-insensitive request header lookup (API Gateway doesn't normalize header case)."""
+    for key, value in ((event or {}).get("headers") or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+# Serialized bodies of versioned reference tables, kept for the life of the container
+_versioned_bodies = {}
+
+def versioned_response(cur, event, table, build_payload, cache_key=None):
+    """
+    Serves a whole-table GET (platforms, dirty_words, requirements, users) using the
+    version counter kept in table_versions by triggers (see sql/003).
+    - If-None-Match matching the current version -> 304, nothing else is queried.
+    - Otherwise the serialized body is reused from this container if the version
+      hasn't moved, and build_payload() is only called when it has.
+    Falls back to a plain 200 if table_versions isn't there.
+    """
+    try:
+        cur.execute("SELECT version, updated_on FROM table_versions WHERE table_name = %s;", (table,))
+        row = cur.fetchone()
+    except Exception as e:
+        print(f"WARNING: table_versions lookup failed, serving {table} uncached: {e}")
+        cur.connection.rollback()
+        row = None
+    if not row:
+        return {"statusCode": 200, "body": json.dumps(build_payload(), default=str)}
+
+    version, updated_on = list(row.values()) if isinstance(row, dict) else row
+    etag = f'"{table}-{version}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(updated_on.astimezone(timezone.utc), usegmt=True),
+        # Let browsers keep the body but always revalidate with If-None-Match
+        "Cache-Control": "no-cache",
+    }
+
+    if_none_match = get_header(event, "If-None-Match") or ""
+    if etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]:
+        return {"statusCode": 304, "headers": headers, "body": ""}
+
+    key = cache_key or table
+    cached = _versioned_bodies.get(key)
+    if cached and cached[0] == version:
+        body = cached[1]
+    else:
+        body = json.dumps(build_payload(), default=str)
+        _versioned_bodies[key] = (version, body)
+    return {"statusCode": 200, "headers": headers, "body": body}
@@ -0,0 +1,15 @@
+-- Cache of generated INTSUM/RFI summaries (used by /intsum).
+-- cache_key is a sha256 over report_type, model id, prompt version and the
+-- normalized report texts, so identical roll-ups never hit Bedrock twice.
+CREATE TABLE IF NOT EXISTS intsum_summary_cache (
+    cache_key    TEXT PRIMARY KEY,
+    report_type  TEXT NOT NULL,
+    model_id     TEXT NOT NULL,
+    summary      TEXT NOT NULL,
+    usage        JSONB,
+    created_on   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_hit_on  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    hit_count    INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_intsum_summary_cache_last_hit ON intsum_summary_cache (last_hit_on);
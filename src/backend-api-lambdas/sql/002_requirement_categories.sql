@@ -0,0 +1,34 @@
+-- Precomputed requirement category codes for tip_reports.
+-- Requirements look like DDCC0513-OCR-17245-EE6174; the 5 digit third segment is
+-- the "category code". Searching requirements::text ILIKE '%17245%' casts and scans
+-- every row, while requirement_categories && ARRAY[17245] is a GIN index lookup.
+
+CREATE OR REPLACE FUNCTION requirement_category_codes(reqs text[]) RETURNS integer[]
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(array_agg(DISTINCT m[1]::integer ORDER BY m[1]::integer), '{}')
+    FROM unnest(COALESCE(reqs, '{}')) AS r, regexp_match(r, '^[^-]+-[^-]+-(\d{5})-') AS m
+    WHERE m IS NOT NULL
+$$;
+
+ALTER TABLE tip_reports ADD COLUMN IF NOT EXISTS requirement_categories integer[] NOT NULL DEFAULT '{}';
+
+-- Same pattern as tsvectorupdate: keep the derived column current on every write
+CREATE OR REPLACE FUNCTION tip_reports_requirement_categories_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.requirement_categories := requirement_category_codes(NEW.requirements);
+    RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS requirementcategoriesupdate ON tip_reports;
+CREATE TRIGGER requirementcategoriesupdate
+    BEFORE INSERT OR UPDATE OF requirements ON tip_reports
+    FOR EACH ROW EXECUTE FUNCTION tip_reports_requirement_categories_update();
+
+-- Backfill existing rows
+UPDATE tip_reports
+SET requirement_categories = requirement_category_codes(requirements)
+WHERE requirement_categories IS DISTINCT FROM requirement_category_codes(requirements);
+
+CREATE INDEX IF NOT EXISTS idx_tip_reports_requirement_categories ON tip_reports USING gin (requirement_categories);
@@ -0,0 +1,51 @@
+-- Change counters for the small reference tables (platforms, dirty_words,
+-- requirements, users). Any write bumps the table's version, so the Lambdas can
+-- answer If-None-Match with a 304 after a single primary-key lookup here.
+-- users is the exception for UPDATE: every login stamps last_login, which would
+-- invalidate the users list on each sign-in, so updates only count when some
+-- other column changed. The cached list may show a stale last_login until then.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name  TEXT PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 1,
+    updated_on  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO table_versions (table_name) VALUES (TG_TABLE_NAME)
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = table_versions.version + 1, updated_on = NOW();
+    RETURN NULL;
+END
+$$;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['platforms', 'dirty_words', 'requirements'] LOOP
+        INSERT INTO table_versions (table_name) VALUES (t) ON CONFLICT DO NOTHING;
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_version_bump', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()',
+            t || '_version_bump', t
+        );
+    END LOOP;
+END
+$$;
+
+INSERT INTO table_versions (table_name) VALUES ('users') ON CONFLICT DO NOTHING;
+DROP TRIGGER IF EXISTS users_version_bump ON users;
+DROP TRIGGER IF EXISTS users_version_bump_update ON users;
+CREATE TRIGGER users_version_bump
+    AFTER INSERT OR DELETE OR TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+-- Row-level so the WHEN clause can compare the rows with last_login taken out
+CREATE TRIGGER users_version_bump_update
+    AFTER UPDATE ON users
+    FOR EACH ROW
+    WHEN ((to_jsonb(OLD) - 'last_login') IS DISTINCT FROM (to_jsonb(NEW) - 'last_login'))
+    EXECUTE FUNCTION bump_table_version();
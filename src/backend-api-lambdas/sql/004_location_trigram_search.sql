@@ -0,0 +1,48 @@
+-- Indexed, typo-tolerant location search for /countries?mode=fuzzy.
+-- location_norm:  lower-cased, accent-free, punctuation collapsed to spaces.
+-- location_key:   a transliteration-insensitive skeleton, so "Khan Yunis" and
+--                 "Khan Younis" (or "Mosul" and "al-Mawsil") share a key.
+-- Both are trigram indexed, so lookups stay flat as the gazetteer grows.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() is only STABLE; pinning the dictionary makes it safe to index
+CREATE OR REPLACE FUNCTION gazetteer_norm(t text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT trim(regexp_replace(
+        lower(public.unaccent('public.unaccent'::regdictionary, COALESCE(t, ''))),
+        '[[:punct:][:space:]]+', ' ', 'g'
+    ))
+$$;
+
+CREATE OR REPLACE FUNCTION gazetteer_key(t text) RETURNS text
+LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+DECLARE
+    k text := ' ' || gazetteer_norm(t) || ' ';
+BEGIN
+    -- Arabic article in its assimilated forms (al-, el-, ad-, ash-, ez- ...), not English "the".
+    -- Twice, since matches share their spaces and back-to-back articles would leave one behind.
+    -- common/gazetteer.py translit_key must stay in step with this function.
+    k := regexp_replace(k, ' (al|el|ad|ed|ar|er|as|es|ash|esh|at|et|az|ez|an|en) ', ' ', 'g');
+    k := regexp_replace(k, ' (al|el|ad|ed|ar|er|as|es|ash|esh|at|et|az|ez|an|en) ', ' ', 'g');
+    -- Letters that are spelled more than one way
+    k := replace(replace(replace(replace(k, 'ph', 'f'), 'dj', 'j'), 'ck', 'k'), 'q', 'k');
+    -- Vowels and semi-vowels carry most of the variation; keep only word-initial ones
+    k := regexp_replace(k, '\Y[aeiouyw]', '', 'g');
+    -- Doubled letters (Abbas / Abas)
+    k := regexp_replace(k, '(.)\1+', '\1', 'g');
+    RETURN trim(k);
+END
+$$;
+
+ALTER TABLE locations ADD COLUMN IF NOT EXISTS location_norm text GENERATED ALWAYS AS (gazetteer_norm(location)) STORED;
+ALTER TABLE locations ADD COLUMN IF NOT EXISTS location_key text GENERATED ALWAYS AS (gazetteer_key(location)) STORED;
+-- Stored keys aren't recomputed when gazetteer_key changes; rewrite the rows that are out of date
+UPDATE locations SET location = location WHERE location_key IS DISTINCT FROM gazetteer_key(location);
+
+CREATE INDEX IF NOT EXISTS idx_locations_norm_trgm ON locations USING gin (location_norm gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_locations_key_trgm ON locations USING gin (location_key gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_locations_province_id ON locations (province_id);
+CREATE INDEX IF NOT EXISTS idx_provinces_country_id ON provinces (country_id);
+CREATE INDEX IF NOT EXISTS idx_countries_country_lower ON countries (lower(country));
@@ -0,0 +1,188 @@
+-- Real dates for date_of_information plus a per-day, per-country roll-up of reports.
+-- date_of_information is a DDMMMYY string (05OCT25), which neither sorts nor ranges,
+-- so doi_date holds the parsed date. report_daily_rollup keeps the report ids, count
+-- and requirement category breakdown for each (day, country) and is maintained by
+-- statement triggers, so the INTSUM builder reads a handful of rows instead of
+-- filtering tip_reports.
+-- Needs 002 (requirement_categories) to have been run first.
+
+CREATE OR REPLACE FUNCTION doi_to_date(doi text) RETURNS date
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    m text[];
+    mon integer;
+BEGIN
+    m := regexp_match(upper(btrim(doi)), '^(\d{1,2})([A-Z]{3})(\d{2}|\d{4})$');
+    IF m IS NULL THEN
+        RETURN NULL;
+    END IF;
+    mon := array_position(ARRAY['JAN','FEB','MAR','APR','MAY','JUN','JUL','AUG','SEP','OCT','NOV','DEC'], m[2]);
+    IF mon IS NULL THEN
+        RETURN NULL;
+    END IF;
+    RETURN make_date(CASE WHEN length(m[3]) = 2 THEN 2000 + m[3]::integer ELSE m[3]::integer END, mon, m[1]::integer);
+EXCEPTION WHEN others THEN
+    RETURN NULL; -- e.g. 31FEB25
+END
+$$;
+
+ALTER TABLE tip_reports
+    ADD COLUMN IF NOT EXISTS doi_date date GENERATED ALWAYS AS (doi_to_date(date_of_information)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tip_reports_doi_date ON tip_reports (doi_date);
+
+CREATE TABLE IF NOT EXISTS report_daily_rollup (
+    day             date NOT NULL,
+    country         text NOT NULL DEFAULT '',  -- '' for reports without a country
+    report_count    integer NOT NULL DEFAULT 0,
+    report_ids      uuid[] NOT NULL DEFAULT '{}',
+    category_counts jsonb NOT NULL DEFAULT '{}', -- {"17245": 3, ...}
+    updated_on      timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (day, country)
+);
+
+-- Reports whose date_of_information doesn't parse have no roll-up row; GET
+-- /reports/rollup finds those by created_on instead.
+CREATE INDEX IF NOT EXISTS idx_tip_reports_undated ON tip_reports (created_on) WHERE doi_date IS NULL;
+
+-- The roll-up is maintained once per statement from the transition tables, so a
+-- bulk load of thousands of rows touches each (day, country) row once. Touched
+-- rows are created and locked in (day, country) order, so concurrent loads queue
+-- behind each other instead of deadlocking.
+DROP TRIGGER IF EXISTS reportdailyrollupupdate ON tip_reports;
+DROP FUNCTION IF EXISTS report_daily_rollup_apply(date, text, uuid, integer[], integer);
+
+-- changes: [{"sign": 1 | -1, "day", "country", "id", "cats"}, ...], one entry per
+-- report added to (1) or removed from (-1) a roll-up row.
+CREATE OR REPLACE FUNCTION report_daily_rollup_apply(changes jsonb)
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF changes IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO report_daily_rollup (day, country)
+    SELECT DISTINCT day, country FROM jsonb_to_recordset(changes) AS j(day date, country text)
+    ORDER BY day, country
+    ON CONFLICT DO NOTHING;
+
+    PERFORM 1 FROM report_daily_rollup
+    WHERE (day, country) IN (SELECT day, country FROM jsonb_to_recordset(changes) AS j(day date, country text))
+    ORDER BY day, country
+    FOR UPDATE;
+
+    WITH c AS (
+        SELECT * FROM jsonb_to_recordset(changes) AS j(sign integer, day date, country text, id uuid, cats integer[])
+    ), ids AS (
+        SELECT day, country,
+               COALESCE(array_agg(id) FILTER (WHERE sign < 0), '{}') AS removed,
+               COALESCE(array_agg(id) FILTER (WHERE sign > 0), '{}') AS added
+        FROM c GROUP BY day, country
+    ), cats AS (
+        SELECT day, country, jsonb_object_agg(cat::text, n) AS delta
+        FROM (
+            SELECT day, country, cat, SUM(sign) AS n
+            FROM c, unnest(c.cats) AS cat
+            GROUP BY day, country, cat
+        ) x
+        WHERE n <> 0
+        GROUP BY day, country
+    ), merged AS (
+        SELECT r.day, r.country,
+               ARRAY(SELECT x FROM unnest(r.report_ids) AS x WHERE x <> ALL (i.removed)) || i.added AS report_ids,
+               (SELECT COALESCE(jsonb_object_agg(k, v), '{}')
+                FROM (
+                    SELECT k, SUM(v) AS v
+                    FROM (
+                        SELECT key AS k, value::text::integer AS v FROM jsonb_each(r.category_counts)
+                        UNION ALL
+                        SELECT key, value::text::integer FROM jsonb_each(COALESCE(d.delta, '{}'))
+                    ) u
+                    GROUP BY k
+                    HAVING SUM(v) > 0
+                ) s) AS category_counts
+        FROM report_daily_rollup r
+        JOIN ids i ON i.day = r.day AND i.country = r.country
+        LEFT JOIN cats d ON d.day = r.day AND d.country = r.country
+    )
+    UPDATE report_daily_rollup r
+    SET report_ids = m.report_ids, report_count = cardinality(m.report_ids),
+        category_counts = m.category_counts, updated_on = now()
+    FROM merged m
+    WHERE r.day = m.day AND r.country = m.country;
+
+    DELETE FROM report_daily_rollup
+    WHERE cardinality(report_ids) = 0
+      AND (day, country) IN (SELECT day, country FROM jsonb_to_recordset(changes) AS j(day date, country text));
+END
+$$;
+
+-- One function for all three statement triggers. Transition tables can't be
+-- combined with UPDATE OF, so updates that leave doi_date, country and the
+-- categories alone are filtered out here.
+CREATE OR REPLACE FUNCTION tip_reports_rollup_update() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changes jsonb;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT jsonb_agg(c) INTO changes FROM (
+            SELECT 1 AS sign, doi_date AS day, COALESCE(country, '') AS country, id, requirement_categories AS cats
+            FROM new_rows WHERE doi_date IS NOT NULL
+        ) c;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT jsonb_agg(c) INTO changes FROM (
+            SELECT -1 AS sign, doi_date AS day, COALESCE(country, '') AS country, id, requirement_categories AS cats
+            FROM old_rows WHERE doi_date IS NOT NULL
+        ) c;
+    ELSE
+        SELECT jsonb_agg(c) INTO changes FROM (
+            SELECT -1 AS sign, o.doi_date AS day, COALESCE(o.country, '') AS country, o.id, o.requirement_categories AS cats
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE o.doi_date IS NOT NULL
+              AND (o.doi_date, o.country, o.requirement_categories) IS DISTINCT FROM (n.doi_date, n.country, n.requirement_categories)
+            UNION ALL
+            SELECT 1, n.doi_date, COALESCE(n.country, ''), n.id, n.requirement_categories
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.doi_date IS NOT NULL
+              AND (o.doi_date, o.country, o.requirement_categories) IS DISTINCT FROM (n.doi_date, n.country, n.requirement_categories)
+        ) c;
+    END IF;
+    PERFORM report_daily_rollup_apply(changes);
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS reportdailyrollupinsert ON tip_reports;
+DROP TRIGGER IF EXISTS reportdailyrollupdelete ON tip_reports;
+CREATE TRIGGER reportdailyrollupinsert
+    AFTER INSERT ON tip_reports REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tip_reports_rollup_update();
+CREATE TRIGGER reportdailyrollupupdate
+    AFTER UPDATE ON tip_reports REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tip_reports_rollup_update();
+CREATE TRIGGER reportdailyrollupdelete
+    AFTER DELETE ON tip_reports REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tip_reports_rollup_update();
+
+-- Rebuild from scratch (safe to re-run)
+BEGIN;
+DELETE FROM report_daily_rollup;
+INSERT INTO report_daily_rollup (day, country, report_count, report_ids, category_counts)
+SELECT g.day, g.country, g.n, g.ids, COALESCE(cc.counts, '{}')
+FROM (
+    SELECT doi_date AS day, COALESCE(country, '') AS country, COUNT(*) AS n, array_agg(id) AS ids
+    FROM tip_reports
+    WHERE doi_date IS NOT NULL
+    GROUP BY 1, 2
+) g
+LEFT JOIN LATERAL (
+    SELECT jsonb_object_agg(c::text, n) AS counts
+    FROM (
+        SELECT c, COUNT(*) AS n
+        FROM tip_reports t, unnest(t.requirement_categories) AS c
+        WHERE t.doi_date = g.day AND COALESCE(t.country, '') = g.country
+        GROUP BY c
+    ) x
+) cc ON true;
+COMMIT;
@@ -0,0 +1,18 @@
+-- Translation memory for /translate/batch.
+-- Keyed on (source language as requested, target language, sha256 of the text), so
+-- re-shared posts and boilerplate are only sent to AWS Translate once. For
+-- sourceLang 'auto' the language Translate detected is kept in detected_source.
+CREATE TABLE IF NOT EXISTS translation_memory (
+    source_lang      TEXT NOT NULL,
+    target_lang      TEXT NOT NULL,
+    text_hash        TEXT NOT NULL,
+    source_text      TEXT NOT NULL,
+    translated_text  TEXT NOT NULL,
+    detected_source  TEXT,
+    created_on       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_hit_on      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    hit_count        INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source_lang, target_lang, text_hash)
+);
+
+CREATE INDEX IF NOT EXISTS idx_translation_memory_last_hit ON translation_memory (last_hit_on);
@@ -0,0 +1,27 @@
+-- Cache of OCR results (used by /ocr and /ocr/batch).
+-- exact_hash is a sha256 of the decoded image bytes. phash is a 64-bit difference
+-- hash, so re-compressed or resized copies of the same screenshot still match.
+-- phash_bands holds its eight bytes tagged with their position (position * 256 + byte).
+-- Two hashes within 7 bits of each other always share at least one band, so the
+-- GIN index finds the candidates and the exact distance is checked in the Lambda.
+-- thumbnail is a zlib-compressed 128x128 grayscale copy that confirms a candidate
+-- pixel by pixel before it is served (only with OCR_NEAR_HITS on).
+CREATE TABLE IF NOT EXISTS ocr_cache (
+    exact_hash      TEXT PRIMARY KEY,
+    model_id        TEXT NOT NULL,
+    phash           BIGINT,
+    phash_bands     INTEGER[],
+    width           INTEGER,
+    height          INTEGER,
+    thumbnail       BYTEA,
+    extracted_text  TEXT NOT NULL,
+    usage           JSONB,
+    created_on      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_hit_on     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    hit_count       INTEGER NOT NULL DEFAULT 0
+);
+
+ALTER TABLE ocr_cache ADD COLUMN IF NOT EXISTS thumbnail BYTEA;
+
+CREATE INDEX IF NOT EXISTS idx_ocr_cache_phash_bands ON ocr_cache USING gin (phash_bands);
+CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_hit ON ocr_cache (last_hit_on);
@@ -0,0 +1,69 @@
+"""
+The Lambda handlers have hyphenated file names and import boto3/psycopg2 at module
+level, so tests load them by path with those packages replaced by stand-ins.
+"""
+
+import importlib.util
+import os
+import sys
+import types
+from unittest import mock
+
+import pytest
+
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LAMBDA_DIR)
+
+
+class _QueryCanceledError(Exception):
+    pass
+
+
+def _stub_modules():
+    """Module stand-ins for the packages that only exist in the Lambda runtime."""
+    boto3 = types.ModuleType("boto3")
+    boto3.client = mock.MagicMock(name="boto3.client")
+
+    botocore = types.ModuleType("botocore")
+    botocore_exceptions = types.ModuleType("botocore.exceptions")
+    botocore_exceptions.ClientError = type("ClientError", (Exception,), {})
+    botocore.exceptions = botocore_exceptions
+
+    psycopg2 = types.ModuleType("psycopg2")
+    psycopg2.Error = type("Error", (Exception,), {"pgerror": None})
+    psycopg2.OperationalError = type("OperationalError", (psycopg2.Error,), {})
+    psycopg2.extensions = types.SimpleNamespace(QueryCanceledError=_QueryCanceledError)
+    psycopg2_extras = types.ModuleType("psycopg2.extras")
+    psycopg2_extras.execute_values = mock.MagicMock(name="execute_values")
+    psycopg2_extras.RealDictCursor = object
+    psycopg2.extras = psycopg2_extras
+
+    common_db = types.ModuleType("common.db")
+    common_db.db_connection = mock.MagicMock(name="db_connection")
+
+    return {
+        "boto3": boto3,
+        "botocore": botocore,
+        "botocore.exceptions": botocore_exceptions,
+        "psycopg2": psycopg2,
+        "psycopg2.extras": psycopg2_extras,
+        "common.db": common_db,
+    }
+
+
+@pytest.fixture
+def load_lambda(monkeypatch):
+    """Returns a loader: load_lambda("intsum") imports tipjar-api-resource-intsum.py."""
+    for name, module in _stub_modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+    def load(name, **env):
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        path = os.path.join(LAMBDA_DIR, f"tipjar-api-resource-{name}.py")
+        spec = importlib.util.spec_from_file_location(f"tipjar_{name.replace('-', '_')}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    return load
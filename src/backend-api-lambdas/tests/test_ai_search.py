@@ -0,0 +1,117 @@
+from unittest import mock
+
+import pytest
+
+
+def _load(load_lambda):
+    return load_lambda("ai-search", AISEARCH_TOKEN_SECRET="test-secret", AISEARCH_MAX_ROWS="100")
+
+
+def test_offset_past_row_cap_returns_empty_page(load_lambda):
+    aisearch = _load(load_lambda)
+    conn = mock.MagicMock()
+
+    for offset in (100, 250):
+        results, has_more, stats = aisearch.execute_generated_sql(conn, "SELECT * FROM tip_reports", offset=offset)
+        assert results == []
+        assert has_more is False
+        assert stats == {}
+    conn.cursor.assert_not_called()
+
+
+def test_missing_token_secret_fails_only_on_token_paths(load_lambda, monkeypatch):
+    monkeypatch.delenv("AISEARCH_TOKEN_SECRET", raising=False)
+    aisearch = load_lambda("ai-search")
+
+    with pytest.raises(RuntimeError, match="AISEARCH_TOKEN_SECRET"):
+        aisearch._encode_token("SELECT id FROM tip_reports", None, 50)
+
+    response = aisearch.lambda_handler(
+        {"httpMethod": "POST", "body": '{"continuation_token": "e30=.abc"}'}, None
+    )
+    assert response["statusCode"] == 500
+    assert "AISEARCH_TOKEN_SECRET" in response["body"]
+
+
+def test_continuation_token_round_trip(load_lambda):
+    aisearch = _load(load_lambda)
+    token = aisearch._encode_token("SELECT id FROM tip_reports WHERE country = %s", ["IRAQ"], 50)
+    assert aisearch._decode_token(token) == ("SELECT id FROM tip_reports WHERE country = %s", ["IRAQ"], 50)
+
+    data, signature = token.rsplit(".", 1)
+    with pytest.raises(ValueError):
+        aisearch._decode_token(data + "." + "0" * len(signature))
+
+
+def _known_values(*values):
+    """A connection whose tip_reports only holds the given values in its closed columns."""
+    conn = mock.MagicMock()
+    cur = conn.cursor.return_value
+    cur.execute.side_effect = lambda sql, params: setattr(
+        cur, "_found", params[0].strip("%").upper() in values
+    )
+    cur.fetchone.side_effect = lambda: (cur._found,)
+    return conn
+
+
+def test_category_rewrite_applies_to_filled_templates(load_lambda, monkeypatch):
+    aisearch = _load(load_lambda)
+    generated = []
+
+    def generate(question):
+        generated.append(question)
+        return "SELECT * FROM tip_reports WHERE requirements::text ILIKE '%17208%' AND country ILIKE '%iraq%'"
+
+    monkeypatch.setattr(aisearch, "generate_sql_query", generate)
+
+    conn = _known_values("IRAQ", "SYRIA")
+
+    sql, params, level = aisearch.get_sql_for_query("reports for category 17208 in iraq", conn)
+    assert level == "miss"
+    assert "requirement_categories @> ARRAY[17208]" in sql
+    assert params is None
+
+    sql, params, level = aisearch.get_sql_for_query("reports for category 17245 in syria", conn)
+    assert level == "template"
+    assert len(generated) == 1
+    assert "requirements::text" not in sql
+    assert "requirement_categories @> ARRAY[%s]::integer[]" in sql
+    assert params == [17245, "%syria%"]
+
+
+def test_category_rewrite_leaves_other_parameters_alone(load_lambda):
+    aisearch = _load(load_lambda)
+    sql = "SELECT id FROM tip_reports WHERE title ILIKE '%%drone%%' AND (requirements)::text ILIKE %s AND country = %s"
+
+    rewritten, params = aisearch._rewrite_category_search(sql, ["%17208%", "IRAQ"])
+    assert rewritten == "SELECT id FROM tip_reports WHERE title ILIKE '%%drone%%' AND requirement_categories @> ARRAY[%s]::integer[] AND country = %s"
+    assert params == [17208, "IRAQ"]
+
+    assert aisearch._rewrite_category_search(sql, ["%drone%", "IRAQ"]) == (sql, ["%drone%", "IRAQ"])
+
+
+def test_template_not_reused_for_a_value_of_another_kind(load_lambda, monkeypatch):
+    aisearch = _load(load_lambda)
+    generated = []
+
+    def generate(question):
+        generated.append(question)
+        if "iran" in question:
+            return "SELECT * FROM tip_reports WHERE country = 'IRAN'"
+        return "SELECT * FROM tip_reports WHERE report_body ILIKE '%drones%'"
+
+    monkeypatch.setattr(aisearch, "generate_sql_query", generate)
+    conn = _known_values("IRAN", "IRAQ")
+
+    assert aisearch.get_sql_for_query("show me reports about iran", conn)[2] == "miss"
+
+    sql, params, level = aisearch.get_sql_for_query("show me reports about iraq", conn)
+    assert level == "template"
+    assert sql == "SELECT * FROM tip_reports WHERE country = %s"
+    assert params == ["IRAQ"]
+
+    sql, params, level = aisearch.get_sql_for_query("show me reports about drones", conn)
+    assert level == "miss"
+    assert params is None
+    assert sql == "SELECT * FROM tip_reports WHERE report_body ILIKE '%drones%'"
+    assert generated == ["show me reports about iran", "show me reports about drones"]
@@ -0,0 +1,183 @@
+import base64
+import io
+import json
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+from PIL import ImageDraw, ImageFont  # noqa: E402
+
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), "white").save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+@pytest.fixture
+def ocr(load_lambda, monkeypatch):
+    ocr = load_lambda("claude-ocr")
+    calls = {"lookup": 0, "preprocess": 0, "model": 0}
+
+    def lookup(fingerprints):
+        calls["lookup"] += 1
+        return {}
+
+    def preprocess(image_bytes, media_type, crop_margins=None):
+        calls["preprocess"] += 1
+        return image_bytes, media_type, {"applied": False}
+
+    def model(image_data, media_type, **options):
+        calls["model"] += 1
+        return "text", {"input_tokens": 10, "output_tokens": 2, "total_tokens": 12}
+
+    monkeypatch.setattr(ocr, "_cache_lookup", lookup)
+    monkeypatch.setattr(ocr, "_cache_store", lambda *args: None)
+    monkeypatch.setattr(ocr, "preprocess_image", preprocess)
+    monkeypatch.setattr(ocr, "_ocr_image", model)
+    monkeypatch.setattr(ocr, "OCR_PREPROCESS", True)
+    ocr.calls = calls
+    return ocr
+
+
+def test_string_false_flags_are_false(ocr):
+    body = {"image": _png(), "media_type": "image/png", "bypass_cache": "false", "preprocess": "false"}
+    response = ocr.handle_bedrock_call({"body": json.dumps(body)})
+
+    assert json.loads(response["body"])["cache"] == "miss"
+    assert ocr.calls == {"lookup": 1, "preprocess": 0, "model": 1}
+
+
+def test_string_true_flags_are_true(ocr):
+    body = {"images": [_png()], "bypass_cache": "True", "preprocess": "true"}
+    response = ocr.handle_batch_ocr({"body": json.dumps(body)})
+
+    assert json.loads(response["body"])["results"][0]["cache"] == "bypass"
+    assert ocr.calls == {"lookup": 0, "preprocess": 1, "model": 1}
+
+
+def test_absent_preprocess_uses_the_default(ocr):
+    assert ocr._cache_flags({}) == (False, None)
+    assert ocr._cache_flags({"bypass_cache": True, "preprocess": False}) == (True, False)
+
+
+def _screenshot(lines, size=(1000, 700), fmt="PNG", quality=None):
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    try:
+        font = ImageFont.load_default(size=22)
+    except TypeError:  # Pillow < 10.1
+        font = ImageFont.load_default()
+    for i, line in enumerate(lines):
+        draw.text((30, 30 + i * 34), line, fill="black", font=font)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **({"quality": quality} if quality else {}))
+    return buf.getvalue()
+
+
+LINES = [f"Message {i}: convoy spotted near checkpoint {i * 7} at 0{i}:30" for i in range(18)]
+
+
+def test_thumbnail_confirms_reencoded_copies_only(load_lambda):
+    ocr = load_lambda("claude-ocr")
+    original = ocr._image_fingerprint(_screenshot(LINES))
+    reencoded = ocr._image_fingerprint(_screenshot(LINES, fmt="JPEG", quality=40))
+    edited_lines = list(LINES)
+    edited_lines[5] = edited_lines[5].replace("35", "85")
+    edited = ocr._image_fingerprint(_screenshot(edited_lines))
+
+    assert original[0] != reencoded[0]
+    assert ocr._hamming(original[1], edited[1]) <= ocr.OCR_PHASH_MAX_DISTANCE  # the dHash alone can't tell
+    assert ocr._same_thumbnail(original[4], reencoded[4])
+    assert not ocr._same_thumbnail(original[4], edited[4])
+
+
+def test_near_hits_are_off_by_default(load_lambda):
+    ocr = load_lambda("claude-ocr")
+    assert ocr.OCR_NEAR_HITS is False
+    cur = mock.MagicMock()
+    cur.fetchall.return_value = []
+    ocr.db_connection.return_value.__enter__.return_value.cursor.return_value = cur
+
+    assert ocr._cache_lookup([ocr._image_fingerprint(_screenshot(LINES))]) == {}
+    assert cur.execute.call_count == 1  # the exact-hash lookup only
+
+
+class _SmallPool:
+    """Stands in for common.db's pool: a fixed number of connections, PoolError when exhausted."""
+
+    def __init__(self, maxconn):
+        self.maxconn, self.in_use, self.checkouts = maxconn, 0, 0
+        self.lock = threading.Lock()
+        self.cursor = mock.MagicMock()
+        self.cursor.fetchall.return_value = [("cached", "from cache")]
+
+    @contextmanager
+    def connection(self):
+        with self.lock:
+            if self.in_use >= self.maxconn:
+                raise RuntimeError("connection pool exhausted")
+            self.in_use += 1
+            self.checkouts += 1
+        try:
+            conn = mock.MagicMock()
+            conn.cursor.return_value = self.cursor
+            yield conn
+        finally:
+            with self.lock:
+                self.in_use -= 1
+
+
+def _colour_png(i):
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), (i * 20, 255 - i * 20, 90)).save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def test_batch_larger_than_the_pool_checks_cache_once(load_lambda, monkeypatch):
+    ocr = load_lambda("claude-ocr", OCR_CONCURRENCY="4")
+    pool = _SmallPool(maxconn=2)
+    monkeypatch.setattr(ocr, "db_connection", pool.connection)
+    images = [_colour_png(i) for i in range(10)]
+    cached_hash = ocr._decode_image(images[3])[1][0]
+    pool.cursor.fetchall.return_value = [(cached_hash, "from cache")]
+
+    model_threads = set()
+
+    def model(image_data, media_type, **options):
+        model_threads.add(threading.current_thread().name)
+        time.sleep(0.02)  # keep the workers overlapping
+        return f"text {images.index(image_data)}", {"input_tokens": 10, "output_tokens": 2, "total_tokens": 12}
+
+    monkeypatch.setattr(ocr, "_ocr_image", model)
+    response = ocr.handle_batch_ocr({"body": json.dumps({"images": images, "preprocess": "false"})})
+
+    body = json.loads(response["body"])
+    assert body["failed"] == 0
+    assert [r["cache"] for r in body["results"]].count("hit") == 1
+    assert body["results"][3]["extracted_text"] == "from cache"
+    assert body["results"][7]["extracted_text"] == "text 7"
+    assert len(model_threads) > 1
+    # One connection for the lookup, one for the store, however many workers ran
+    assert pool.checkouts == 2
+    stored = pool.cursor.executemany.call_args.args[1]
+    assert len(stored) == 9
+
+
+def test_jpg_output_is_sent_as_image_jpeg(load_lambda):
+    ocr = load_lambda("claude-ocr", OCR_OUTPUT_FORMAT="JPG")
+    buf = io.BytesIO()
+    Image.new("RGB", (2000, 1500), "white").save(buf, format="PNG")
+
+    data, media_type, _stats = ocr.preprocess_image(buf.getvalue(), "image/png")
+    assert media_type == "image/jpeg"
+    assert Image.open(io.BytesIO(data)).format == "JPEG"
+
+
+def test_unknown_output_format_fails_at_load(load_lambda):
+    with pytest.raises(RuntimeError, match="OCR_OUTPUT_FORMAT"):
+        load_lambda("claude-ocr", OCR_OUTPUT_FORMAT="gif")
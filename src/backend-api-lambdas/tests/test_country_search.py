@@ -0,0 +1,19 @@
+import json
+
+import pytest
+
+from common import gazetteer
+
+
+@pytest.mark.parametrize("location", ["", "  ", "---", "?!", "'"])
+def test_punctuation_only_fuzzy_location_is_rejected(load_lambda, tmp_path, location):
+    snapshot = str(tmp_path / "gazetteer.bin")
+    gazetteer.build_snapshot([("Mosul", "38SLF3437", "Ninawa", "Iraq")], snapshot)
+
+    for env in ({}, {"GAZETTEER_SNAPSHOT": snapshot}):
+        search = load_lambda("country-search", **env)
+        event = {"httpMethod": "GET", "queryStringParameters": {"country": "Iraq", "location": location, "mode": "fuzzy"}}
+        response = search.lambda_handler(event, None)
+
+        assert response["statusCode"] == 400
+        search.db_connection.assert_not_called()
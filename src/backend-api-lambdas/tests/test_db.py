@@ -0,0 +1,120 @@
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+from conftest import LAMBDA_DIR
+
+IDLE, IN_TRANSACTION = 0, 2
+
+
+class _Error(Exception):
+    pass
+
+
+class _OperationalError(_Error):
+    pass
+
+
+class _Conn:
+    def __init__(self, n):
+        self.n, self.closed, self.dead, self.rollbacks = n, 0, False, 0
+        self.info = types.SimpleNamespace(transaction_status=IDLE)
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                if conn.dead:
+                    raise _OperationalError("server closed the connection")
+
+        return Cursor()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = IDLE
+
+
+class _Pool:
+    """ThreadedConnectionPool stand-in that hands out numbered connections."""
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.closed, self.idle, self.opened, self.discarded = False, [], 0, []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.opened += 1
+        return _Conn(self.opened)
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.closed = 1
+            self.discarded.append(conn.n)
+        else:
+            self.idle.append(conn)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    psycopg2 = types.ModuleType("psycopg2")
+    psycopg2.Error, psycopg2.OperationalError = _Error, _OperationalError
+    psycopg2.pool = types.SimpleNamespace(ThreadedConnectionPool=_Pool)
+    psycopg2.extensions = types.SimpleNamespace(TRANSACTION_STATUS_IDLE=IDLE)
+    monkeypatch.setitem(sys.modules, "psycopg2", psycopg2)
+    for key, value in {"DB_ENDPOINT": "db", "DB_USERNAME": "u", "DB_PASSWORD": "p", "DB_NAME": "tipjar"}.items():
+        monkeypatch.setenv(key, value)
+
+    spec = importlib.util.spec_from_file_location("common_db_under_test", os.path.join(LAMBDA_DIR, "common", "db.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_connection_is_reused_and_left_clean(db):
+    with db.db_connection() as conn:
+        conn.info.transaction_status = IN_TRANSACTION
+    with db.db_connection() as again:
+        assert again is conn
+    assert conn.rollbacks == 1
+
+    pool = next(iter(db._pools.values()))
+    assert pool.opened == 1 and pool.discarded == []
+
+
+def test_connection_lost_mid_request_is_not_handed_out_again(db):
+    with pytest.raises(_OperationalError):
+        with db.db_connection() as conn:
+            raise _OperationalError("server closed the connection")
+
+    with db.db_connection() as replacement:
+        assert replacement is not conn
+    assert next(iter(db._pools.values())).discarded == [conn.n]
+
+
+def test_stale_idle_connection_is_pinged_and_replaced(db, monkeypatch):
+    with db.db_connection() as conn:
+        pass
+    conn.dead = True
+    monkeypatch.setitem(db._last_used, id(conn), db._last_used[id(conn)] - db.POOL_PING_AFTER - 1)
+
+    with db.db_connection() as fresh:
+        assert fresh is not conn
+    assert next(iter(db._pools.values())).discarded == [conn.n]
+
+
+def test_separate_credentials_get_their_own_pool(db):
+    with db.db_connection():
+        pass
+    with db.db_connection(host="db", user="search_ro", password="x", dbname="tipjar", port=5432):
+        pass
+    assert len(db._pools) == 2
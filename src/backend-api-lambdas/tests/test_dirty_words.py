@@ -0,0 +1,42 @@
+import json
+from unittest import mock
+
+WORDS = [
+    {"id": 1, "dirty_word": "Project Alpha", "word_classification": "CUIREL"},
+    {"id": 2, "dirty_word": "alpha", "word_classification": "CUI"},
+]
+
+
+def _cursor():
+    cur = mock.MagicMock()
+    cur.fetchone.return_value = {"version": 7}
+    cur.fetchall.return_value = WORDS
+    return cur
+
+
+def test_scan_route_is_reached_through_the_id_path(load_lambda):
+    dirty_words = load_lambda("dirty-words")
+    cur = _cursor()
+    dirty_words.db_connection.return_value.__enter__.return_value.cursor.return_value = cur
+
+    # The real API Gateway event: POST /dirty_words/{id} with id = "scan"
+    event = {
+        "httpMethod": "POST",
+        "path": "/dirty_words/scan",
+        "resource": "/dirty_words/{id}",
+        "pathParameters": {"id": "scan"},
+        "body": json.dumps({"text": "Notes on project alpha, alphabet and ALPHA."}),
+    }
+    response = dirty_words.lambda_handler(event, None)
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert [(m["word"], m["start"]) for m in body["matches"]] == [("Project Alpha", 9), ("alpha", 17), ("alpha", 37)]
+    assert body["highest_classification"] == "CUIREL"
+
+
+def test_non_integer_id_is_still_rejected(load_lambda):
+    dirty_words = load_lambda("dirty-words")
+    dirty_words.db_connection.return_value.__enter__.return_value.cursor.return_value = _cursor()
+    event = {"httpMethod": "GET", "path": "/dirty_words/abc", "pathParameters": {"id": "abc"}}
+    assert dirty_words.lambda_handler(event, None)["statusCode"] == 400
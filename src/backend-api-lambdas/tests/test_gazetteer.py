@@ -0,0 +1,45 @@
+from common import gazetteer
+
+ROWS = [
+    ("Khan Younis", "36RXV0818", "Khan Yunis", "Gaza"),
+    ("Al Mawsil Al Jadidah", None, "Ninawa", "Iraq"),
+    ("Mosul", "38SLF3437", "Ninawa", "Iraq"),
+    ("Zakho", "", "Dahuk", "Iraq"),
+]
+
+
+def _snapshot(tmp_path):
+    path = str(tmp_path / "gazetteer.bin")
+    gazetteer.build_snapshot(ROWS, path)
+    return gazetteer.Gazetteer(path)
+
+
+def test_missing_mgrs_is_null_like_sql(tmp_path):
+    gaz = _snapshot(tmp_path)
+
+    zakho = gaz.search("Iraq", "Zakho")[0]
+    assert zakho["mgrs"] is None
+    assert zakho["lat"] is None and zakho["lon"] is None
+    assert gaz.search("Iraq", "Mosul")[0]["mgrs"] == "38SLF3437"
+    assert {r[0]: r[1] for r in gaz.rows()}["Al Mawsil Al Jadidah"] is None
+
+
+def test_country_matches_case_insensitively_like_sql(tmp_path):
+    gaz = _snapshot(tmp_path)
+    assert gaz.search("IRAQ", "mosul")[0]["location"] == "Mosul"
+    assert gaz.search("gaza", "khan yunis")[0]["location"] == "Khan Younis"
+
+
+def test_keys_match_gazetteer_key():
+    # Expected values follow sql/004 gazetteer_key: Arabic articles (twice), not "the"
+    assert gazetteer.translit_key("Khan Younis") == gazetteer.translit_key("Khan Yunis") == "khn yns"
+    assert gazetteer.translit_key("Wadi al as Sirr") == "wd sr"
+    assert gazetteer.translit_key("The Hague") == "th hg"
+    assert gazetteer.normalize("Łódź Ørsted Straße") == "lodz orsted strasse"
+
+
+def test_misspellings_are_found_through_the_trigram_index(tmp_path):
+    gaz = _snapshot(tmp_path)
+    assert gaz.search("Iraq", "Mosol")[0]["location"] == "Mosul"
+    assert [r["location"] for r in gaz.search("Gaza", "Khan Yonis")] == ["Khan Younis"]
+    assert gaz.search("Iraq", "Kabul") == []
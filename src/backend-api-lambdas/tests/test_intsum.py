@@ -0,0 +1,96 @@
+import json
+
+
+def _chunk(data):
+    return {"chunk": {"bytes": json.dumps(data).encode("utf-8")}}
+
+
+def _stream_response(texts, input_tokens=120, output_tokens=7):
+    events = [_chunk({"type": "message_start", "message": {"usage": {"input_tokens": input_tokens, "output_tokens": 1}}})]
+    events.append(_chunk({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}))
+    for text in texts:
+        events.append(_chunk({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}}))
+    events.append(_chunk({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": output_tokens}}))
+    events.append(_chunk({"type": "message_stop"}))
+    return {"body": iter(events)}
+
+
+def _load(load_lambda, monkeypatch):
+    intsum = load_lambda("intsum")
+    stored = []
+    monkeypatch.setattr(intsum, "_get_cached_summary", lambda key: None)
+    monkeypatch.setattr(intsum, "_store_summary", lambda *args: stored.append(args))
+    return intsum, stored
+
+
+def test_stream_emits_deltas_then_done_with_usage(load_lambda, monkeypatch):
+    intsum, stored = _load(load_lambda, monkeypatch)
+    intsum.bedrock_client.invoke_model_with_response_stream.return_value = _stream_response(
+        ["During this reporting period,", " the IDF", " conducted strikes."]
+    )
+
+    event = {"httpMethod": "POST", "body": json.dumps({"reports": ["IDF strikes in Gaza."], "stream": True})}
+    response = intsum.lambda_handler(event, None)
+
+    assert response["statusCode"] == 200
+    assert response["headers"]["Content-Type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response["body"].splitlines()]
+    assert [e["text"] for e in events[:-1]] == ["During this reporting period,", " the IDF", " conducted strikes."]
+    assert all(e["type"] == "delta" for e in events[:-1])
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["cached"] is False
+    assert done["mode"] == "single"
+    assert done["usage"] == {"input_tokens": 120, "output_tokens": 7}
+    assert stored[0][2] == "During this reporting period, the IDF conducted strikes."
+    intsum.bedrock_client.invoke_model.assert_not_called()
+
+
+def test_stream_flag_string_false_is_not_streamed(load_lambda, monkeypatch):
+    intsum, _ = _load(load_lambda, monkeypatch)
+    assert intsum._wants_stream({"stream": "true"})
+    assert intsum._wants_stream({"stream": "TRUE"})
+    assert not intsum._wants_stream({"stream": "false"})
+    assert not intsum._wants_stream({"stream": 0})
+    assert not intsum._wants_stream({})
+
+    called = []
+    monkeypatch.setattr(intsum, "handle_generate_summary", lambda event: called.append(event) or {"statusCode": 200, "body": "{}"})
+    event = {"httpMethod": "POST", "body": json.dumps({"reports": ["x"], "stream": "false"})}
+    intsum.lambda_handler(event, None)
+    assert called
+    intsum.bedrock_client.invoke_model_with_response_stream.assert_not_called()
+
+
+def test_oversized_report_is_split_not_truncated(load_lambda, monkeypatch):
+    intsum, _ = _load(load_lambda, monkeypatch)
+    sentences = [f"Sentence {i} describes event number {i} in detail." for i in range(200)]
+    long_report = " ".join(sentences)
+    reports = ["Short report about Iraq.", long_report]
+
+    chunks = intsum._chunk_reports(reports, 300)
+
+    pieces = [p for chunk in chunks for p in chunk]
+    assert all(intsum._estimate_tokens(p) <= 300 for p in pieces)
+    assert len(chunks) > 2
+    rejoined = " ".join(p.removeprefix("(continued) ") for p in pieces[1:])
+    assert rejoined == long_report
+    assert all(p.startswith("(continued) ") for p in pieces[2:])
+
+
+def test_summary_cache_key_depends_on_mode(load_lambda, monkeypatch):
+    intsum, _ = _load(load_lambda, monkeypatch)
+    reports = ["Report one.", "Report two."]
+    assert intsum._summary_cache_key("INTSUM", reports, "single") != intsum._summary_cache_key("INTSUM", reports, "hierarchical")
+    assert intsum._summary_cache_key("INTSUM", reports, "single") == intsum._summary_cache_key("INTSUM", reports[::-1], "single")
+
+
+def test_map_prompt_edit_retires_hierarchical_entries(load_lambda, monkeypatch):
+    intsum, _ = _load(load_lambda, monkeypatch)
+    reports = ["Report one.", "Report two."]
+    single = intsum._summary_cache_key("INTSUM", reports, "single")
+    hierarchical = intsum._summary_cache_key("INTSUM", reports, "hierarchical")
+
+    monkeypatch.setattr(intsum, "MAP_SYSTEM_PROMPT", intsum.MAP_SYSTEM_PROMPT + "\nKeep every date.")
+    assert intsum._summary_cache_key("INTSUM", reports, "hierarchical") != hierarchical
+    assert intsum._summary_cache_key("INTSUM", reports, "single") == single
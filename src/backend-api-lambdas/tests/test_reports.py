@@ -0,0 +1,237 @@
+import json
+from unittest import mock
+
+
+def test_bulk_route_wins_over_report_id(load_lambda, monkeypatch):
+    reports = load_lambda("reports")
+    called = []
+    monkeypatch.setattr(reports, "bulk_create_reports", lambda cur, conn, event: called.append(event) or {"statusCode": 200, "body": "{}"})
+
+    # Behind a /reports/{id} resource API Gateway hands "bulk" over as the id
+    event = {"httpMethod": "POST", "path": "/reports/bulk", "pathParameters": {"id": "bulk"}, "body": json.dumps({"reports": []})}
+    response = reports.lambda_handler(event, None)
+
+    assert response["statusCode"] == 200
+    assert called
+
+
+def test_non_uuid_report_id_is_rejected(load_lambda):
+    reports = load_lambda("reports")
+    event = {"httpMethod": "GET", "path": "/reports/nope", "pathParameters": {"id": "nope"}}
+    assert reports.lambda_handler(event, None)["statusCode"] == 400
+
+
+def test_rollup_includes_undated_reports(load_lambda):
+    reports = load_lambda("reports")
+    cur = mock.MagicMock()
+    cur.fetchall.side_effect = [
+        [],
+        [("a", "2025-10-05", False), ("b", None, True)],
+    ]
+    cur.description = [("id",), ("doi_date",), ("undated",)]
+    event = {"queryStringParameters": {"from": "2025-10-01", "to": "2025-10-07", "include": "reports", "fields": "id"}}
+
+    response = reports.get_report_rollup(cur, event)
+
+    body = json.loads(response["body"])
+    assert body["undated"] == 1
+    assert [r["id"] for r in body["results"]] == ["a", "b"]
+    sql, params = cur.execute.call_args_list[-1].args
+    assert "doi_date IS NULL AND created_on >= %s AND created_on < %s" in sql
+    assert str(params[-1]) == "2025-10-08"
+
+
+def test_rollup_rejects_ranges_over_the_cap(load_lambda):
+    reports = load_lambda("reports")
+    event = {"queryStringParameters": {"from": "2025-01-01", "to": "2025-06-01"}}
+    assert reports.get_report_rollup(mock.MagicMock(), event)["statusCode"] == 400
+
+
+def test_csv_export_joins_array_columns(load_lambda):
+    reports = load_lambda("reports")
+    cur = mock.MagicMock()
+    cur.fetchmany.side_effect = [[("a", ["17208", "17245"], None, "2025-10-05"), ("b", [], "Title", "2025-10-06")], []]
+    conn = mock.MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cur
+
+    qp = {"fields": "id,requirements,title,created_on"}
+    body = b"".join(reports.iter_export(conn, qp, "csv")).decode("utf-8")
+
+    assert body.splitlines() == [
+        "id,requirements,title,created_on",
+        "a,17208;17245,,2025-10-05",
+        "b,,Title,2025-10-06",
+    ]
+
+
+def test_repeated_fields_are_selected_once(load_lambda):
+    reports = load_lambda("reports")
+
+    assert reports._select_fields({"fields": "created_on,title,created_on"}, "created_on") == ["created_on", "title", "id"]
+    assert reports._select_fields({"fields": "id, title,id"}, "created_on") == ["id", "title", "created_on"]
+
+
+def _page_cursor(cols, rows):
+    cur = mock.MagicMock()
+    cur.fetchall.return_value = rows
+    cur.description = [(c,) for c in cols]
+    return cur
+
+
+def test_cursor_paging_seeks_past_the_last_row(load_lambda):
+    reports = load_lambda("reports")
+    qp = {"paging": "cursor", "limit": "2", "total": "none", "fields": "id,created_on"}
+    cur = _page_cursor(["id", "created_on"], [("c", "2025-10-07"), ("b", "2025-10-05"), ("a", "2025-10-05")])
+
+    body = json.loads(reports.get_all_reports(cur, {"queryStringParameters": qp})["body"])
+    assert [r["id"] for r in body["results"]] == ["c", "b"]
+    assert body["has_more"] is True
+    assert reports._decode_cursor(body["next_cursor"]) == {"s": "created_on", "o": "DESC", "v": "2025-10-05", "id": "b"}
+    assert "OFFSET" not in cur.execute.call_args.args[0]
+
+    cur = _page_cursor(["id", "created_on"], [("a", "2025-10-05")])
+    qp = {"cursor": body["next_cursor"], "limit": "2", "total": "none", "fields": "id,created_on"}
+    body = json.loads(reports.get_all_reports(cur, {"queryStringParameters": qp})["body"])
+    sql, params = cur.execute.call_args.args
+    assert "((created_on, id) < (%s, %s) OR created_on IS NULL)" in sql
+    assert params == ("2025-10-05", "b", 3)
+    assert body["has_more"] is False and body["next_cursor"] is None
+
+
+def test_cursor_for_another_sort_or_garbage_is_rejected(load_lambda):
+    reports = load_lambda("reports")
+    token = reports._encode_cursor("created_on", "ASC", {"created_on": "2025-10-05", "id": "b"})
+
+    for qp in ({"cursor": token}, {"cursor": "not-a-cursor"}):
+        assert reports.get_all_reports(mock.MagicMock(), {"queryStringParameters": qp})["statusCode"] == 400
+
+
+def test_keyset_clause_walks_the_trailing_nulls_by_id(load_lambda):
+    reports = load_lambda("reports")
+    assert reports._keyset_clause("country", "ASC", None, "b") == ("(country IS NULL AND id > %s)", ["b"])
+
+
+def test_exact_total_rides_along_with_the_page(load_lambda):
+    reports = load_lambda("reports")
+    qp = {"fields": "id,created_on", "country": "IRAQ"}
+    cur = _page_cursor(["id", "created_on", "_total"], [("b", "2025-10-06", 7), ("a", "2025-10-05", 7)])
+
+    body = json.loads(reports.get_all_reports(cur, {"queryStringParameters": qp})["body"])
+    assert body["total"] == 7 and body["total_mode"] == "exact"
+    assert body["results"] == [{"id": "b", "created_on": "2025-10-06"}, {"id": "a", "created_on": "2025-10-05"}]
+    assert "WITH total AS (SELECT COUNT(*) AS n FROM tip_reports WHERE country = %s)" in cur.execute.call_args.args[0]
+
+    # Past the last page the LEFT JOIN still returns the count, on a row with no report
+    cur = _page_cursor(["id", "created_on", "_total"], [(None, None, 7)])
+    body = json.loads(reports.get_all_reports(cur, {"queryStringParameters": {**qp, "offset": "50"}})["body"])
+    assert body["total"] == 7 and body["results"] == []
+
+
+def test_estimate_and_none_totals_skip_the_count(load_lambda):
+    reports = load_lambda("reports")
+    qp = {"fields": "id,created_on", "total": "estimate"}
+    cur = _page_cursor(["id", "created_on"], [("a", "2025-10-05")])
+    cur.fetchone.return_value = ('[{"Plan": {"Plan Rows": 1200}}]',)
+
+    body = json.loads(reports.get_all_reports(cur, {"queryStringParameters": qp})["body"])
+    assert body["total"] == 1200
+    assert [c.args[0].split()[0] for c in cur.execute.call_args_list] == ["SELECT", "EXPLAIN"]
+
+    cur = _page_cursor(["id", "created_on"], [("a", "2025-10-05")])
+    body = json.loads(reports.get_all_reports(cur, {"queryStringParameters": {**qp, "total": "none"}})["body"])
+    assert body["total"] is None
+    assert "COUNT" not in cur.execute.call_args.args[0]
+    assert cur.execute.call_count == 1
+
+    assert reports.get_all_reports(cur, {"queryStringParameters": {"total": "all"}})["statusCode"] == 400
+
+
+def test_bulk_falls_back_to_savepoints_for_a_bad_row(load_lambda, monkeypatch):
+    reports = load_lambda("reports")
+    statements = []
+
+    def execute_values(cur, sql, values, template=None, page_size=None, fetch=False):
+        statements.append(len(values))
+        if len(values) > 1 or values[0][-1] == "too long":
+            error = reports.psycopg2.Error("value too long")
+            error.pgerror = "ERROR:  value too long for type character varying(10)\n"
+            raise error
+        return [(f"id-{len(statements)}",)]
+
+    monkeypatch.setattr(reports, "execute_values", execute_values)
+    cur, conn = mock.MagicMock(), mock.MagicMock()
+    body = "\n".join([
+        json.dumps({"created_by": "A1", "report_body": "first"}),
+        "{not json",
+        json.dumps({"created_by": "A1", "report_body": "too long"}),
+        json.dumps({"created_by": "A1", "report_body": "third", "title": "T"}),
+        json.dumps({"created_by": "A1"}),
+    ])
+
+    response = reports.bulk_create_reports(cur, conn, {"body": body})
+    payload = json.loads(response["body"])
+
+    assert response["statusCode"] == 200
+    assert (payload["inserted"], payload["failed"]) == (2, 3)
+    results = payload["results"]
+    assert "id" in results[0] and "id" in results[3]
+    assert results[1]["error"].startswith("Invalid JSON")
+    assert results[2]["error"] == "ERROR:  value too long for type character varying(10)"
+    assert results[4]["error"] == "created_by and report_body are required"
+    # The batch failed on its first multi-row statement, then each valid row was retried alone
+    assert statements[0] == 2 and statements[1:] == [1, 1, 1]
+    executed = [c.args[0] for c in cur.execute.call_args_list]
+    assert executed.count("SAVEPOINT bulk_row;") == 3
+    assert executed.count("ROLLBACK TO SAVEPOINT bulk_row;") == 1
+    conn.rollback.assert_called_once()
+
+
+def test_relevance_ranks_matches_and_adds_headlines(load_lambda):
+    reports = load_lambda("reports")
+    qp = {"sort": "relevance", "q": '"drone strike" -exercise', "country": "IRAQ", "total": "none", "limit": "10"}
+    cur = _page_cursor(["id", "title", "rank", "headline"], [("b", "B", 0.9, "a <mark>drone</mark> strike"), ("a", "A", 0.4, "...")])
+
+    body = json.loads(reports.get_all_reports(cur, {"queryStringParameters": qp})["body"])
+    assert [r["id"] for r in body["results"]] == ["b", "a"]
+    assert body["results"][0]["headline"] == "a <mark>drone</mark> strike"
+
+    sql, params = cur.execute.call_args.args
+    assert "ts_rank_cd(search_vector, websearch_to_tsquery('english', %s)) AS rank" in sql
+    assert "ts_headline('english', coalesce(t.report_body, ''), websearch_to_tsquery('english', %s), %s)" in sql
+    assert sql.rstrip(";").endswith("ORDER BY p.rank DESC, p.id DESC")
+    # The body is swapped for the headline unless asked for by name
+    inner_select = sql[sql.index("FROM (SELECT"):].split(" FROM tip_reports")[0]
+    assert "report_body" not in inner_select
+    q = qp["q"]
+    assert params == (q, reports.HEADLINE_OPTIONS, q, q, "IRAQ", 11, 0)
+
+
+def test_relevance_needs_a_query_and_offset_paging(load_lambda):
+    reports = load_lambda("reports")
+    for qp in ({"sort": "relevance"}, {"sort": "relevance", "q": "drone", "paging": "cursor"}):
+        assert reports.get_all_reports(mock.MagicMock(), {"queryStringParameters": qp})["statusCode"] == 400
+
+
+def test_facets_are_grouped_ranked_and_cached(load_lambda):
+    reports = load_lambda("reports")
+    cur = mock.MagicMock()
+    cur.fetchall.return_value = [
+        ("total", None, 9),
+        ("country", "IRAQ", 3), ("country", "SYRIA", 5), ("country", None, 1),
+        ("source_platform", "X", 9),
+        ("category", "17208", 4), ("category", "17245", 4), ("category", "16692", 2),
+    ]
+    event = {"queryStringParameters": {"country_like": "true", "q": "drone", "facet_limit": "2", "offset": "50"}}
+
+    body = json.loads(reports.get_report_facets(cur, event)["body"])
+    assert body["total"] == 9
+    assert body["facets"]["country"] == [{"value": "SYRIA", "count": 5}, {"value": "IRAQ", "count": 3}]
+    assert body["facets"]["category"] == [{"value": "17208", "count": 4}, {"value": "17245", "count": 4}]
+    assert body["facets"]["macom"] == []
+    assert "GROUP BY GROUPING SETS ((country), (source_platform), (macom), (overall_classification), ())" in cur.execute.call_args.args[0]
+    assert cur.execute.call_args.args[1] == ("drone",)
+
+    # Another page of the same search is served from the cache
+    event["queryStringParameters"]["offset"] = "100"
+    assert json.loads(reports.get_report_facets(cur, event)["body"])["cached"] is True
+    assert cur.execute.call_count == 1
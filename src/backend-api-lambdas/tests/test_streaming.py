@@ -0,0 +1,62 @@
+import gzip
+import http.client
+import json
+import threading
+from http.server import HTTPServer
+
+import pytest
+
+from common import streaming
+
+
+@pytest.fixture
+def start_server():
+    servers = []
+
+    def start(lambda_handler, stream):
+        server = HTTPServer(("127.0.0.1", 0), streaming.make_handler(lambda_handler, stream))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_event_maps_resource_id_and_query():
+    event = streaming.build_event("GET", "/reports/abc?format=csv", {"X-Test": "1"}, "")
+    assert event["pathParameters"] == {"id": "abc"}
+    assert event["queryStringParameters"] == {"format": "csv"}
+    assert streaming.build_event("GET", "/reports", {}, "")["pathParameters"] is None
+
+
+def test_reports_export_is_streamed_in_chunks(load_lambda, monkeypatch, start_server):
+    reports = load_lambda("reports")
+    monkeypatch.setattr(reports, "iter_export", lambda conn, qp, fmt: iter([b'{"a":1}\n', b'{"a":2}\n']))
+    handled = []
+
+    def lambda_handler(event, context):
+        handled.append(event)
+        return {"statusCode": 200, "body": json.dumps({"path": event["path"]})}
+
+    client = start_server(lambda_handler, reports.stream_export)
+
+    client.request("GET", "/reports/export?gzip=true")
+    response = client.getresponse()
+    assert response.status == 200
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert response.getheader("Access-Control-Allow-Origin")
+    assert gzip.decompress(response.read()) == b'{"a":1}\n{"a":2}\n'
+
+    client.request("GET", "/reports/export?format=xml")
+    response = client.getresponse()
+    assert response.status == 400
+    assert "format must be one of" in json.loads(response.read())["message"]
+
+    client.request("GET", "/reports/facets")
+    response = client.getresponse()
+    assert json.loads(response.read()) == {"path": "/reports/facets"}
+    assert [e["path"] for e in handled] == ["/reports/facets"]
@@ -0,0 +1,99 @@
+import json
+from unittest import mock
+
+import pytest
+
+
+@pytest.fixture
+def translate(load_lambda):
+    translate = load_lambda("translate", TRANSLATION_MEMORY_MAX_ROWS="1000")
+    translate.calls = []
+
+    def translate_text(Text, SourceLanguageCode, TargetLanguageCode):
+        translate.calls.append((Text, SourceLanguageCode))
+        if Text == "boom":
+            error = translate.ClientError("boom")
+            error.response = {"Error": {"Code": "ValidationException", "Message": "bad text"}}
+            raise error
+        return {"TranslatedText": Text.upper(), "SourceLanguageCode": "ar" if SourceLanguageCode == "auto" else SourceLanguageCode}
+
+    translate.translate_client.translate_text.side_effect = translate_text
+    return translate
+
+
+def test_batch_dedupes_and_serves_memory_hits(translate, monkeypatch):
+    known = translate._segment_hash("salam")
+    stored = []
+    monkeypatch.setattr(translate, "_memory_lookup", lambda src, tgt, hashes: {known: ("hello", "fa")} if known in hashes else {})
+    monkeypatch.setattr(translate, "_memory_store", lambda src, tgt, entries: stored.extend(entries))
+
+    segments = ["marhaba", "salam", "  ", "marhaba", "boom"]
+    results, stats = translate._translate_segments(segments, "auto", "en")
+
+    assert results[0] == results[3] == {"translatedText": "MARHABA", "sourceLanguage": "ar", "cached": False}
+    assert results[1] == {"translatedText": "hello", "sourceLanguage": "fa", "cached": True}
+    assert results[2] == {"translatedText": "  ", "sourceLanguage": None, "cached": False}
+    assert results[4] == {"error": "Invalid parameter: bad text"}
+    assert sorted(text for text, _ in translate.calls) == ["boom", "marhaba"]
+    # Only successful translations are remembered
+    assert [(text, translated) for _, text, translated, _ in stored] == [("marhaba", "MARHABA")]
+    assert stats == {"segments": 5, "unique": 3, "memory_hits": 1, "translated": 1, "failed": 1,
+                     "hit_rate": 0.5, "memory_hit_rate": 0.333}
+
+
+def test_memory_hits_refresh_recency_and_store_trims_the_oldest(translate):
+    conn = mock.MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchall.return_value = [("h1", "hello", "ar")]
+    translate.db_connection.return_value.__enter__.return_value = conn
+
+    assert translate._memory_lookup("auto", "en", ["h1", "h2"]) == {"h1": ("hello", "ar")}
+    sql = cur.execute.call_args.args[0]
+    assert "SET last_hit_on = NOW(), hit_count = hit_count + 1" in sql
+
+    translate._memory_store("auto", "en", [("h2", "marhaba", "MARHABA", "ar")])
+    assert cur.executemany.call_args.args[1] == [("auto", "en", "h2", "marhaba", "MARHABA", "ar")]
+    sql, params = cur.execute.call_args.args
+    assert "ORDER BY last_hit_on DESC OFFSET %s" in sql
+    assert params == (1000,)
+
+
+def test_memory_outage_does_not_block_translation(translate):
+    translate.db_connection.side_effect = Exception("could not connect")
+    results, stats = translate._translate_segments(["marhaba"], "auto", "en")
+    assert results == [{"translatedText": "MARHABA", "sourceLanguage": "ar", "cached": False}]
+    assert stats["memory_hits"] == 0
+
+
+def test_chunks_stay_under_the_byte_cap_and_rejoin_exactly(translate):
+    paragraph = "Первое предложение здесь. Second sentence follows! 第三句。 " * 6
+    text = "  " + paragraph.strip() + "\n\n" + paragraph.strip() + "\n\nhttps://example.com/" + "x" * 150 + "  "
+
+    triples = translate.split_for_translation(text, limit=120)
+    assert all(len(core.encode("utf-8")) <= 120 for _, core, _ in triples)
+    assert "".join(lead + core + trail for lead, core, trail in triples) == text
+    # Paragraph and sentence ends are preferred; only the unbroken URL is cut mid-run
+    assert all(core.endswith("。") for _, core, _ in triples[:-2])
+    assert [len(core) for _, core, _ in triples[-2:]] == [120, 50]
+
+
+def test_document_detects_language_once_then_fans_out(translate):
+    text = "\n\n".join(["Jumla wahid." * 5, "Jumla ithnan." * 5, "Jumla thalath." * 5])
+    event = {"body": json.dumps({"text": text, "targetLang": "en"})}
+    with mock.patch.object(translate, "TRANSLATE_CHUNK_BYTES", 80):
+        response = translate.handle_document_translation(event)
+
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200
+    assert body["chunks"] == 3 and body["sourceLanguage"] == "ar"
+    assert body["translatedText"] == text.upper()
+    assert [src for _, src in translate.calls] == ["auto", "ar", "ar"]
+
+
+def test_document_reports_the_failed_chunk(translate):
+    event = {"body": json.dumps({"text": "fine.\n\nboom", "targetLang": "en", "sourceLang": "ar"})}
+    with mock.patch.object(translate, "TRANSLATE_CHUNK_BYTES", 6):
+        response = translate.handle_document_translation(event)
+
+    assert response["statusCode"] == 502
+    assert json.loads(response["body"])["message"] == "Chunk 2 of 2 failed: Invalid parameter: bad text"
@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+from common import utils
+
+UPDATED = datetime(2025, 10, 5, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_bodies(monkeypatch):
+    monkeypatch.setattr(utils, "_versioned_bodies", {})
+
+
+def _cursor(version):
+    cur = mock.MagicMock()
+    cur.fetchone.return_value = {"version": version, "updated_on": UPDATED}
+    return cur
+
+
+def test_matching_etag_gets_304_without_building_the_body():
+    build = mock.MagicMock(return_value=[{"platform": "X"}])
+    event = {"headers": {"if-none-match": 'W/"platforms-4"'}}
+
+    response = utils.versioned_response(_cursor(4), event, "platforms", build)
+    assert response["statusCode"] == 304
+    assert response["headers"]["ETag"] == '"platforms-4"'
+    assert response["headers"]["Last-Modified"] == "Sun, 05 Oct 2025 12:00:00 GMT"
+    build.assert_not_called()
+
+
+def test_body_is_rebuilt_only_when_the_version_moves():
+    build = mock.MagicMock(return_value=[{"platform": "X"}])
+
+    first = utils.versioned_response(_cursor(4), {}, "platforms", build)
+    again = utils.versioned_response(_cursor(4), {"headers": {"If-None-Match": '"platforms-3"'}}, "platforms", build)
+    assert first["statusCode"] == again["statusCode"] == 200
+    assert again["body"] == first["body"] == '[{"platform": "X"}]'
+    assert build.call_count == 1
+
+    utils.versioned_response(_cursor(5), {}, "platforms", build)
+    assert build.call_count == 2
+
+
+def test_missing_table_versions_serves_plain_200():
+    cur = mock.MagicMock()
+    cur.execute.side_effect = Exception('relation "table_versions" does not exist')
+
+    response = utils.versioned_response(cur, {}, "users", lambda: [{"id": 1}])
+    assert response == {"statusCode": 200, "body": '[{"id": 1}]'}
+    cur.connection.rollback.assert_called_once()
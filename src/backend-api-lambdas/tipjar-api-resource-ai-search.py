@@ -4,46 +4,68 @@
 There are three layers of security for the AI search:
 1. The prompt specifies to only return a 'SELECT' statement.
 2. Before the SQL query is executed, Lambda will check to see if the command is a 'SELECT' statement and will not run anything else.
+   It also runs EXPLAIN first and refuses anything the planner thinks is too expensive.
 3. This lambda function is logging into the Postgres database with an account that is restricted to read-only acccess of a single table.
 """
 
+import base64
 import boto3
+import hashlib
+import hmac
 import json
 import os
+import re
+import time
 import psycopg2
+from collections import OrderedDict
 from botocore.exceptions import ClientError
 
 # --- Import from common Lambda Layer ---
+from common.db import db_connection
 from common.utils import with_cors, parse_body
 
 # --- Configuration ---
 REGION = os.environ.get("REGION", "us-gov-west-1")
 MODEL_ID = os.environ.get("MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
 
+# --- NL -> SQL Cache Config ---
+# Both cache levels live in the container and are LRU-capped with a TTL.
+NL_SQL_CACHE_SIZE = int(os.environ.get("NL_SQL_CACHE_SIZE", 256))
+NL_SQL_CACHE_TTL = float(os.environ.get("NL_SQL_CACHE_TTL", 3600))
+
+# --- Execution Limits ---
+AISEARCH_STATEMENT_TIMEOUT_MS = int(os.environ.get("AISEARCH_STATEMENT_TIMEOUT_MS", 10000))
+AISEARCH_PAGE_SIZE = int(os.environ.get("AISEARCH_PAGE_SIZE", 50))
+AISEARCH_MAX_ROWS = int(os.environ.get("AISEARCH_MAX_ROWS", 1000))
+# Plan guardrail: generated queries the planner expects to cost more than this are refused
+AISEARCH_MAX_PLAN_COST = float(os.environ.get("AISEARCH_MAX_PLAN_COST", 250000))
+AISEARCH_MAX_PLAN_ROWS = float(os.environ.get("AISEARCH_MAX_PLAN_ROWS", 200000))
+# Signs continuation tokens so clients can't swap in their own SQL. Required for
+# paging: a per-container random key would reject tokens whenever the next page
+# lands on another container. Checked when a token is issued or read (see _sign).
+AISEARCH_TOKEN_SECRET = os.environ.get("AISEARCH_TOKEN_SECRET", "").encode("utf-8")
+
 bedrock_client = boto3.client("bedrock-runtime", region_name=REGION)
 
-def get_db_connection():
+def search_db_connection():
     """
-    I'm not using the commmon.db util here because I made a separate user account 
+    I'm not using the default common.db credentials here because I made a separate user account 
     specifically for this search within the postgres database that is restricted to 
     read-only access to a single table. This is to stop users from being able to 
     prompt-inject commands that could damage the database.
+    The connection still comes from the common.db pool, just a pool of its own.
     """
     try:
-        conn = psycopg2.connect(
+        return db_connection(
             host=os.environ['DB_ENDPOINT'],
             dbname=os.environ['DB_NAME'],
             user=os.environ['DB_USER'],          
             password=os.environ['DB_USER_PASSWORD'], 
             port=os.environ.get('DB_PORT', 5432)
         )
-        return conn
     except KeyError as e:
         print(f"ERROR: Missing required environment variable: {e}")
         raise
-    except Exception as e:
-        print(f"ERROR: Could not connect to PostgreSQL instance. {e}")
-        raise
 
 # --- 2. Define the Schema Context ---
 DB_SCHEMA = """
@@ -73,6 +95,7 @@ source_description (String. Describes what the source is such as "Source is the
 additional_comment_text (String. Secondary content of the report)
 image_url (URL for any stored images)
 requirements (Text Array, format: DDCC0513-OCR-16692-EE1361, DDCC0513-OCR-17245-EE6174, etc. The 5 digit number such as the 17245 is often referred to as the 'category code'. These are also referred to as 'collection requirements' 
+requirement_categories (Integer Array. The category codes pulled out of requirements, e.g. {16692, 17245}. Always use this column to search by category code.)
 search_vector            | tsvector                |           |          |
 Indexes:
     "tip_reports_pkey" PRIMARY KEY, btree (id)
@@ -80,11 +103,13 @@ Indexes:
     "idx_tip_reports_country" btree (country)
     "idx_tip_reports_date_info" btree (date_of_information)
     "idx_tip_reports_requirements" gin (requirements)
+    "idx_tip_reports_requirement_categories" gin (requirement_categories)
     "idx_tip_reports_search_vector" gin (search_vector)
     "idx_tip_reports_source_name" btree (source_name)
     "idx_tip_reports_source_type" btree (source_platform)
 Triggers:
     tsvectorupdate BEFORE INSERT OR UPDATE ON tip_reports FOR EACH ROW EXECUTE FUNCTION tip_reports_search_update()
+    requirementcategoriesupdate BEFORE INSERT OR UPDATE OF requirements ON tip_reports FOR EACH ROW EXECUTE FUNCTION tip_reports_requirement_categories_update()
 """
 
 def generate_sql_query(natural_query):
@@ -104,13 +129,20 @@ def generate_sql_query(natural_query):
     5. Use 'ILIKE' for case-insensitive text matching.
     6. Order by 'created_on' DESC or 'date_of_information' DESC if no order is specified.
     7. If the user asks for "last week", use PostgreSQL date functions relative to NOW().
+    8. Never search requirements as text (requirements::text). Use requirement_categories for category codes.
 
     Example queries:
     Query:
     Show me all reports with a requirement category of 17208
 
     Search term:
-    SELECT * FROM tip_reports WHERE requirements::text ILIKE '%17208%' ORDER BY created_on DESC;
+    SELECT * FROM tip_reports WHERE requirement_categories @> ARRAY[17208] ORDER BY created_on DESC;
+
+    Query:
+    Show me reports for category 17208 or 17245
+
+    Search term:
+    SELECT * FROM tip_reports WHERE requirement_categories && ARRAY[17208, 17245] ORDER BY created_on DESC;
 
     Query:
     Show me all reports that mention drones but don't take place in Israel, Gaza Strip, or West Bank
@@ -175,25 +207,347 @@ def generate_sql_query(natural_query):
         print(f"Bedrock Error: {e}")
         raise e
 
-def execute_generated_sql(cur, sql_query):
+# --- NL -> SQL Cache ---
+# Level 1 ("exact") maps a normalized question straight to its SQL.
+# Level 2 ("template") remembers which words of the question ended up as literals
+# in the SQL. Those literals become bind parameters, so "reports about drones in
+# yemen" can answer "reports about drones in iraq" without calling the model.
+_exact_cache = OrderedDict()
+_template_cache = OrderedDict()
+_cache_stats = {"exact_hits": 0, "template_hits": 0, "misses": 0, "evictions": 0}
+
+# Words that carry the shape of a question rather than its values
+_STOPWORDS = {
+    "a", "an", "and", "are", "about", "all", "any", "at", "by", "for", "from", "in", "is",
+    "me", "mention", "mentions", "not", "of", "on", "or", "reports", "report", "show",
+    "that", "the", "to", "with", "without", "find", "get", "list", "but", "were", "was",
+}
+_SQL_LITERAL = re.compile(r"'(?:[^']|'')*'")
+# The column a literal is compared against, read from the SQL just before it
+_LITERAL_COLUMN = re.compile(
+    r"(\w+)\s*\)?(?:::\w+(?:\[\])?)?\s*(=|<>|!=|(?:NOT\s+)?I?LIKE|IN\s*\((?:\s*'(?:[^']|'')*'\s*,)*)\s*$", re.I
+)
+# Columns with a small set of known values. A slot compared against one of these is
+# only reused when the new value actually occurs in that column, so a template built
+# from "reports about iran" (country = 'IRAN') can't answer "reports about drones".
+_CLOSED_COLUMNS = {
+    "country", "macom", "source_platform", "did_what", "created_by",
+    "overall_classification", "collector_classification",
+}
+_CATEGORY_COLUMNS = {"requirements", "requirement_categories"}
+
+def _normalize_query(natural_query):
+    return re.sub(r"\s+", " ", natural_query.lower()).strip().rstrip("?.! ")
+
+def _cache_get(cache, key):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if time.time() - entry[0] > NL_SQL_CACHE_TTL:
+        del cache[key]
+        _cache_stats["evictions"] += 1
+        return None
+    cache.move_to_end(key)
+    return entry[1]
+
+def _cache_put(cache, key, value):
+    cache[key] = (time.time(), value)
+    cache.move_to_end(key)
+    while len(cache) > NL_SQL_CACHE_SIZE:
+        cache.popitem(last=False)
+        _cache_stats["evictions"] += 1
+
+def _literal_case(text):
+    letters = [c for c in text if c.isalpha()]
+    if letters and text == text.upper():
+        return "upper"
+    if letters and text == text.lower():
+        return "lower"
+    return "keep"
+
+def _literal_column(sql_before):
+    """Returns (column, operator) for the comparison a literal closes, or (None, None)."""
+    m = _LITERAL_COLUMN.search(sql_before)
+    if not m:
+        return None, None
+    op = m.group(2).upper()
+    return m.group(1).lower(), "=" if op.startswith("IN") else re.sub(r"\s+", " ", op)
+
+def _value_shape(word):
+    return "number" if word.isdigit() else "word"
+
+def _build_template(normalized_query, sql_query):
+    """
+    Returns (question_regex, sql_template, slot_info) or None if no word of the
+    question shows up as an SQL literal. Slot literals are swapped for %s and every
+    other '%' is escaped, so the template can be run with bind parameters. slot_info
+    also records what each literal was compared against, for _template_fits.
+    """
+    words = normalized_query.split(" ")
+    candidates = {w for w in words if re.fullmatch(r"[\w-]+", w) and w not in _STOPWORDS}
+    slots, param_templates, pieces, last = [], [], [], 0
+
+    def slot_for(word):
+        if word not in slots:
+            slots.append(word)
+        return "{%d}" % slots.index(word)
+
+    for m in _SQL_LITERAL.finditer(sql_query):
+        content = m.group(0)[1:-1].replace("''", "'")
+        used = [w for w in candidates if re.search(rf"(?<![\w-]){re.escape(w)}(?![\w-])", content, re.I)]
+        if not used:
+            continue
+        param = content
+        for w in sorted(used, key=len, reverse=True):
+            param = re.sub(rf"(?<![\w-]){re.escape(w)}(?![\w-])", lambda _m, t=slot_for(w): t, param, flags=re.I)
+        pieces.append(sql_query[last:m.start()].replace("%", "%%"))
+        pieces.append("%s")
+        param_templates.append((param, _literal_case(content), *_literal_column(sql_query[:m.start()])))
+        last = m.end()
+    if not slots:
+        return None
+    pieces.append(sql_query[last:].replace("%", "%%"))
+
+    # Each slot word becomes a named group the first time it appears; repeats must match it exactly.
+    parts, seen = [], set()
+    for w in words:
+        if w in slots and w not in seen:
+            seen.add(w)
+            parts.append(rf"(?P<s{slots.index(w)}>[\w-]+)")
+        elif w in slots:
+            parts.append(rf"(?P=s{slots.index(w)})")
+        else:
+            parts.append(re.escape(w))
+    shapes = [_value_shape(w) for w in slots]
+    return " ".join(parts), "".join(pieces), [len(slots), param_templates, shapes]
+
+def _fill_template(template, captured):
+    """Turns a level-2 hit back into (sql, params) given the slot values captured from the question."""
+    sql_template, (slot_count, param_templates, shapes) = template
+    if len(captured) != slot_count:
+        return None
+    if any(_value_shape(captured[f"s{i}"]) != shape for i, shape in enumerate(shapes)):
+        return None
+    params = []
+    for param, case, _column, _op in param_templates:
+        value = param
+        for i in range(slot_count):
+            value = value.replace("{%d}" % i, captured[f"s{i}"])
+        if case == "upper":
+            value = value.upper()
+        elif case == "lower":
+            value = value.lower()
+        params.append(value)
+    return sql_template, params
+
+def _template_fits(conn, template, params):
+    """
+    Checks the filled parameters belong to the same kind of value as the ones the
+    template was built from: category codes stay category codes, and values for a
+    closed column have to occur in it.
+    """
+    _sql_template, (_slot_count, param_templates, _shapes) = template
+    cur = conn.cursor()
+    try:
+        for (param, _case, column, op), value in zip(param_templates, params):
+            if "{" not in param:
+                continue
+            if column in _CATEGORY_COLUMNS:
+                if not re.fullmatch(r"%?\d{5}%?", value):
+                    return False
+            elif column in _CLOSED_COLUMNS:
+                if op in ("=", "<>", "!="):
+                    cur.execute(f"SELECT EXISTS (SELECT 1 FROM tip_reports WHERE upper({column}) = upper(%s))", (value,))
+                else:
+                    cur.execute(f"SELECT EXISTS (SELECT 1 FROM tip_reports WHERE {column} ILIKE %s)", (value,))
+                if not cur.fetchone()[0]:
+                    return False
+        return True
+    finally:
+        cur.close()
+
+def get_sql_for_query(natural_query, conn):
+    """
+    Returns (sql, params, cache_level) for a question, calling Bedrock only on a
+    miss. params is None when the SQL is meant to run as-is. conn is used to check
+    template values before a cached template is reused.
+    """
+    normalized = _normalize_query(natural_query)
+
+    hit = _cache_get(_exact_cache, normalized)
+    if hit is not None:
+        _cache_stats["exact_hits"] += 1
+        return hit[0], hit[1], "exact"
+
+    for question in list(_template_cache.keys()):
+        m = re.fullmatch(question, normalized)
+        if not m:
+            continue
+        template = _cache_get(_template_cache, question)
+        filled = _fill_template(template, m.groupdict()) if template else None
+        if filled and _template_fits(conn, template, filled[1]):
+            _cache_stats["template_hits"] += 1
+            # Rewritten only now, since the template carries the literal as a parameter
+            filled = _rewrite_category_search(*filled)
+            _cache_put(_exact_cache, normalized, filled)
+            return filled[0], filled[1], "template"
+
+    _cache_stats["misses"] += 1
+    sql_query = generate_sql_query(natural_query)
+    # The template is built from the model's SQL so its literals can still become slots
+    template = _build_template(normalized, sql_query)
+    if template:
+        question, sql_template, slot_info = template
+        _cache_put(_template_cache, question, (sql_template, slot_info))
+    sql_query, _ = _rewrite_category_search(sql_query)
+    _cache_put(_exact_cache, normalized, (sql_query, None))
+    return sql_query, None, "miss"
+
+# --- Bounded Execution ---
+# Everything in tip_reports except search_vector, which is large and useless to the client
+_RESULT_COLS = [
+    "id", "overall_classification", "title", "date_of_information", "time", "created_by", "created_on",
+    "macom", "country", "location", "mgrs", "is_usper", "has_uspi", "source_platform", "source_name",
+    "did_what", "uid", "article_title", "article_author", "report_body", "collector_classification",
+    "source_description", "additional_comment_text", "image_url", "modified_by", "modified_on", "requirements",
+    "requirement_categories"
+]
+_SELECT_STAR = re.compile(r"^(\s*SELECT\s+(?:DISTINCT\s+)?)(?:tip_reports\.)?\*", re.I)
+
+def _apply_projection(sql_query):
+    """Expands a leading SELECT * so search_vector never leaves the database."""
+    return _SELECT_STAR.sub(lambda m: m.group(1) + ", ".join(_RESULT_COLS), sql_query, count=1)
+
+_CATEGORY_TEXT_SEARCH = re.compile(r"\(?requirements\)?::text\s+I?LIKE\s+'%(\d{5})%'", re.I)
+# The same pattern once a cached template has turned the literal into a bind parameter
+_CATEGORY_PARAM_SEARCH = re.compile(r"\(?requirements\)?::text\s+I?LIKE\s+%s", re.I)
+_CATEGORY_PARAM = re.compile(r"%(\d{5})%")
+
+def _rewrite_category_search(sql_query, params=None):
+    """
+    Turns the old requirements::text ILIKE '%17208%' pattern into an index lookup
+    on requirement_categories. Works on (sql, params) as run, so SQL filled in from
+    a cached template is rewritten too. Returns (sql, params).
+    """
+    sql_query = _CATEGORY_TEXT_SEARCH.sub(r"requirement_categories @> ARRAY[\1]", sql_query)
+    if not params:
+        return sql_query, params
+    params = list(params)
+    for m in reversed(list(_CATEGORY_PARAM_SEARCH.finditer(sql_query))):
+        index = sql_query[:m.start()].replace("%%", "").count("%s")
+        code = _CATEGORY_PARAM.fullmatch(str(params[index]))
+        if code:
+            sql_query = sql_query[:m.start()] + "requirement_categories @> ARRAY[%s]::integer[]" + sql_query[m.end():]
+            params[index] = int(code.group(1))
+    return sql_query, params
+
+def _sign(raw):
+    if not AISEARCH_TOKEN_SECRET:
+        raise RuntimeError("AISEARCH_TOKEN_SECRET environment variable must be set")
+    return hmac.new(AISEARCH_TOKEN_SECRET, raw, hashlib.sha256).hexdigest()
+
+def _encode_token(sql_query, params, offset):
+    raw = json.dumps({"sql": sql_query, "params": params, "offset": offset}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii") + "." + _sign(raw)
+
+def _decode_token(token):
+    """Returns (sql, params, offset) from a continuation token, or raises ValueError."""
+    try:
+        data, signature = token.rsplit(".", 1)
+        raw = base64.urlsafe_b64decode(data.encode("ascii"))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid continuation token")
+    if not hmac.compare_digest(_sign(raw), signature):
+        raise ValueError("Invalid continuation token")
+    payload = json.loads(raw)
+    return payload["sql"], payload["params"], int(payload["offset"])
+
+def _walk_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_plan(child)
+
+def check_query_plan(cur, sql_query, params=None):
+    """
+    Security/cost layer: asks the planner what the query will cost before running it.
+    Returns {"plan_cost", "plan_rows"} or raises ValueError with a hint when the
+    estimate is over AISEARCH_MAX_PLAN_COST / AISEARCH_MAX_PLAN_ROWS.
     """
-    Executes the AI-generated SQL.
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql_query, params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+    stats = {"plan_cost": root.get("Total Cost", 0), "plan_rows": root.get("Plan Rows", 0)}
+
+    if stats["plan_cost"] <= AISEARCH_MAX_PLAN_COST and stats["plan_rows"] <= AISEARCH_MAX_PLAN_ROWS:
+        return stats
+
+    # Point at the sequential scans, since those are almost always the culprit
+    hints = []
+    for node in _walk_plan(root):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") == "tip_reports":
+            hints.append(node.get("Filter") or "no filter at all")
+    message = (
+        f"This search is too expensive to run (estimated cost {stats['plan_cost']:.0f}, "
+        f"about {stats['plan_rows']:.0f} rows). Try a more specific question."
+    )
+    if any("requirements)::text" in h for h in hints):
+        message += " Searching requirements as text scans every report; ask for the category code instead (e.g. 'category 17208')."
+    elif hints:
+        message += f" It would scan every report to check: {hints[0]}."
+    print(json.dumps({"event": "aisearch_rejected", "sql": sql_query, **stats, "seq_scan_filters": hints}, default=str))
+    raise ValueError(message)
+
+def execute_generated_sql(conn, sql_query, params=None, offset=0, limit=AISEARCH_PAGE_SIZE, check_plan=True):
+    """
+    Executes the AI-generated SQL one page at a time through a server-side cursor.
+    Rows before `offset` are skipped on the server and at most `limit` + 1 rows
+    ever cross the wire, so memory stays flat however much the query matches.
+    Returns (rows, has_more, stats) where stats has the plan estimate and timing.
     """
     # Security Layer 2: We check the command
     if not sql_query.upper().startswith("SELECT"):
         raise ValueError("AI generated a non-SELECT query. Execution blocked for safety.")
 
-    cur.execute(sql_query)
-    rows = cur.fetchall()
-    cols = [d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
+    if offset >= AISEARCH_MAX_ROWS:
+        return [], False, {}
+    limit = max(1, min(limit, AISEARCH_MAX_ROWS - offset))
+
+    sql_query = _apply_projection(sql_query)
+    stats = {}
+    with conn.cursor() as setup:
+        setup.execute("SET LOCAL statement_timeout = %s;", (AISEARCH_STATEMENT_TIMEOUT_MS,))
+        # Security Layer 2.5: refuse queries the planner says are too expensive
+        if check_plan:
+            stats = check_query_plan(setup, sql_query, params)
+
+    started = time.perf_counter()
+    cur = conn.cursor(name="aisearch_results")
+    cur.itersize = limit + 1
+    try:
+        cur.execute(sql_query, params)
+        if offset:
+            cur.scroll(offset, mode="absolute")
+        rows = cur.fetchmany(limit + 1)
+        cols = [d[0] for d in cur.description]
+    finally:
+        cur.close()
+    stats["exec_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    has_more = len(rows) > limit and offset + limit < AISEARCH_MAX_ROWS
+    results = []
+    for r in rows[:limit]:
+        row = dict(zip(cols, r))
+        row.pop("search_vector", None)
+        results.append(row)
+    return results, has_more, stats
 
 def lambda_handler(event, context):
     # Handle CORS Preflight
     if event.get("httpMethod") == "OPTIONS":
         return with_cors(None)
 
-    conn = None
     try:
         # Route Validation
         if event.get("httpMethod") != "POST":
@@ -202,32 +556,57 @@ def lambda_handler(event, context):
         # 1. Parse User Input
         body = parse_body(event)
         user_query = body.get("query")
+        token = body.get("continuation_token")
+        limit = int(body.get("limit") or AISEARCH_PAGE_SIZE)
         
-        if not user_query:
+        if not user_query and not token:
             return with_cors({"statusCode": 400, "body": json.dumps({"message": "Missing 'query' field"})})
 
-        # 2. Convert Natural Language -> SQL via Bedrock
-        generated_sql = generate_sql_query(user_query)
-        print(f"Generated SQL: {generated_sql}") 
-
-        # 3. Execute SQL (Using our local get_db_connection)
-        conn = get_db_connection()
-        cur = conn.cursor()
-        results = execute_generated_sql(cur, generated_sql)
+        if token:
+            # Next page of an earlier search; the SQL rides along in the signed token
+            generated_sql, sql_params, offset = _decode_token(token)
+            cache_level = "token"
+
+        # 3. Execute SQL (Using our local search_db_connection)
+        with search_db_connection() as conn:
+            if not token:
+                # 2. Convert Natural Language -> SQL via the cache, falling back to Bedrock
+                generated_sql, sql_params, cache_level = get_sql_for_query(user_query, conn)
+                offset = int(body.get("offset") or 0)
+            print(f"Generated SQL ({cache_level}): {generated_sql} {sql_params or ''}")
+
+            # Pages reached through a signed token were already vetted when it was issued
+            results, has_more, stats = execute_generated_sql(
+                conn, generated_sql, sql_params, offset, limit, check_plan=not token
+            )
+            interpreted = generated_sql
+            if sql_params is not None:
+                interpreted = conn.cursor().mogrify(generated_sql, sql_params).decode("utf-8")
+
+        # One structured line per accepted query, so slow generated patterns show up in the logs
+        print(json.dumps({
+            "event": "aisearch_query", "sql": interpreted, "cache_level": cache_level,
+            "offset": offset, "rows": len(results), **stats
+        }, default=str))
 
         # 4. Return Results
         response_data = {
-            "query_interpreted": generated_sql,
-            "total": len(results),
-            "results": results
+            "query_interpreted": interpreted,
+            # Only known once the last page has been read
+            "total": None if has_more else offset + len(results),
+            "has_more": has_more,
+            "next_token": _encode_token(generated_sql, sql_params, offset + len(results)) if has_more else None,
+            "results": results,
+            "stats": stats,
+            "cache": {"level": cache_level, **_cache_stats}
         }
         
         return with_cors({"statusCode": 200, "body": json.dumps(response_data, default=str)})
 
     except ValueError as ve:
         return with_cors({"statusCode": 400, "body": json.dumps({"message": str(ve)})})
+    except psycopg2.extensions.QueryCanceledError:
+        return with_cors({"statusCode": 400, "body": json.dumps({"message": "Search took too long and was cancelled. Try narrowing the question."})})
     except Exception as e:
         print(f"Error: {e}")
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Internal Server Error: {str(e)}"})})
-    finally:
-        if conn: conn.close()
\ No newline at end of file
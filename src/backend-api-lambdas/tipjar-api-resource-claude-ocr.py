@@ -1,16 +1,58 @@
 # website.url/ocr
 
+import base64
 import boto3
+import hashlib
+import io
 import json
+import math
 import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Import from common Lambda Layer ---
+from common.db import db_connection
 from common.utils import with_cors, parse_body
 
 # --- Client Config ---
 REGION = os.environ.get("REGION", "us-gov-west-1")
 MODEL_ID = os.environ.get("MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
 
+# --- Batch Config ---
+OCR_CONCURRENCY = int(os.environ.get("OCR_CONCURRENCY", 4))
+OCR_BATCH_MAX_ITEMS = int(os.environ.get("OCR_BATCH_MAX_ITEMS", 30))
+OCR_PDF_DPI = int(os.environ.get("OCR_PDF_DPI", 150))
+
+# --- OCR Cache Config (table: ocr_cache, see sql/007) ---
+OCR_CACHE_MAX_ROWS = int(os.environ.get("OCR_CACHE_MAX_ROWS", 5000))
+# Serve results cached for a different encoding of the same image. Off by default: a
+# changed digit in a screenshot barely moves any hash, so only exact bytes are safe.
+OCR_NEAR_HITS = os.environ.get("OCR_NEAR_HITS", "false").lower() == "true"
+# Largest perceptual-hash distance (bits out of 64) for a near-hit candidate; at most 7
+OCR_PHASH_MAX_DISTANCE = min(int(os.environ.get("OCR_PHASH_MAX_DISTANCE", 4)), 7)
+# Candidates must also have the same size and a thumbnail within this many grey levels
+# at every pixel, which passes re-encoded copies but not edited text
+OCR_THUMB_SIZE = 128
+OCR_THUMB_MAX_DIFF = int(os.environ.get("OCR_THUMB_MAX_DIFF", 24))
+
+# --- Preprocessing Config ---
+# Claude scales anything with a long edge over ~1568px or more than ~1.15 megapixels
+# down before reading it, so sending more pixels than that only costs bytes and latency.
+OCR_PREPROCESS = os.environ.get("OCR_PREPROCESS", "true").lower() == "true"
+OCR_MAX_EDGE = int(os.environ.get("OCR_MAX_EDGE", 1568))
+OCR_MAX_PIXELS = int(os.environ.get("OCR_MAX_PIXELS", 1150000))
+OCR_CROP_MARGINS = os.environ.get("OCR_CROP_MARGINS", "true").lower() == "true"
+# "auto" keeps whichever of PNG/WebP comes out smaller; or force "png", "webp" or "jpeg"
+OCR_OUTPUT_FORMAT = os.environ.get("OCR_OUTPUT_FORMAT", "auto").lower()
+if OCR_OUTPUT_FORMAT == "jpg":
+    OCR_OUTPUT_FORMAT = "jpeg"
+_OUTPUT_MEDIA_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+if OCR_OUTPUT_FORMAT != "auto" and OCR_OUTPUT_FORMAT not in _OUTPUT_MEDIA_TYPES:
+    raise RuntimeError(f"OCR_OUTPUT_FORMAT must be auto, png, webp or jpeg, not {OCR_OUTPUT_FORMAT!r}")
+
 # --- System Policy ---
 # Strictly formatted to meet the specific extraction guidelines
 SYSTEM_POLICY = """You are a strictly literal Optical Character Recognition (OCR) engine.
@@ -28,36 +70,21 @@ Follow these rules exactly:
 bedrock_client = boto3.client("bedrock-runtime", region_name=REGION)
 
 
-def handle_bedrock_call(event):
+def _strip_data_url(image_data, media_type=None):
     """
-    Handles the image processing logic.
-    Expects a JSON body with keys: "image" (base64 string) and optional "media_type".
+    Splits "data:image/png;base64,..." into (base64 data, media type).
+    Plain base64 is returned as-is with the given media type (default jpeg).
     """
-    body = parse_body(event)
-    
-    # 1. Extract Image Data
-    # The frontend should send the image as a Base64 string.
-    image_data = body.get("image")
-    # Default to jpeg if not specified, usually safe for Claude
-    media_type = body.get("media_type", "image/jpeg") 
-    
-    # Configuration params (optional overrides)
-    temperature = float(body.get("temperature", 0)) # Set to 0 for deterministic extraction
-    top_p = float(body.get("top_p", 0.5))
-    max_tokens = int(body.get("max_tokens", 2000))
-
-    # 2. Validation
-    if not image_data:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Request body must contain 'image' (base64 string)."})
-        }
-
-    # 3. Construct the Vision Payload for Claude
-    # We strip the header if the frontend sent "data:image/jpeg;base64,..."
     if "," in image_data:
-        image_data = image_data.split(",")[1]
+        header, image_data = image_data.split(",", 1)
+        if not media_type and header.startswith("data:"):
+            media_type = header[5:].split(";")[0] or None
+    return image_data, media_type or "image/jpeg"
 
+
+def _ocr_image(image_data, media_type, temperature=0, top_p=0.5, max_tokens=2000):
+    """Sends one base64 image to the model. Returns (extracted_text, usage)."""
+    # 1. Construct the Vision Payload for Claude
     user_message = {
         "role": "user",
         "content": [
@@ -76,7 +103,7 @@ def handle_bedrock_call(event):
         ]
     }
 
-    # 4. Construct the Bedrock request body
+    # 2. Construct the Bedrock request body
     bedrock_body = {
         "anthropic_version": "bedrock-2023-05-31",
         "system": SYSTEM_POLICY,
@@ -86,40 +113,499 @@ def handle_bedrock_call(event):
         "top_p": top_p,
     }
 
-    # 5. Invoke the model
+    # 3. Invoke the model
     resp = bedrock_client.invoke_model(
         modelId=MODEL_ID,
         contentType="application/json",
         accept="application/json",
         body=json.dumps(bedrock_body).encode("utf-8"),
     )
-    
-    # 6. Parse the model's response
+
+    # 4. Parse the model's response
     payload = json.loads(resp["body"].read().decode("utf-8"))
-    
+
     # Extract text content
     parts = [p.get("text", "") for p in payload.get("content", []) if p.get("type") == "text"]
     response_text = "\n".join(parts).strip()
-    
+
     # Extract token usage
     usage = payload.get("usage", {})
     input_tokens = usage.get("input_tokens", 0)
     output_tokens = usage.get("output_tokens", 0)
+    return response_text, {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens
+    }
 
-    # 7. Create the final API response body
-    return_body = {
-        "extracted_text": response_text,
-        "usage": {
-            "input_tokens": input_tokens,
-            "output_tokens": output_tokens,
-            "total_tokens": input_tokens + output_tokens
-        }
+
+# --- OCR Cache ---
+# Per-container counters; the table's hit_count keeps the long-run totals.
+_cache_stats = {"hits": 0, "near_hits": 0, "misses": 0}
+_cache_stats_lock = threading.Lock()
+
+
+def _count(outcome):
+    with _cache_stats_lock:
+        _cache_stats[outcome] += 1
+
+
+def _image_fingerprint(image_bytes):
+    """
+    Returns (exact_hash, phash, width, height, thumbnail). The perceptual hash is
+    a 64-bit dHash: the image shrunk to 9x8 grayscale, one bit per horizontal
+    neighbour comparison. It only finds near-hit candidates; the thumbnail (a
+    contrast-normalized OCR_THUMB_SIZE square in grayscale, zlib-compressed)
+    confirms them. Both need Pillow; without it only exact matches are possible.
+    """
+    exact_hash = hashlib.sha256(image_bytes).hexdigest()
+    try:
+        from PIL import Image, ImageOps
+
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            width, height = img.size
+            gray = img.convert("L")
+            pixels = gray.resize((9, 8), Image.LANCZOS).tobytes()
+            thumbnail = ImageOps.autocontrast(gray.resize((OCR_THUMB_SIZE, OCR_THUMB_SIZE), Image.BOX)).tobytes()
+    except Exception as e:
+        print(f"Perceptual hash unavailable: {e}")
+        return exact_hash, None, None, None, None
+
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    # Stored as a signed BIGINT
+    phash = bits - (1 << 64) if bits >= (1 << 63) else bits
+    return exact_hash, phash, width, height, zlib.compress(thumbnail)
+
+
+def _phash_bands(phash):
+    bits = phash & ((1 << 64) - 1)
+    return [i * 256 + ((bits >> (8 * i)) & 0xFF) for i in range(8)]
+
+
+def _hamming(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count("1")
+
+
+def _same_thumbnail(a, b):
+    """True if two compressed thumbnails differ by at most OCR_THUMB_MAX_DIFF at every pixel."""
+    a, b = zlib.decompress(a), zlib.decompress(bytes(b))
+    return len(a) == len(b) and max(abs(x - y) for x, y in zip(a, b)) <= OCR_THUMB_MAX_DIFF
+
+
+def _near_hit(cur, fingerprint):
+    """Best confirmed near match for one fingerprint as (extracted_text, "near_hit"), or None."""
+    exact_hash, phash, width, height, thumbnail = fingerprint
+    # Resized copies can't be told apart from edited ones, so the size must match too
+    cur.execute("""
+        SELECT exact_hash, phash, thumbnail, extracted_text FROM ocr_cache
+        WHERE phash_bands && %s::integer[] AND model_id = %s
+          AND width = %s AND height = %s AND thumbnail IS NOT NULL;
+    """, (_phash_bands(phash), MODEL_ID, width, height))
+    best = None
+    for key, other, other_thumbnail, text in cur.fetchall():
+        distance = _hamming(phash, other)
+        if distance > OCR_PHASH_MAX_DISTANCE or (best is not None and distance >= best[0]):
+            continue
+        if _same_thumbnail(thumbnail, other_thumbnail):
+            best = (distance, key, text)
+    if not best:
+        return None
+    cur.execute(
+        "UPDATE ocr_cache SET last_hit_on = NOW(), hit_count = hit_count + 1 WHERE exact_hash = %s;",
+        (best[1],)
+    )
+    return best[2], "near_hit"
+
+
+def _cache_lookup(fingerprints):
+    """
+    Looks up a list of fingerprints over one connection. Returns
+    {exact_hash: (extracted_text, "hit" | "near_hit")} for the ones found; near
+    hits are only considered with OCR_NEAR_HITS on. Cache errors never block OCR.
+    """
+    found = {}
+    if not fingerprints:
+        return found
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE ocr_cache SET last_hit_on = NOW(), hit_count = hit_count + 1
+                WHERE exact_hash = ANY(%s) AND model_id = %s
+                RETURNING exact_hash, extracted_text;
+            """, (sorted({fp[0] for fp in fingerprints}), MODEL_ID))
+            for exact_hash, text in cur.fetchall():
+                found[exact_hash] = (text, "hit")
+            if OCR_NEAR_HITS:
+                for fp in fingerprints:
+                    if fp[0] not in found and fp[1] is not None:
+                        near = _near_hit(cur, fp)
+                        if near:
+                            found[fp[0]] = near
+            conn.commit()
+    except Exception as e:
+        print(f"OCR cache lookup failed: {e}")
+    return found
+
+
+def _cache_store(entries):
+    """Saves (fingerprint, extracted_text, usage) results over one connection, then evicts anything past the size cap (LRU)."""
+    if not entries:
+        return
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.executemany("""
+                INSERT INTO ocr_cache (exact_hash, model_id, phash, phash_bands, width, height, thumbnail, extracted_text, usage)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (exact_hash) DO UPDATE
+                SET model_id = EXCLUDED.model_id, extracted_text = EXCLUDED.extracted_text,
+                    thumbnail = EXCLUDED.thumbnail, usage = EXCLUDED.usage,
+                    created_on = NOW(), last_hit_on = NOW();
+            """, [(exact_hash, MODEL_ID, phash, _phash_bands(phash) if phash is not None else None,
+                   width, height, thumbnail, extracted_text, json.dumps(usage))
+                  for (exact_hash, phash, width, height, thumbnail), extracted_text, usage in entries])
+            cur.execute("""
+                DELETE FROM ocr_cache
+                WHERE exact_hash IN (SELECT exact_hash FROM ocr_cache ORDER BY last_hit_on DESC OFFSET %s);
+            """, (OCR_CACHE_MAX_ROWS,))
+            conn.commit()
+    except Exception as e:
+        print(f"OCR cache store failed: {e}")
+
+
+# --- Preprocessing ---
+
+def _estimate_image_tokens(width, height):
+    """Anthropic's rule of thumb for image input: about width * height / 750 tokens."""
+    return math.ceil(width * height / 750)
+
+
+def _crop_margins(img):
+    """Trims a uniform border (the colour of the top-left pixel) if that removes at least 5% of the area."""
+    from PIL import Image, ImageChops
+
+    rgb = img.convert("RGB")
+    background = Image.new("RGB", rgb.size, rgb.getpixel((0, 0)))
+    # Small tolerance so JPEG noise in the margin doesn't count as content
+    mask = ImageChops.difference(rgb, background).convert("L").point(lambda v: 255 if v > 16 else 0)
+    box = mask.getbbox()
+    if not box:
+        return img, False
+    pad = 8
+    box = (max(box[0] - pad, 0), max(box[1] - pad, 0), min(box[2] + pad, img.width), min(box[3] + pad, img.height))
+    if (box[2] - box[0]) * (box[3] - box[1]) > 0.95 * img.width * img.height:
+        return img, False
+    return img.crop(box), True
+
+
+def _encode(img, fmt):
+    buf = io.BytesIO()
+    if fmt == "png":
+        img.save(buf, "PNG", optimize=True)
+    elif fmt == "webp":
+        img.save(buf, "WEBP", quality=90, method=4)
+    else:
+        img.convert("RGB").save(buf, "JPEG", quality=88, optimize=True)
+    return buf.getvalue(), _OUTPUT_MEDIA_TYPES[fmt]
+
+
+def preprocess_image(image_bytes, media_type, crop_margins=None):
+    """
+    Shrinks an image to what the model will actually look at: EXIF rotation applied,
+    blank margins cropped, long edge/pixel count capped at OCR_MAX_EDGE/OCR_MAX_PIXELS,
+    re-encoded as PNG or WebP. Returns (image_bytes, media_type, stats); the original
+    comes back unchanged if Pillow is missing or processing wouldn't make it smaller.
+    """
+    crop_margins = OCR_CROP_MARGINS if crop_margins is None else crop_margins
+    stats = {"original_bytes": len(image_bytes), "processed_bytes": len(image_bytes), "applied": False}
+    try:
+        from PIL import Image, ImageOps
+
+        with Image.open(io.BytesIO(image_bytes)) as original:
+            original.load()
+            img = ImageOps.exif_transpose(original)
+        stats["original_size"] = list(img.size)
+        tokens_before = _estimate_image_tokens(*img.size)
+
+        cropped = False
+        if crop_margins:
+            img, cropped = _crop_margins(img)
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+
+        width, height = img.size
+        scale = min(1.0, OCR_MAX_EDGE / max(width, height), math.sqrt(OCR_MAX_PIXELS / (width * height)))
+        if scale < 1.0:
+            img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+
+        formats = ["png", "webp"] if OCR_OUTPUT_FORMAT == "auto" else [OCR_OUTPUT_FORMAT]
+        data, out_type = min((_encode(img, f) for f in formats), key=lambda e: len(e[0]))
+    except Exception as e:
+        print(f"Image preprocessing skipped: {e}")
+        return image_bytes, media_type, stats
+
+    tokens_after = _estimate_image_tokens(*img.size)
+    stats.update({
+        "processed_size": list(img.size),
+        "cropped": cropped,
+        "est_input_tokens_before": tokens_before,
+        "est_input_tokens_after": tokens_after,
+    })
+    # Keep the original if it was already small and compact (e.g. a tight JPEG)
+    if len(data) >= len(image_bytes) and tokens_after >= tokens_before:
+        stats["tokens_saved"] = 0
+        stats["bytes_saved"] = 0
+        return image_bytes, media_type, stats
+
+    stats.update({
+        "processed_bytes": len(data),
+        "bytes_saved": len(image_bytes) - len(data),
+        "tokens_saved": tokens_before - tokens_after,
+        "applied": True,
+    })
+    return data, out_type, stats
+
+
+# --- Cached OCR ---
+
+_NO_USAGE = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+
+def _decode_image(image_data):
+    """Returns (image_bytes, fingerprint), or (None, None) if the data isn't valid base64."""
+    try:
+        image_bytes = base64.b64decode(image_data)
+    except ValueError:
+        return None, None  # Let the model call report it
+    return image_bytes, _image_fingerprint(image_bytes) if image_bytes else None
+
+
+def _run_ocr(image_data, image_bytes, media_type, options, preprocess):
+    """
+    Preprocesses (if asked) and calls the model. Returns (extracted_text, usage,
+    preprocess stats). Never touches the database, so it is safe to fan out.
+    """
+    prep = None
+    if image_bytes and preprocess:
+        processed, media_type, prep = preprocess_image(image_bytes, media_type)
+        if prep["applied"]:
+            image_data = base64.b64encode(processed).decode("ascii")
+    text, usage = _ocr_image(image_data, media_type, **options)
+    return text, usage, prep
+
+
+def _cached_ocr(image_data, media_type, options, bypass_cache=False, preprocess=None):
+    """
+    _ocr_image behind the OCR cache, with preprocessing on a miss.
+    Returns (extracted_text, usage, cache outcome, preprocess stats), where the
+    outcome is "hit", "near_hit", "miss" or "bypass". The cache is keyed on the
+    image as sent, so a hit skips preprocessing too.
+    """
+    preprocess = OCR_PREPROCESS if preprocess is None else preprocess
+    image_bytes, fingerprint = _decode_image(image_data)
+    if fingerprint and not bypass_cache:
+        cached = _cache_lookup([fingerprint]).get(fingerprint[0])
+        if cached:
+            _count(cached[1] + "s")
+            return cached[0], dict(_NO_USAGE), cached[1], None
+
+    text, usage, prep = _run_ocr(image_data, image_bytes, media_type, options, preprocess)
+    if bypass_cache:
+        return text, usage, "bypass", prep
+    _count("misses")
+    if fingerprint and text:
+        _cache_store([(fingerprint, text, usage)])
+    return text, usage, "miss", prep
+
+
+def _model_options(body):
+    """Optional generation overrides shared by the single and batch endpoints."""
+    return {
+        "temperature": float(body.get("temperature", 0)), # Set to 0 for deterministic extraction
+        "top_p": float(body.get("top_p", 0.5)),
+        "max_tokens": int(body.get("max_tokens", 2000)),
     }
 
-    # 8. Return the successful response
+
+def _cache_flags(body):
+    """
+    Returns (bypass_cache, preprocess) from a request body. Flags are on only for
+    true or "true"; preprocess is None when absent so OCR_PREPROCESS applies.
+    """
+    bypass_cache = str(body.get("bypass_cache", "false")).lower() == "true"
+    preprocess = body.get("preprocess")
+    if preprocess is not None:
+        preprocess = str(preprocess).lower() == "true"
+    return bypass_cache, preprocess
+
+
+def handle_bedrock_call(event):
+    """
+    Handles the image processing logic.
+    Expects a JSON body with keys: "image" (base64 string) and optional "media_type".
+    Repeat images (and re-encoded copies, with OCR_NEAR_HITS) are answered from
+    the OCR cache unless "bypass_cache" is true. Others are downscaled/re-encoded
+    first unless "preprocess" is false.
+    """
+    body = parse_body(event)
+
+    # 1. Extract Image Data
+    # The frontend should send the image as a Base64 string.
+    image_data = body.get("image")
+
+    # 2. Validation
+    if not image_data:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Request body must contain 'image' (base64 string)."})
+        }
+
+    # 3. Strip the header if the frontend sent "data:image/jpeg;base64,..."
+    # Default to jpeg if not specified, usually safe for Claude
+    image_data, media_type = _strip_data_url(image_data, body.get("media_type"))
+
+    # 4. Run the model (or reuse a cached result for the same image)
+    response_text, usage, outcome, prep = _cached_ocr(image_data, media_type, _model_options(body), *_cache_flags(body))
+
+    # 5. Return the successful response
     return {
         "statusCode": 200,
-        "body": json.dumps(return_body)
+        "body": json.dumps({
+            "extracted_text": response_text,
+            "usage": usage,
+            "cache": outcome,
+            "cache_stats": dict(_cache_stats),
+            "preprocess": prep
+        })
+    }
+
+
+# --- Batch OCR (POST /ocr/batch) ---
+
+def _pdf_pages(pdf_data, max_pages):
+    """
+    Renders each page of a base64 PDF to a PNG (base64). Needs PyMuPDF (import
+    name "fitz") in the layer, since the model reads images rather than PDFs.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(stream=base64.b64decode(pdf_data), filetype="pdf")
+    try:
+        if doc.page_count > max_pages:
+            raise ValueError(f"PDF has {doc.page_count} pages, at most {max_pages} are allowed")
+        return [
+            base64.b64encode(page.get_pixmap(dpi=OCR_PDF_DPI).tobytes("png")).decode("ascii")
+            for page in doc
+        ]
+    finally:
+        doc.close()
+
+
+def handle_batch_ocr(event):
+    """
+    Handles POST /ocr/batch. The body carries "images" (a list of base64 strings or
+    {"image", "media_type"} objects) and/or "pdf" (a base64 PDF, OCR'd page by page).
+    Cache lookups and stores run once for the whole batch; only the model calls
+    run OCR_CONCURRENCY at a time. Results come back in input order (images
+    first, then pages), and one failed item doesn't fail the rest.
+    """
+    body = parse_body(event)
+    options = _model_options(body)
+    bypass_cache, preprocess = _cache_flags(body)
+
+    items = []
+    for i, entry in enumerate(body.get("images") or []):
+        if isinstance(entry, dict):
+            data, media_type = entry.get("image"), entry.get("media_type")
+        else:
+            data, media_type = entry, None
+        if not data:
+            return {"statusCode": 400, "body": json.dumps({"error": f"images[{i}] is empty."})}
+        data, media_type = _strip_data_url(data, media_type)
+        items.append({"index": len(items), "source": f"images[{i}]", "image": data, "media_type": media_type})
+
+    if body.get("pdf"):
+        try:
+            pages = _pdf_pages(_strip_data_url(body["pdf"], "application/pdf")[0], OCR_BATCH_MAX_ITEMS - len(items))
+        except ImportError:
+            return {"statusCode": 501, "body": json.dumps({"error": "PDF support is not installed (PyMuPDF)."})}
+        except Exception as e:
+            return {"statusCode": 400, "body": json.dumps({"error": f"Could not read PDF: {e}"})}
+        for n, page in enumerate(pages, start=1):
+            items.append({"index": len(items), "source": f"pdf page {n}", "page": n, "image": page, "media_type": "image/png"})
+
+    if not items:
+        return {"statusCode": 400, "body": json.dumps({"error": "Request body must contain 'images' (list of base64 strings) or 'pdf'."})}
+    if len(items) > OCR_BATCH_MAX_ITEMS:
+        return {"statusCode": 400, "body": json.dumps({"error": f"At most {OCR_BATCH_MAX_ITEMS} images/pages per request."})}
+
+    # 1. Cache lookups for every item happen here, over one pooled connection. The
+    #    pool is far smaller than OCR_CONCURRENCY, so the workers never touch it.
+    preprocess = OCR_PREPROCESS if preprocess is None else preprocess
+    for item in items:
+        item["bytes"], item["fingerprint"] = _decode_image(item["image"])
+    cached = {} if bypass_cache else _cache_lookup([item["fingerprint"] for item in items if item["fingerprint"]])
+
+    results, misses = [], []
+    for item in items:
+        result = {"index": item["index"], "source": item["source"]}
+        if "page" in item:
+            result["page"] = item["page"]
+        hit = cached.get(item["fingerprint"][0]) if item["fingerprint"] else None
+        if hit:
+            _count(hit[1] + "s")
+            result.update(extracted_text=hit[0], usage=dict(_NO_USAGE), cache=hit[1], preprocess=None)
+        else:
+            misses.append(item)
+        results.append(result)
+
+    # 2. Only the model calls fan out
+    def run(item):
+        try:
+            return _run_ocr(item["image"], item["bytes"], item["media_type"], options, preprocess), None
+        except Exception as e:
+            print(f"OCR failed for {item['source']}: {e}")
+            return None, str(e)
+
+    outcomes = []
+    if misses:
+        with ThreadPoolExecutor(max_workers=max(1, min(OCR_CONCURRENCY, len(misses)))) as pool:
+            outcomes = list(pool.map(run, misses))
+
+    # 3. New results are stored together
+    to_store = []
+    for item, (outcome, error) in zip(misses, outcomes):
+        result = results[item["index"]]
+        if error:
+            result["error"] = error
+            continue
+        text, usage, prep = outcome
+        result.update(extracted_text=text, usage=usage, cache="bypass" if bypass_cache else "miss", preprocess=prep)
+        if not bypass_cache:
+            _count("misses")
+            if item["fingerprint"] and text:
+                to_store.append((item["fingerprint"], text, usage))
+    _cache_store(to_store)
+
+    usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for r in results:
+        for k in usage:
+            usage[k] += r.get("usage", {}).get(k, 0)
+    failed = sum(1 for r in results if "error" in r)
+
+    return {
+        "statusCode": 200 if failed < len(results) else 502,
+        "body": json.dumps({
+            "results": results,
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "usage": usage,
+            "cache_stats": dict(_cache_stats)
+        })
     }
 
 
@@ -137,7 +623,10 @@ def lambda_handler(event, context):
         http_method = event.get("httpMethod")
 
         # 2. Route the request
-        if http_method == "POST":
+        path = (event.get("path") or event.get("resource") or "").rstrip("/")
+        if http_method == "POST" and path.endswith("/batch"):
+            response = handle_batch_ocr(event)
+        elif http_method == "POST":
             response = handle_bedrock_call(event)
         else:
             response = {
@@ -154,4 +643,62 @@ def lambda_handler(event, context):
             "statusCode": 500, 
             "body": json.dumps({"message": f"Unhandled server error: {str(e)}"})
         }
-        return with_cors(response)
\ No newline at end of file
+        return with_cors(response)
+
+
+# --- Preprocessing Benchmark ---
+
+def bench(sample_dir, invoke=False):
+    """
+    Runs preprocess_image over every image in sample_dir and prints bytes and
+    estimated tokens before/after. With invoke=True each image is also OCR'd as-is
+    and preprocessed, to compare real model latency and input tokens.
+    """
+    names = sorted(n for n in os.listdir(sample_dir) if n.lower().endswith((".png", ".jpg", ".jpeg", ".webp", ".gif")))
+    totals = {"bytes_before": 0, "bytes_after": 0, "tokens_before": 0, "tokens_after": 0,
+              "prep_ms": 0.0, "ocr_ms_before": 0.0, "ocr_ms_after": 0.0, "input_tokens_before": 0, "input_tokens_after": 0}
+    print(f"{'image':32} {'bytes':>17} {'est tokens':>13} {'prep ms':>8}")
+    for name in names:
+        with open(os.path.join(sample_dir, name), "rb") as fh:
+            raw = fh.read()
+        media_type = "image/jpeg" if name.lower().endswith(("jpg", "jpeg")) else f"image/{name.rsplit('.', 1)[1].lower()}"
+        started = time.perf_counter()
+        processed, out_type, stats = preprocess_image(raw, media_type)
+        prep_ms = (time.perf_counter() - started) * 1000
+
+        before = stats.get("est_input_tokens_before", 0)
+        after = stats.get("est_input_tokens_after", before) if stats["applied"] else before
+        totals["bytes_before"] += len(raw)
+        totals["bytes_after"] += len(processed)
+        totals["tokens_before"] += before
+        totals["tokens_after"] += after
+        totals["prep_ms"] += prep_ms
+        print(f"{name[:32]:32} {len(raw):>8}->{len(processed):<8} {before:>6}->{after:<6} {prep_ms:>8.1f}")
+
+        if invoke:
+            for label, data, mtype in (("before", raw, media_type), ("after", processed, out_type)):
+                started = time.perf_counter()
+                _, usage = _ocr_image(base64.b64encode(data).decode("ascii"), mtype)
+                totals[f"ocr_ms_{label}"] += (time.perf_counter() - started) * 1000
+                totals[f"input_tokens_{label}"] += usage["input_tokens"]
+
+    if not names:
+        print("No images found.")
+        return totals
+    n = len(names)
+    print(f"\n{n} images: bytes {totals['bytes_before']} -> {totals['bytes_after']} "
+          f"({100 * (1 - totals['bytes_after'] / max(totals['bytes_before'], 1)):.0f}% saved), "
+          f"est tokens {totals['tokens_before']} -> {totals['tokens_after']}, "
+          f"avg preprocessing {totals['prep_ms'] / n:.1f} ms")
+    if invoke:
+        print(f"model latency avg {totals['ocr_ms_before'] / n:.0f} ms -> {totals['ocr_ms_after'] / n:.0f} ms, "
+              f"input tokens {totals['input_tokens_before']} -> {totals['input_tokens_after']}")
+    return totals
+
+
+if __name__ == "__main__":
+    # python tipjar-api-resource-claude-ocr.py <sample image dir> [--invoke]
+    if len(sys.argv) < 2:
+        print("usage: python tipjar-api-resource-claude-ocr.py <sample image dir> [--invoke]")
+        sys.exit(1)
+    bench(sys.argv[1], invoke="--invoke" in sys.argv[2:])
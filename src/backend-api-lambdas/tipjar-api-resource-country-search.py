@@ -1,12 +1,18 @@
 # website.url/countries
 
 import json
+import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
 # --- Common Lambda Layer ---
-from common.db import get_db_connection
+from common.db import db_connection
 from common.utils import with_cors
+from common import gazetteer
+
+# When set, mode=fuzzy is answered from the memory-mapped gazetteer snapshot
+# (see common/gazetteer.py) instead of Postgres.
+GAZETTEER_SNAPSHOT = os.environ.get("GAZETTEER_SNAPSHOT")
 
 def search_locations(cur, country, location):
     """
@@ -34,12 +40,57 @@ def search_locations(cur, country, location):
     results = cur.fetchall()
     return {"statusCode": 200, "body": json.dumps(results, default=str)}
 
+def search_locations_fuzzy(cur, country, location, limit=25):
+    """
+    Indexed search (mode=fuzzy). Matches on prefix, on trigram similarity of the
+    normalized name (typos), and on the transliteration key so spelling variants
+    of Arabic/Persian names find each other. Results are ranked best-first.
+    See sql/004 for the columns and indexes this relies on.
+    """
+    sql = """
+        WITH q AS (
+            SELECT gazetteer_norm(%(location)s) AS norm, gazetteer_key(%(location)s) AS key
+        )
+        SELECT
+            l.location,
+            l.mgrs,
+            p.province,
+            c.country,
+            round((
+                CASE WHEN l.location_norm = q.norm THEN 1
+                     WHEN l.location_norm LIKE q.norm || '%%' THEN 0.5
+                     ELSE 0 END
+                + GREATEST(similarity(l.location_norm, q.norm), similarity(l.location_key, q.key))
+            )::numeric, 3)::float8 AS score
+        FROM q, locations l
+        JOIN provinces p ON l.province_id = p.id
+        JOIN countries c ON p.country_id = c.id
+        WHERE (l.location_norm LIKE q.norm || '%%'
+               OR l.location_norm %% q.norm
+               OR l.location_key %% q.key)
+          -- An empty norm (punctuation only) would prefix-match every location
+          AND q.norm <> ''
+          AND lower(c.country) = lower(%(country)s)
+        ORDER BY score DESC, l.location ASC
+        LIMIT %(limit)s;
+    """
+    cur.execute(sql, {"location": location, "country": country, "limit": limit})
+    results = cur.fetchall()
+    return {"statusCode": 200, "body": json.dumps(results, default=str)}
+
+def search_locations_snapshot(country, location, limit=25):
+    """Same ranking as search_locations_fuzzy, served from the snapshot with lat/lon included."""
+    results = gazetteer.load(GAZETTEER_SNAPSHOT).search(country, location, limit)
+    return {"statusCode": 200, "body": json.dumps(results)}
+
 # --- Lambda Entry Point ---
 
 def lambda_handler(event, context):
     """
     Handles GET requests to the /countries resource.
     Expects 'country' and 'location' as query string parameters.
+    Optional 'mode=fuzzy' (ranked, typo tolerant) with 'limit' (default 25, max 100).
+    Fuzzy lookups skip the database when GAZETTEER_SNAPSHOT points at a snapshot.
     """
     # Handle CORS preflight requests
     if event.get("httpMethod") == "OPTIONS":
@@ -49,7 +100,6 @@ def lambda_handler(event, context):
     if event.get("httpMethod") != "GET":
         return with_cors({'statusCode': 405, 'body': json.dumps({'message': 'Method Not Allowed'})})
 
-    conn = None
     try:
         # Extract parameters from the query string
         qp = event.get("queryStringParameters") or {}
@@ -63,16 +113,30 @@ def lambda_handler(event, context):
                 "body": json.dumps({"message": "Both 'country' and 'location' query string parameters are required."})
             })
 
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        fuzzy = (qp.get("mode") or "").lower() == "fuzzy"
+        if fuzzy and not gazetteer.normalize(location):
+            return with_cors({
+                "statusCode": 400,
+                "body": json.dumps({"message": "'location' must contain at least one letter or digit."})
+            })
+        try:
+            limit = min(max(int(qp.get("limit") or 25), 1), 100)
+        except ValueError:
+            limit = 25
+
+        if fuzzy and GAZETTEER_SNAPSHOT and os.path.exists(GAZETTEER_SNAPSHOT):
+            return with_cors(search_locations_snapshot(country, location, limit))
+
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        response = search_locations(cur, country, location)
-        return with_cors(response)
+            if fuzzy:
+                response = search_locations_fuzzy(cur, country, location, limit)
+            else:
+                response = search_locations(cur, country, location)
+            return with_cors(response)
 
     except psycopg2.Error as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Database error: {str(e)}"})})
     except Exception as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Server error: {str(e)}"})})
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
@@ -1,17 +1,19 @@
 # website.url/dirty_words
 
 import json
+from collections import deque
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
 # --- Common Lambda Layer ---
-from common.db import get_db_connection
-from common.utils import with_cors, parse_body
+from common.db import db_connection
+from common.utils import with_cors, parse_body, versioned_response
 
-def get_all_dirty_words(cur):
-    cur.execute("SELECT id, dirty_word, word_classification FROM dirty_words ORDER BY dirty_word;")
-    rows = cur.fetchall()
-    return {"statusCode": 200, "body": json.dumps(rows, default=str)}
+def get_all_dirty_words(cur, event):
+    def load():
+        cur.execute("SELECT id, dirty_word, word_classification FROM dirty_words ORDER BY dirty_word;")
+        return cur.fetchall()
+    return versioned_response(cur, event, "dirty_words", load)
 
 def get_dirty_word_by_id(cur, word_id: int):
     cur.execute("SELECT id, dirty_word, word_classification FROM dirty_words WHERE id = %s;", (word_id,))
@@ -63,6 +65,144 @@ def delete_dirty_word(cur, conn, word_id: int):
     conn.commit()
     return {"statusCode": 200, "body": json.dumps({"message": f"Word with id {word_id} deleted"})}
 
+# --- Scanning (POST /dirty_words/scan) ---
+# The word list is compiled into an Aho-Corasick automaton once per container and
+# only rebuilt when dirty_words changes, so a scan costs one pass over the text
+# regardless of how many words are on the list.
+
+_CLASS_RANK = {"U": 0, "CUI": 1, "CUIREL": 2}
+
+_automaton = None
+_automaton_version = None
+
+def _fold(text):
+    """Lower-cases character by character so match offsets still line up with the original text."""
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+def _is_word_char(c):
+    return c.isalnum() or c == "_"
+
+def _build_automaton(words):
+    """
+    Builds the goto/fail/output tables for a list of dirty_words rows.
+    Returns (goto, fail, out) where out[state] lists (length, row) for every word ending there.
+    """
+    goto, fail, out = [{}], [0], [[]]
+    for row in words:
+        pattern = _fold(row["dirty_word"] or "").strip()
+        if not pattern:
+            continue
+        state = 0
+        for c in pattern:
+            nxt = goto[state].get(c)
+            if nxt is None:
+                goto.append({}); fail.append(0); out.append([])
+                nxt = goto[state][c] = len(goto) - 1
+            state = nxt
+        out[state].append((len(pattern), row))
+
+    # Breadth-first pass to fill in failure links and inherit outputs along them
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for c, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and c not in goto[f]:
+                f = fail[f]
+            target = goto[f].get(c, 0)
+            fail[nxt] = target if target != nxt else 0
+            out[nxt] = out[nxt] + out[fail[nxt]]
+    return goto, fail, out
+
+def _dirty_words_version(cur):
+    """
+    Changes whenever a row is added, edited or deleted. Uses the table_versions
+    counter (sql/003); the (count, max xmin) stamp is the fallback without it.
+    """
+    try:
+        cur.execute("SELECT version FROM table_versions WHERE table_name = 'dirty_words';")
+        row = cur.fetchone()
+        if row:
+            return ("v", row["version"])
+    except psycopg2.Error:
+        cur.connection.rollback()
+    cur.execute("SELECT COUNT(*) AS n, COALESCE(MAX(xmin::text::bigint), 0) AS x FROM dirty_words;")
+    row = cur.fetchone()
+    return (row["n"], row["x"])
+
+def _get_automaton(cur):
+    global _automaton, _automaton_version
+    version = _dirty_words_version(cur)
+    if _automaton is None or version != _automaton_version:
+        cur.execute("SELECT id, dirty_word, word_classification FROM dirty_words;")
+        _automaton = _build_automaton(cur.fetchall())
+        _automaton_version = version
+    return _automaton
+
+def scan_text(automaton, text):
+    """
+    Finds every whole-word, case-insensitive occurrence of a dirty word in `text`,
+    the same rule as the \\bword\\b regex the browser used. Linear in len(text).
+    """
+    goto, fail, out = automaton
+    folded = _fold(text)
+    matches, state = [], 0
+    for i, c in enumerate(folded):
+        while state and c not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(c, 0)
+        for length, row in out[state]:
+            start, end = i - length + 1, i + 1
+            # Word boundary on each side (only matters where the word itself starts/ends with a word char)
+            if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+                continue
+            if end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]):
+                continue
+            matches.append({
+                "id": row["id"],
+                "word": row["dirty_word"],
+                "word_classification": row["word_classification"],
+                "start": start,
+                "end": end,
+            })
+    matches.sort(key=lambda m: (m["start"], m["end"]))
+    return matches
+
+def _highest_classification(classifications):
+    highest = "U"
+    for c in classifications:
+        if _CLASS_RANK.get(c, 0) > _CLASS_RANK[highest]:
+            highest = c
+    return highest
+
+def scan_dirty_words(cur, event):
+    """
+    Handles POST /dirty_words/scan.
+    Body is either {"text": "..."} or {"texts": {"report_body": "...", "source_description": "...", ...}}.
+    """
+    data = parse_body(event)
+
+    if isinstance(data.get("texts"), dict):
+        automaton = _get_automaton(cur)
+        fields = {}
+        for name, text in data["texts"].items():
+            matches = scan_text(automaton, str(text or ""))
+            fields[name] = {
+                "matches": matches,
+                "highest_classification": _highest_classification(m["word_classification"] for m in matches)
+            }
+        overall = _highest_classification(f["highest_classification"] for f in fields.values())
+        return {"statusCode": 200, "body": json.dumps({"fields": fields, "highest_classification": overall}, default=str)}
+
+    if "text" not in data:
+        return {"statusCode": 400, "body": json.dumps({"message": "Missing required field: 'text' or 'texts'"})}
+    matches = scan_text(_get_automaton(cur), str(data["text"] or ""))
+    return {"statusCode": 200, "body": json.dumps({
+        "matches": matches,
+        "highest_classification": _highest_classification(m["word_classification"] for m in matches)
+    }, default=str)}
+
 
 # --- Lambda Entry Point ---
 
@@ -70,40 +210,41 @@ def lambda_handler(event, context):
     if event.get("httpMethod") == "OPTIONS":
         return with_cors(None)
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        http_method = event.get("httpMethod")
-        path_params = event.get("pathParameters") or {}
-        word_id_str = path_params.get("id")
-
-        word_id = None
-        if word_id_str:
-            try:
-                word_id = int(word_id_str)
-            except ValueError:
-                return with_cors({'statusCode': 400, 'body': json.dumps({"message": "Word ID must be an integer"})})
-
-        response = None
-        if http_method == "GET":
-            response = get_dirty_word_by_id(cur, word_id) if word_id is not None else get_all_dirty_words(cur)
-        elif http_method == "POST":
-            response = create_dirty_word(cur, conn, event)
-        elif http_method == "PUT":
-            response = {"statusCode": 400, "body": json.dumps({"message": "Missing word ID for update"})} if word_id is None else update_dirty_word(cur, conn, word_id, event)
-        elif http_method == "DELETE":
-            response = {"statusCode": 400, "body": json.dumps({"message": "Missing word ID for delete"})} if word_id is None else delete_dirty_word(cur, conn, word_id)
-        else:
-            response = {"statusCode": 405, "body": json.dumps({"message": "Method Not Allowed"})}
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            http_method = event.get("httpMethod")
+            path_params = event.get("pathParameters") or {}
+            word_id_str = path_params.get("id")
+            path = (event.get("path") or event.get("resource") or "").rstrip("/")
+
+            # Behind /dirty_words/{id}, API Gateway hands "scan" over as the id
+            if http_method == "POST" and path.endswith("/scan"):
+                return with_cors(scan_dirty_words(cur, event))
+
+            word_id = None
+            if word_id_str:
+                try:
+                    word_id = int(word_id_str)
+                except ValueError:
+                    return with_cors({'statusCode': 400, 'body': json.dumps({"message": "Word ID must be an integer"})})
+
+            response = None
+            if http_method == "GET":
+                response = get_dirty_word_by_id(cur, word_id) if word_id is not None else get_all_dirty_words(cur, event)
+            elif http_method == "POST":
+                response = create_dirty_word(cur, conn, event)
+            elif http_method == "PUT":
+                response = {"statusCode": 400, "body": json.dumps({"message": "Missing word ID for update"})} if word_id is None else update_dirty_word(cur, conn, word_id, event)
+            elif http_method == "DELETE":
+                response = {"statusCode": 400, "body": json.dumps({"message": "Missing word ID for delete"})} if word_id is None else delete_dirty_word(cur, conn, word_id)
+            else:
+                response = {"statusCode": 405, "body": json.dumps({"message": "Method Not Allowed"})}
         
-        return with_cors(response)
+            return with_cors(response)
 
     except psycopg2.Error as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Database error: {str(e)}"})})
     except Exception as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Server error: {str(e)}"})})
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
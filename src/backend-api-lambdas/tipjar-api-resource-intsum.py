@@ -1,16 +1,31 @@
 # website.url/intsum
 
 import boto3
+import hashlib
 import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Import from common Lambda Layer ---
+from common.db import db_connection
 from common.utils import with_cors, parse_body
 
 # --- Client Config ---
 REGION = os.environ.get("REGION", "us-gov-west-1")
 MODEL_ID = os.environ.get("MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
 
+# --- Summary Cache Config (table: intsum_summary_cache, see sql/001) ---
+SUMMARY_CACHE_TTL_HOURS = float(os.environ.get("SUMMARY_CACHE_TTL_HOURS", 24))
+SUMMARY_CACHE_MAX_ROWS = int(os.environ.get("SUMMARY_CACHE_MAX_ROWS", 500))
+
+# --- Map-Reduce Config ---
+# Report sets estimated above MAP_REDUCE_THRESHOLD_TOKENS are split into chunks of
+# roughly CHUNK_TOKEN_BUDGET tokens, condensed in parallel, then summarized once.
+MAP_REDUCE_THRESHOLD_TOKENS = int(os.environ.get("MAP_REDUCE_THRESHOLD_TOKENS", 12000))
+CHUNK_TOKEN_BUDGET = int(os.environ.get("CHUNK_TOKEN_BUDGET", 6000))
+MAP_CONCURRENCY = int(os.environ.get("MAP_CONCURRENCY", 4))
+
 # --- Example Blocks ---
 INTSUM_EXAMPLES = """
 <example_1>
@@ -76,40 +91,44 @@ Guidelines:
 4.  Here are examples of the perfect summary style you must emulate:
 """
 
+# --- Map Step Prompt (used only for large report sets) ---
+MAP_SYSTEM_PROMPT = """You are a Military Intelligence Analyst condensing raw OSINT reports into notes for a later roll-up.
+
+Guidelines:
+1.  Group the notes by country or region, one short paragraph per country.
+2.  Keep every distinct event, actor, location, number and date. Merge duplicate reports of the same event.
+3.  Do NOT add analysis, citations, or outside information.
+4.  Do NOT use bullet points.
+"""
+
 # --- Initialize Client ---
 bedrock_client = boto3.client("bedrock-runtime", region_name=REGION)
 
-def handle_generate_summary(event):
-    """
-    Handles generating an INTSUM summary from a list of report bodies.
-    Accepts 'report_type' in body: "INTSUM" or "RFI".
-    """
-    body = parse_body(event)
-    
-    # 1. Validation: Expecting a list of strings under "reports"
-    reports = body.get("reports")
-    if not reports or not isinstance(reports, list) or len(reports) == 0:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Request body must contain a non-empty 'reports' list."})
-        }
+def _build_system_prompt(report_type):
+    """Base instructions plus the example block for the requested report type."""
+    selected_examples = RFI_EXAMPLES if report_type == "RFI" else INTSUM_EXAMPLES
+    return f"{BASE_SYSTEM_PROMPT}\n{selected_examples}"
 
-    # 2. Determine Report Type and Select Examples
-    report_type = body.get("report_type", "INTSUM")
-    
-    if report_type == "RFI":
-        selected_examples = RFI_EXAMPLES
-    else:
-        selected_examples = INTSUM_EXAMPLES
-        
-    # Combine Base Prompt with Selected Examples
-    final_system_prompt = f"{BASE_SYSTEM_PROMPT}\n{selected_examples}"
+def _report_text(report):
+    """Reports are usually plain bodies; dicts with a 'report_body' (and 'country') are also accepted."""
+    if isinstance(report, dict):
+        return str(report.get("report_body") or "")
+    return str(report)
+
+def _report_group(report):
+    if isinstance(report, dict):
+        return (report.get("country") or "").strip().upper()
+    return ""
+
+def _estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
 
-    # 3. Construct the User Prompt
+def _build_user_message(reports):
     # We join all reports into a single text block for the model to digest.
-    formatted_reports = "\n---\n".join([f"REPORT {i+1}: {r}" for i, r in enumerate(reports)])
-    
-    user_message = f"""Here are the raw OSINT reports collected for today's roll-up.
+    formatted_reports = "\n---\n".join([f"REPORT {i+1}: {_report_text(r)}" for i, r in enumerate(reports)])
+
+    return f"""Here are the raw OSINT reports collected for today's roll-up.
 Analyze them and write the summary paragraph following the guidelines and examples provided in the system prompt.
 
 <raw_reports>
@@ -118,44 +137,285 @@ Analyze them and write the summary paragraph following the guidelines and exampl
 
 Draft the summary now:"""
 
-    # 4. Construct Bedrock Payload
-    bedrock_body = {
+def _bedrock_body(system_prompt, user_message, max_tokens):
+    return {
         "anthropic_version": "bedrock-2023-05-31",
-        "system": final_system_prompt,
+        "system": system_prompt,
         "messages": [
             {
                 "role": "user",
                 "content": [{"type": "text", "text": user_message}]
             }
         ],
-        "max_tokens": 1000,
+        "max_tokens": max_tokens,
         "temperature": 0.3, # Lower temperature for more factual/consistent output
         "top_p": 0.9,
     }
 
+def _invoke_model(system_prompt, user_message, max_tokens=1000):
+    """Calls Claude on Bedrock and returns (text, usage)."""
+    resp = bedrock_client.invoke_model(
+        modelId=MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(_bedrock_body(system_prompt, user_message, max_tokens)).encode("utf-8"),
+    )
+    payload = json.loads(resp["body"].read().decode("utf-8"))
+    parts = [p.get("text", "") for p in payload.get("content", []) if p.get("type") == "text"]
+    return "\n".join(parts).strip(), payload.get("usage", {})
+
+def _stream_model(system_prompt, user_message, max_tokens=1000):
+    """
+    Streaming version of _invoke_model. Yields text deltas as they arrive and
+    returns the usage dict when the stream ends (read it from StopIteration.value,
+    or use `usage = yield from _stream_model(...)`).
+    """
+    resp = bedrock_client.invoke_model_with_response_stream(
+        modelId=MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(_bedrock_body(system_prompt, user_message, max_tokens)).encode("utf-8"),
+    )
+    usage = {}
+    for event in resp["body"]:
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+        data = json.loads(chunk["bytes"].decode("utf-8"))
+        kind = data.get("type")
+        if kind == "message_start":
+            usage.update(data.get("message", {}).get("usage", {}))
+        elif kind == "content_block_delta" and data.get("delta", {}).get("type") == "text_delta":
+            yield data["delta"]["text"]
+        elif kind == "message_delta":
+            usage.update(data.get("usage", {}))
+    return usage
+
+# --- Map-Reduce ---
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+def _split_report(text, budget):
+    """
+    Splits a report longer than `budget` tokens into consecutive pieces that each
+    fit, breaking between sentences where possible and mid-text only for a single
+    sentence that is itself too long. Later pieces are marked as continuations.
+    """
+    if _estimate_tokens(text) <= budget:
+        return [text]
+    max_chars = budget * 4 - 16 # leave room for the continuation marker
+    pieces, current = [], ""
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return [p if i == 0 else f"(continued) {p}" for i, p in enumerate(pieces)]
+
+def _chunk_reports(reports, budget):
+    """
+    Packs reports into chunks of about `budget` tokens. Reports from the same
+    country are kept together where possible so each chunk condenses cleanly.
+    Reports too long for one chunk are split across consecutive chunks.
+    """
+    groups = {}
+    for r in reports:
+        groups.setdefault(_report_group(r), []).extend(_split_report(_report_text(r), budget))
+
+    chunks, current, used = [], [], 0
+    for texts in groups.values():
+        for text in texts:
+            cost = _estimate_tokens(text)
+            if current and used + cost > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(text)
+            used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _add_usage(total, usage):
+    for k in ("input_tokens", "output_tokens"):
+        total[k] = total.get(k, 0) + int(usage.get(k, 0))
+    return total
+
+def _condense_reports(reports):
+    """
+    Map step: condenses each chunk concurrently (bounded by MAP_CONCURRENCY) until
+    the notes fit in one call. Returns (notes, usage, chunk_count).
+    """
+    def condense(chunk):
+        return _invoke_model(MAP_SYSTEM_PROMPT, _build_user_message(chunk), max_tokens=800)
+
+    usage, notes, chunk_count = {}, reports, 0
+    # Very large sets may need more than one condensing pass before the final call fits.
+    while True:
+        chunks = _chunk_reports(notes, CHUNK_TOKEN_BUDGET)
+        chunk_count += len(chunks)
+        with ThreadPoolExecutor(max_workers=max(1, min(MAP_CONCURRENCY, len(chunks)))) as pool:
+            mapped = list(pool.map(condense, chunks))
+        for _, u in mapped:
+            _add_usage(usage, u)
+        notes = [text for text, _ in mapped if text]
+        if len(chunks) == 1 or sum(_estimate_tokens(n) for n in notes) <= MAP_REDUCE_THRESHOLD_TOKENS:
+            break
+    return notes, usage, chunk_count
+
+def _map_reduce_summary(report_type, reports):
+    """Condenses the reports, then runs the normal summary prompt over the notes. Returns (text, usage, chunk_count)."""
+    notes, usage, chunk_count = _condense_reports(reports)
+    summary_text, reduce_usage = _invoke_model(_build_system_prompt(report_type), _build_user_message(notes))
+    return summary_text, _add_usage(usage, reduce_usage), chunk_count
+
+# --- Summary Cache ---
+def _summary_cache_key(report_type, reports, mode):
+    """
+    Content address for a roll-up. The prompt version is a hash of the prompt text
+    itself, so editing the instructions or examples retires old entries automatically.
+    Reports are whitespace-normalized and sorted, so re-ordering the set still hits.
+    mode is the resolved one ("single" or "hierarchical"), since the two produce
+    different summaries from the same reports; hierarchical entries also depend on
+    MAP_SYSTEM_PROMPT, which writes the notes the roll-up is made from.
+    """
+    prompt_text = _build_system_prompt(report_type) + _build_user_message(["{}"])
+    if mode == "hierarchical":
+        prompt_text += MAP_SYSTEM_PROMPT
+    prompt_version = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+    normalized = sorted(re.sub(r"\s+", " ", _report_text(r)).strip() for r in reports)
+    key_material = json.dumps([report_type, mode, MODEL_ID, prompt_version, normalized], ensure_ascii=False)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+def _get_cached_summary(cache_key):
+    """Returns (summary, usage) for a live cache entry, or None. Cache errors never block generation."""
     try:
-        # 5. Invoke Model
-        resp = bedrock_client.invoke_model(
-            modelId=MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(bedrock_body).encode("utf-8"),
-        )
-        
-        # 6. Parse Response
-        payload = json.loads(resp["body"].read().decode("utf-8"))
-        parts = [p.get("text", "") for p in payload.get("content", []) if p.get("type") == "text"]
-        summary_text = "\n".join(parts).strip()
-        
-        usage = payload.get("usage", {})
-        
-        # 7. Return Result
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE intsum_summary_cache
+                SET last_hit_on = NOW(), hit_count = hit_count + 1
+                WHERE cache_key = %s AND created_on > NOW() - make_interval(secs => %s)
+                RETURNING summary, usage;
+            """, (cache_key, SUMMARY_CACHE_TTL_HOURS * 3600))
+            row = cur.fetchone()
+            conn.commit()
+            return row
+    except Exception as e:
+        print(f"Summary cache lookup failed: {e}")
+        return None
+
+def _store_summary(cache_key, report_type, summary, usage):
+    """Saves a fresh summary, then evicts expired entries and anything past the size cap (LRU)."""
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO intsum_summary_cache (cache_key, report_type, model_id, summary, usage)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (cache_key) DO UPDATE
+                SET summary = EXCLUDED.summary, usage = EXCLUDED.usage,
+                    created_on = NOW(), last_hit_on = NOW();
+            """, (cache_key, report_type, MODEL_ID, summary, json.dumps(usage)))
+            cur.execute("""
+                DELETE FROM intsum_summary_cache
+                WHERE created_on <= NOW() - make_interval(secs => %s)
+                   OR cache_key IN (
+                       SELECT cache_key FROM intsum_summary_cache
+                       ORDER BY last_hit_on DESC OFFSET %s
+                   );
+            """, (SUMMARY_CACHE_TTL_HOURS * 3600, SUMMARY_CACHE_MAX_ROWS))
+            conn.commit()
+    except Exception as e:
+        print(f"Summary cache store failed: {e}")
+
+def _parse_summary_request(body):
+    """
+    Validates a summary request. Returns (error_response, None) or (None, request),
+    where request carries report_type, reports, mode, cache_key and bypass_cache.
+    """
+    # 1. Validation: Expecting a list of strings under "reports"
+    reports = body.get("reports")
+    if not reports or not isinstance(reports, list) or len(reports) == 0:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "Request body must contain a non-empty 'reports' list."})
+        }, None
+
+    # 2. Pick single-call or map-reduce
+    mode = (body.get("mode") or "auto").lower()
+    if mode not in ("auto", "single", "hierarchical"):
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "'mode' must be 'auto', 'single' or 'hierarchical'."})
+        }, None
+    if mode == "auto":
+        estimated = sum(_estimate_tokens(_report_text(r)) for r in reports)
+        mode = "hierarchical" if estimated > MAP_REDUCE_THRESHOLD_TOKENS else "single"
+
+    report_type = body.get("report_type", "INTSUM")
+    return None, {
+        "report_type": report_type,
+        "reports": reports,
+        "mode": mode,
+        "cache_key": _summary_cache_key(report_type, reports, mode),
+        "bypass_cache": str(body.get("bypass_cache", "false")).lower() == "true",
+    }
+
+def handle_generate_summary(event):
+    """
+    Handles generating an INTSUM summary from a list of report bodies.
+    Accepts 'report_type' in body: "INTSUM" or "RFI".
+    Identical requests are served from the summary cache unless 'bypass_cache' is true.
+    'mode' may be "single", "hierarchical" (map-reduce) or "auto" (default), which
+    switches to hierarchical once the report set is too large for one call.
+    """
+    error, req = _parse_summary_request(parse_body(event))
+    if error:
+        return error
+    report_type, reports, mode = req["report_type"], req["reports"], req["mode"]
+
+    # 3. Check the cache
+    if not req["bypass_cache"]:
+        cached = _get_cached_summary(req["cache_key"])
+        if cached:
+            summary_text, usage = cached
+            return {
+                "statusCode": 200,
+                "body": json.dumps({
+                    "summary": summary_text,
+                    "usage": usage or {},
+                    "type_used": report_type,
+                    "cached": True
+                })
+            }
+
+    try:
+        # 4. Invoke Model
+        chunk_count = 1
+        if mode == "hierarchical":
+            summary_text, usage, chunk_count = _map_reduce_summary(report_type, reports)
+        else:
+            summary_text, usage = _invoke_model(_build_system_prompt(report_type), _build_user_message(reports))
+
+        # 5. Cache and Return Result
+        if summary_text:
+            _store_summary(req["cache_key"], report_type, summary_text, usage)
         return {
             "statusCode": 200,
             "body": json.dumps({
                 "summary": summary_text,
                 "usage": usage,
-                "type_used": report_type
+                "type_used": report_type,
+                "mode": mode,
+                "chunks": chunk_count,
+                "cached": False
             })
         }
 
@@ -166,6 +426,72 @@ Draft the summary now:"""
             "body": json.dumps({"error": f"Model generation failed: {str(e)}"})
         }
 
+# --- Streaming ---
+def _wants_stream(body):
+    """'stream' is a flag like 'bypass_cache': only true or "true" turn it on."""
+    return str(body.get("stream", "false")).lower() == "true"
+
+def stream_summary_events(req):
+    """
+    Generates the summary as a sequence of events for streaming clients:
+      {"type": "delta", "text": "..."}   one per model token batch
+      {"type": "done", "usage": {...}, "type_used": ..., "mode": ..., "cached": bool}
+      {"type": "error", "error": "..."}  if generation fails part-way
+    In hierarchical mode the map step runs first and only the final pass is streamed.
+    """
+    report_type, reports, mode = req["report_type"], req["reports"], req["mode"]
+
+    if not req["bypass_cache"]:
+        cached = _get_cached_summary(req["cache_key"])
+        if cached:
+            summary_text, usage = cached
+            yield {"type": "delta", "text": summary_text}
+            yield {"type": "done", "usage": usage or {}, "type_used": report_type, "mode": mode, "cached": True}
+            return
+
+    try:
+        usage, notes = {}, reports
+        if mode == "hierarchical":
+            # Reuse the map step, then stream the reduce over its notes
+            notes, usage, _ = _condense_reports(reports)
+
+        parts = []
+        stream = _stream_model(_build_system_prompt(report_type), _build_user_message(notes))
+        while True:
+            try:
+                text = next(stream)
+            except StopIteration as stop:
+                _add_usage(usage, stop.value or {})
+                break
+            parts.append(text)
+            yield {"type": "delta", "text": text}
+
+        summary_text = "".join(parts).strip()
+        if summary_text:
+            _store_summary(req["cache_key"], report_type, summary_text, usage)
+        yield {"type": "done", "usage": usage, "type_used": report_type, "mode": mode, "cached": False}
+
+    except Exception as e:
+        print(f"Bedrock streaming failed: {e}")
+        yield {"type": "error", "error": f"Model generation failed: {str(e)}"}
+
+def handle_stream_summary(event):
+    """
+    'stream': true through API Gateway. API Gateway buffers Lambda output, so this
+    returns the same NDJSON events in one body; serve the file through
+    common.streaming (directly or behind the Lambda Web Adapter) to get them
+    incrementally.
+    """
+    error, req = _parse_summary_request(parse_body(event))
+    if error:
+        return error
+    lines = [json.dumps(e) for e in stream_summary_events(req)]
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/x-ndjson"},
+        "body": "\n".join(lines) + "\n"
+    }
+
 def lambda_handler(event, context):
     """
     Main router.
@@ -179,7 +505,9 @@ def lambda_handler(event, context):
         path = event.get("path", "")
 
         # Route POST requests
-        if http_method == "POST":
+        if http_method == "POST" and _wants_stream(parse_body(event)):
+            response = handle_stream_summary(event)
+        elif http_method == "POST":
             response = handle_generate_summary(event)
         else:
             response = {
@@ -193,4 +521,30 @@ def lambda_handler(event, context):
         return with_cors({
             "statusCode": 500, 
             "body": json.dumps({"message": f"Server error: {str(e)}"})
-        })
\ No newline at end of file
+        })
+
+# --- Streaming HTTP Adapter ---
+def stream_summary(event):
+    """
+    Streams POST /intsum with 'stream': true as chunked NDJSON when served through
+    common.streaming, so the first tokens show up while the model is still writing.
+    Other requests go through lambda_handler unchanged.
+    """
+    if event["httpMethod"] != "POST":
+        return None
+    try:
+        body = parse_body(event)
+    except ValueError:
+        body = {}
+    if not _wants_stream(body):
+        return None
+
+    error, req = _parse_summary_request(body)
+    if error:
+        return error
+    lines = ((json.dumps(e) + "\n").encode("utf-8") for e in stream_summary_events(req))
+    return {"Content-Type": "application/x-ndjson"}, lines
+
+if __name__ == "__main__":
+    from common.streaming import serve
+    serve(lambda_handler, stream_summary, "Streaming INTSUM")
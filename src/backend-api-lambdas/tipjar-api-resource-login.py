@@ -12,7 +12,7 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 
 # --- Imports from your Lambda Layer ---
-from common.db import get_db_connection
+from common.db import db_connection
 from common.utils import with_cors, parse_body
 
 # --- Environment Variables ---
@@ -91,19 +91,15 @@ def lambda_handler(event, context):
     if event.get("httpMethod") != "POST":
         return with_cors({'statusCode': 405, 'body': json.dumps({'message': 'Method Not Allowed'})})
 
-    conn = None
     try:
-        conn = get_db_connection()
-        # Using RealDictCursor to get column names automatically
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        response = _handle_login_logic(cur, conn, event)
-        return with_cors(response)
+        with db_connection() as conn:
+            # Using RealDictCursor to get column names automatically
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            response = _handle_login_logic(cur, conn, event)
+            return with_cors(response)
 
     except psycopg2.Error as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Database connection error: {str(e)}"})})
     except Exception as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"A server error occurred: {str(e)}"})})
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
@@ -1,11 +1,23 @@
 # website.url/reports
 
+import base64
+import csv
+import gzip
+import io
 import json
+import os
+import tempfile
+import time
 import uuid
+import zlib
+from collections import OrderedDict
+from datetime import date, timedelta
+import boto3
 import psycopg2
+from psycopg2.extras import execute_values
 
 # --- Common Lambda Layer ---
-from common.db import get_db_connection
+from common.db import db_connection
 from common.utils import with_cors, parse_body
 
 def _json(status, payload):
@@ -26,16 +38,95 @@ _REPORT_COLS = [
     "did_what","uid","article_title","article_author","report_body","collector_classification",
     "source_description","additional_comment_text","image_url","modified_by","modified_on", "requirements"
 ]
-_SORTABLE = {"created_on", "date_of_information", "country", "source_platform", "source_name"}
+_SORTABLE = {"created_on", "date_of_information", "doi_date", "country", "source_platform", "source_name"}
+
+# Computed fields that can be asked for alongside real columns
+_FIELD_EXPRESSIONS = {
+    "report_excerpt": "left(report_body, 240) AS report_excerpt",
+}
+
+# Named column sets for fields=. "summary" is what the search grid shows: it
+# leaves out the large free-text columns and carries a short excerpt of the body.
+_FIELD_PRESETS = {
+    "full": _REPORT_COLS,
+    "summary": [
+        "overall_classification", "title", "date_of_information", "created_on", "created_by",
+        "country", "location", "source_platform", "source_name", "report_excerpt"
+    ],
+}
+
+def _select_fields(qp, sort):
+    """
+    Columns to SELECT for fields=<preset> or fields=col1,col2 (default: full).
+    id and the sort column always come along since paging needs them.
+    Raises ValueError on unknown names.
+    """
+    requested = (qp.get("fields") or "full").strip()
+    if requested.lower() in _FIELD_PRESETS:
+        cols = list(_FIELD_PRESETS[requested.lower()])
+    else:
+        # Duplicates would make the ORDER BY column ambiguous
+        cols = list(dict.fromkeys(c.strip() for c in requested.split(",") if c.strip()))
+        unknown = [c for c in cols if c not in _REPORT_COLS and c not in _FIELD_EXPRESSIONS and c not in ("id", "doi_date")]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)} (or use one of {sorted(_FIELD_PRESETS)})")
+    for c in (sort, "id"):
+        if c not in cols:
+            cols.append(c)
+    return cols
+
+def _select_list(cols):
+    return ", ".join(_FIELD_EXPRESSIONS.get(c, c) for c in cols)
+
+def _encode_cursor(sort, order, row):
+    """Packs the last row's sort key and id into an opaque keyset cursor."""
+    payload = {"s": sort, "o": order, "v": row[sort], "id": row["id"]}
+    raw = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(token):
+    """Reverses _encode_cursor. Raises ValueError on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if payload["s"] not in _SORTABLE or payload["o"] not in ("ASC", "DESC") or not payload["id"]:
+            raise ValueError
+        return payload
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def _keyset_clause(sort, order, value, last_id):
+    """
+    WHERE fragment that seeks past (value, last_id) under ORDER BY sort, id with NULLS LAST.
+    Non-null keys use a row-value comparison; once we're into the trailing NULLs only id moves.
+    """
+    op = ">" if order == "ASC" else "<"
+    if value is None:
+        return f"({sort} IS NULL AND id {op} %s)", [last_id]
+    return f"(({sort}, id) {op} (%s, %s) OR {sort} IS NULL)", [value, last_id]
 
 # --- Core Logic Functions (Copied from original file) ---
 
-def get_all_reports(cur, event):
-    qp = (event or {}).get("queryStringParameters") or {}
+# ts_headline options for relevance mode: a couple of short fragments around the hits
+HEADLINE_OPTIONS = os.environ.get(
+    "REPORTS_HEADLINE_OPTIONS", "MaxFragments=2, MaxWords=35, MinWords=15, StartSel=<mark>, StopSel=</mark>"
+)
+
+def _tsquery(qp):
+    """
+    SQL for the q= text query. sort=relevance (or q_syntax=websearch) takes
+    websearch syntax: "quoted phrases", OR, and -negation.
+    """
+    if qp.get("sort") == "relevance" or (qp.get("q_syntax") or "").lower() == "websearch":
+        return "websearch_to_tsquery('english', %s)"
+    return "plainto_tsquery('english', %s)"
+
+def _build_filters(qp):
+    """Turns the GET /reports query string into WHERE fragments and their params."""
     where, params = [], []
 
     if qp.get("q"):
-        where.append("search_vector @@ plainto_tsquery('english', %s)")
+        where.append(f"search_vector @@ {_tsquery(qp)}")
         params.append(qp["q"])
     
     if qp.get("location"):
@@ -53,49 +144,424 @@ def get_all_reports(cur, event):
                 where.append(f"{field} = %s")
                 params.append(qp[field])
 
+    # Requirement category codes (e.g. 17208, or "17208,17245" for any of them).
+    # Served by the GIN index on requirement_categories, see sql/002.
+    if qp.get("category"):
+        try:
+            codes = sorted({int(c) for c in str(qp["category"]).split(",") if c.strip()})
+        except ValueError:
+            raise ValueError("category must be a comma-separated list of category codes")
+        where.append("requirement_categories && %s::integer[]"); params.append(codes)
+
     if qp.get("doi_prefix"):
         where.append("date_of_information LIKE %s"); params.append(qp["doi_prefix"] + "%")
+    # Real date range on date_of_information (doi_date, see sql/005)
+    if qp.get("doi_from"):
+        where.append("doi_date >= %s"); params.append(qp["doi_from"])
+    if qp.get("doi_to"):
+        where.append("doi_date <= %s"); params.append(qp["doi_to"])
     if qp.get("created_from"):
         where.append("created_on >= %s"); params.append(qp["created_from"])
     if qp.get("created_to"):
         where.append("created_on <= %s"); params.append(qp["created_to"])
 
-    # --- NEW: Get the total count ---
-    # Build the base query for counting total matching reports
-    count_sql = "SELECT COUNT(*) FROM tip_reports"
-    if where:
-        count_sql += " WHERE " + " AND ".join(where)
-    
-    # Execute the count query with the same parameters (before adding limit/offset)
-    cur.execute(count_sql, tuple(params))
-    total_count = cur.fetchone()[0]
-    # --- END NEW ---
+    return where, params
+
+def _where_sql(where):
+    return (" WHERE " + " AND ".join(where)) if where else ""
 
+def _estimate_count(cur, where, params):
+    """Planner's row estimate for the filter; costs a plan, not a scan."""
+    cur.execute("EXPLAIN (FORMAT JSON) SELECT 1 FROM tip_reports" + _where_sql(where), tuple(params))
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+_TOTAL_MODES = {"exact", "estimate", "none"}
+
+def get_all_reports(cur, event):
+    qp = (event or {}).get("queryStringParameters") or {}
+    # sort=relevance ranks full-text matches with ts_rank_cd and swaps report_body
+    # for a ts_headline snippet (unless report_body is asked for by name).
+    relevance = qp.get("sort") == "relevance"
     sort = qp.get("sort", "created_on") if qp.get("sort") in _SORTABLE else "created_on"
+    try:
+        where, params = _build_filters(qp)
+        cols = _select_fields(qp, "id" if relevance else sort)
+    except ValueError as e:
+        return _json(400, {"message": str(e)})
+    if relevance:
+        if not qp.get("q"):
+            return _json(400, {"message": "sort=relevance needs a q search"})
+        if qp.get("cursor") or (qp.get("paging") or "").lower() == "cursor":
+            return _json(400, {"message": "sort=relevance only supports offset paging"})
+        if "report_body" not in (qp.get("fields") or "").split(","):
+            cols = [c for c in cols if c != "report_body"]
+
+    # total=exact (default) counts in the same round trip as the page,
+    # total=estimate uses the planner's guess, total=none skips counting.
+    total_mode = (qp.get("total") or "exact").lower()
+    if total_mode not in _TOTAL_MODES:
+        return _json(400, {"message": f"total must be one of {sorted(_TOTAL_MODES)}"})
+
     order = "ASC" if (qp.get("order") or "").lower() == "asc" else "DESC"
     limit = int(qp.get("limit") or 50)
     offset = int(qp.get("offset") or 0)
 
-    # Now, build the query to get the actual data page
-    sql = f"SELECT {', '.join(_REPORT_COLS)}, id FROM tip_reports"
-    if where:
-        sql += " WHERE " + " AND ".join(where)
-    sql += f" ORDER BY {sort} {order} NULLS LAST LIMIT %s OFFSET %s;"
-    
-    # Add limit and offset to the parameters for this query
-    params.extend([limit, offset])
+    # Keyset paging: "paging=cursor" starts it, "cursor=<token>" continues it.
+    # Without either we fall back to LIMIT/OFFSET for older clients.
+    use_cursor = bool(qp.get("cursor")) or (qp.get("paging") or "").lower() == "cursor"
+    page_where, page_params = list(where), list(params)
+    if qp.get("cursor"):
+        try:
+            cursor = _decode_cursor(qp["cursor"])
+        except ValueError as e:
+            return _json(400, {"message": str(e)})
+        if (cursor["s"], cursor["o"]) != (sort, order):
+            return _json(400, {"message": "Cursor does not match the requested sort/order"})
+        clause, clause_params = _keyset_clause(sort, order, cursor["v"], cursor["id"])
+        page_where.append(clause)
+        page_params.extend(clause_params)
 
-    cur.execute(sql, tuple(params))
+    # Now, build the query to get the actual data page.
+    # id breaks ties so both paging modes have a stable, total order, and one
+    # extra row is fetched so we know whether there is a next page.
+    if relevance:
+        # Rank every match but only build headlines for the rows on this page:
+        # the inner query picks the page, the outer one adds the snippets.
+        order_by = "rank DESC, id DESC"
+        tsq = _tsquery(qp)
+        ranked = (
+            f"SELECT {_select_list(cols)}, ts_rank_cd(search_vector, {tsq}) AS rank "
+            f"FROM tip_reports{_where_sql(page_where)} ORDER BY {order_by} LIMIT %s OFFSET %s"
+        )
+        page_sql = (
+            f"SELECT p.*, ts_headline('english', coalesce(t.report_body, ''), {tsq}, %s) AS headline "
+            f"FROM ({ranked}) p JOIN tip_reports t ON t.id = p.id ORDER BY p.rank DESC, p.id DESC"
+        )
+        page_params = [qp["q"], HEADLINE_OPTIONS, qp["q"]] + page_params + [limit + 1, offset]
+    else:
+        order_by = f"{sort} {order} NULLS LAST, id {order}"
+        page_sql = f"SELECT {_select_list(cols)} FROM tip_reports{_where_sql(page_where)} ORDER BY {order_by} LIMIT %s"
+        page_params.append(limit + 1)
+        if not use_cursor:
+            page_sql += " OFFSET %s"
+            page_params.append(offset)
+
+    if total_mode == "exact":
+        # The count rides along with the page. LEFT JOIN from the count keeps one
+        # row even when the page is empty.
+        sql = f"""
+            WITH total AS (SELECT COUNT(*) AS n FROM tip_reports{_where_sql(where)}),
+                 page AS ({page_sql})
+            SELECT page.*, total.n AS _total FROM total LEFT JOIN page ON true
+            ORDER BY {", ".join(f"page.{c}" for c in order_by.split(", "))};
+        """
+        cur.execute(sql, tuple(params + page_params))
+    else:
+        cur.execute(page_sql + ";", tuple(page_params))
     rows = cur.fetchall()
     cols = [d[0] for d in cur.description]
-    
+    results = [dict(zip(cols, r)) for r in rows]
+
+    total_count = None
+    if total_mode == "exact":
+        total_count = results[0].pop("_total") if results else 0
+        for r in results[1:]:
+            r.pop("_total")
+        results = [r for r in results if r["id"] is not None]
+    elif total_mode == "estimate":
+        total_count = _estimate_count(cur, where, params)
+
+    has_more = limit > 0 and len(results) > limit
+    results = results[:limit]
+
     # --- NEW: Return data in a structured object ---
     response_data = {
         "total": total_count,
-        "results": [dict(zip(cols, r)) for r in rows]
+        "total_mode": total_mode,
+        "has_more": has_more,
+        "results": results
     }
+    if use_cursor:
+        response_data["next_cursor"] = _encode_cursor(sort, order, results[-1]) if has_more else None
     return _json(200, response_data)
 
+# --- Facets (GET /reports/facets) ---
+# Counts per value for a few dimensions under the same filters as GET /reports.
+# The scalar dimensions share one GROUPING SETS pass over the filtered rows and
+# categories are unnested from the same CTE, so it is one statement either way.
+
+FACETS_CACHE_TTL = float(os.environ.get("REPORTS_FACETS_CACHE_TTL", 30))
+FACETS_CACHE_SIZE = int(os.environ.get("REPORTS_FACETS_CACHE_SIZE", 128))
+_FACET_DIMS = ["country", "source_platform", "macom", "overall_classification"]
+
+_facets_cache = OrderedDict()
+
+def _facets_cache_get(key):
+    entry = _facets_cache.get(key)
+    if entry is None:
+        return None
+    if time.time() - entry[0] > FACETS_CACHE_TTL:
+        del _facets_cache[key]
+        return None
+    _facets_cache.move_to_end(key)
+    return entry[1]
+
+def _facets_cache_put(key, value):
+    _facets_cache[key] = (time.time(), value)
+    _facets_cache.move_to_end(key)
+    while len(_facets_cache) > FACETS_CACHE_SIZE:
+        _facets_cache.popitem(last=False)
+
+def get_report_facets(cur, event):
+    """
+    Handles GET /reports/facets. Takes the GET /reports filters plus facet_limit
+    (values kept per dimension, default 20). Paging/sort parameters are ignored,
+    so every page of one search shares a cache entry.
+    """
+    qp = (event or {}).get("queryStringParameters") or {}
+    try:
+        where, params = _build_filters(qp)
+        facet_limit = min(max(int(qp.get("facet_limit") or 20), 1), 200)
+    except ValueError as e:
+        return _json(400, {"message": str(e)})
+
+    # The generated WHERE and its params are already a normalized form of the filter
+    key = (tuple(where), json.dumps(params, default=str), facet_limit)
+    cached = _facets_cache_get(key)
+    if cached is not None:
+        return _json(200, dict(cached, cached=True))
+
+    label = " ".join(f"WHEN GROUPING({d}) = 0 THEN '{d}'" for d in _FACET_DIMS)
+    sql = f"""
+        WITH f AS MATERIALIZED (
+            SELECT {", ".join(_FACET_DIMS)}, requirement_categories FROM tip_reports{_where_sql(where)}
+        )
+        SELECT CASE {label} ELSE 'total' END AS facet,
+               COALESCE({", ".join(f"{d}::text" for d in _FACET_DIMS)}) AS value,
+               COUNT(*) AS n
+        FROM f
+        GROUP BY GROUPING SETS ({", ".join(f"({d})" for d in _FACET_DIMS)}, ())
+        UNION ALL
+        SELECT 'category', c::text, COUNT(*) FROM f, unnest(f.requirement_categories) AS c GROUP BY c;
+    """
+    cur.execute(sql, tuple(params))
+
+    total, facets = 0, {d: [] for d in _FACET_DIMS + ["category"]}
+    for facet, value, n in cur.fetchall():
+        if facet == "total":
+            total = n
+        else:
+            facets[facet].append({"value": value, "count": n})
+    for name, values in facets.items():
+        values.sort(key=lambda v: (-v["count"], v["value"] is None, v["value"] or ""))
+        facets[name] = values[:facet_limit]
+
+    payload = {"total": total, "facets": facets}
+    _facets_cache_put(key, payload)
+    return _json(200, dict(payload, cached=False))
+
+# --- Daily roll-up (GET /reports/rollup) ---
+# Reads report_daily_rollup (sql/005), which a trigger keeps current per
+# (date of information, country), so a date window is a primary key range scan.
+
+ROLLUP_MAX_DAYS = int(os.environ.get("REPORTS_ROLLUP_MAX_DAYS", 92))
+
+def get_report_rollup(cur, event):
+    """
+    Handles GET /reports/rollup?from=YYYY-MM-DD&to=YYYY-MM-DD[&country=...].
+    Returns the per-day/per-country counts, ids and category breakdowns.
+    With include=reports the reports themselves come back too (fields= applies),
+    looked up by primary key from the roll-up's id lists. Reports whose
+    date_of_information doesn't parse are never rolled up, so those are matched
+    on created_on instead and counted in "undated".
+    """
+    qp = (event or {}).get("queryStringParameters") or {}
+    try:
+        day_from = date.fromisoformat(qp.get("from") or "")
+        day_to = date.fromisoformat(qp.get("to") or qp.get("from") or "")
+    except ValueError:
+        return _json(400, {"message": "from and to must be dates (YYYY-MM-DD)"})
+    if day_to < day_from or (day_to - day_from).days >= ROLLUP_MAX_DAYS:
+        return _json(400, {"message": f"to must be on or after from and at most {ROLLUP_MAX_DAYS} days later"})
+
+    where, params = ["day BETWEEN %s AND %s"], [day_from, day_to]
+    if qp.get("country"):
+        where.append("country = %s"); params.append(qp["country"])
+    rollup_where = " AND ".join(where)
+
+    cur.execute(
+        f"SELECT day, country, report_count, report_ids::text[], category_counts FROM report_daily_rollup "
+        f"WHERE {rollup_where} ORDER BY day, country;",
+        tuple(params)
+    )
+    days = [
+        {"day": day, "country": country or None, "report_count": n, "report_ids": ids, "category_counts": cats}
+        for day, country, n, ids, cats in cur.fetchall()
+    ]
+    response_data = {"from": day_from, "to": day_to, "total": sum(d["report_count"] for d in days), "days": days}
+
+    if (qp.get("include") or "").lower() == "reports":
+        try:
+            cols = _select_fields(qp, "doi_date")
+        except ValueError as e:
+            return _json(400, {"message": str(e)})
+        undated_where, undated_params = "", [day_from, day_to + timedelta(days=1)]
+        if qp.get("country"):
+            undated_where = " AND country = %s"; undated_params.append(qp["country"])
+        cur.execute(
+            f"SELECT {_select_list(cols)}, doi_date IS NULL AS undated FROM tip_reports WHERE id IN ("
+            f"SELECT unnest(report_ids) FROM report_daily_rollup WHERE {rollup_where} "
+            f"UNION ALL SELECT id FROM tip_reports "
+            f"WHERE doi_date IS NULL AND created_on >= %s AND created_on < %s{undated_where}) "
+            f"ORDER BY doi_date NULLS LAST, time, id;",
+            tuple(params + undated_params)
+        )
+        names = [c[0] for c in cur.description]
+        results = [dict(zip(names, row)) for row in cur.fetchall()]
+        response_data["undated"] = sum(1 for r in results if r.pop("undated"))
+        response_data["results"] = results
+    return _json(200, response_data)
+
+# --- Export (GET /reports/export) ---
+# Same filter grammar as GET /reports, but rows come off a server-side cursor in
+# fixed-size batches and are encoded as they arrive, so memory use doesn't grow
+# with the size of the export.
+
+EXPORT_BATCH_SIZE = int(os.environ.get("REPORTS_EXPORT_BATCH_SIZE", 2000))
+# API Gateway/Lambda responses top out around 6 MB; anything bigger has to go via S3.
+EXPORT_INLINE_MAX_BYTES = int(os.environ.get("REPORTS_EXPORT_INLINE_MAX_BYTES", 5 * 1024 * 1024))
+EXPORT_BUCKET = os.environ.get("REPORTS_EXPORT_BUCKET")
+# Point this at MinIO (e.g. http://minio:9000) to use it instead of AWS S3
+EXPORT_S3_ENDPOINT = os.environ.get("REPORTS_EXPORT_S3_ENDPOINT")
+EXPORT_LINK_EXPIRY = int(os.environ.get("REPORTS_EXPORT_LINK_EXPIRY", 3600))
+_EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _export_options(qp):
+    """Validates the export-only parameters. Raises ValueError on bad input."""
+    fmt = (qp.get("format") or "ndjson").lower()
+    if fmt not in _EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {sorted(_EXPORT_FORMATS)}")
+    dest = (qp.get("dest") or "inline").lower()
+    if dest not in ("inline", "s3"):
+        raise ValueError("dest must be 'inline' or 's3'")
+    if dest == "s3" and not EXPORT_BUCKET:
+        raise ValueError("Exports to object storage are not configured")
+    return fmt, dest, str(qp.get("gzip", "false")).lower() == "true"
+
+def _csv_value(v):
+    """Flattens one value for a CSV cell: arrays are ';'-joined, JSON objects stay JSON."""
+    if v is None:
+        return ""
+    if isinstance(v, (list, tuple)):
+        return ";".join("" if x is None else str(x) for x in v)
+    if isinstance(v, dict):
+        return json.dumps(v, default=str)
+    return v
+
+def iter_export(conn, qp, fmt, stats=None):
+    """
+    Yields the export as encoded byte chunks, one per cursor batch.
+    `stats`, if given, has its "rows" entry kept up to date.
+    """
+    where, params = _build_filters(qp)
+    sort = qp.get("sort") if qp.get("sort") in _SORTABLE else "created_on"
+    order = "ASC" if (qp.get("order") or "").lower() == "asc" else "DESC"
+    cols = _select_fields(qp, sort)
+    stats = stats if stats is not None else {}
+    stats["rows"] = 0
+
+    with conn.cursor(name="reports_export") as cur:
+        cur.itersize = EXPORT_BATCH_SIZE
+        cur.execute(
+            f"SELECT {_select_list(cols)} FROM tip_reports{_where_sql(where)} ORDER BY {sort} {order} NULLS LAST, id {order};",
+            tuple(params)
+        )
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(cols)
+        while True:
+            rows = cur.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                if fmt == "csv":
+                    writer.writerow([_csv_value(v) for v in row])
+                else:
+                    buf.write(json.dumps(dict(zip(cols, row)), default=str) + "\n")
+            stats["rows"] += len(rows)
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+        if fmt == "csv" and stats["rows"] == 0:
+            yield buf.getvalue().encode("utf-8")
+
+def _export_to_s3(chunks, fmt, gzipped):
+    """Spools the chunks to /tmp (optionally gzipped), uploads them and returns (key, url, size)."""
+    s3 = boto3.client("s3", endpoint_url=EXPORT_S3_ENDPOINT)
+    key = f"exports/{uuid.uuid4()}.{fmt}" + (".gz" if gzipped else "")
+    with tempfile.NamedTemporaryFile(suffix=".export") as tmp:
+        out = gzip.GzipFile(fileobj=tmp, mode="wb") if gzipped else tmp
+        for chunk in chunks:
+            out.write(chunk)
+        if gzipped:
+            out.close()
+        tmp.flush()
+        size = tmp.tell()
+        tmp.seek(0)
+        extra = {"ContentType": _EXPORT_FORMATS[fmt]}
+        if gzipped:
+            extra["ContentEncoding"] = "gzip"
+        s3.upload_fileobj(tmp, EXPORT_BUCKET, key, ExtraArgs=extra)
+    url = s3.generate_presigned_url(
+        "get_object", Params={"Bucket": EXPORT_BUCKET, "Key": key}, ExpiresIn=EXPORT_LINK_EXPIRY
+    )
+    return key, url, size
+
+def export_reports(conn, event):
+    """
+    Handles GET /reports/export. Takes the GET /reports filters and fields= plus
+    format=ndjson|csv, gzip=true|false and dest=inline|s3.
+    Inline exports are returned in the response (up to REPORTS_EXPORT_INLINE_MAX_BYTES);
+    dest=s3 uploads the file and returns a presigned link instead.
+    """
+    qp = (event or {}).get("queryStringParameters") or {}
+    try:
+        fmt, dest, gzipped = _export_options(qp)
+        _build_filters(qp)
+        _select_fields(qp, "created_on")
+    except ValueError as e:
+        return _json(400, {"message": str(e)})
+
+    stats = {}
+    chunks = iter_export(conn, qp, fmt, stats)
+    if dest == "s3":
+        key, url, size = _export_to_s3(chunks, fmt, gzipped)
+        return _json(200, {"rows": stats["rows"], "bytes": size, "key": key, "url": url, "expires_in": EXPORT_LINK_EXPIRY})
+
+    body, size = [], 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size > EXPORT_INLINE_MAX_BYTES:
+            chunks.close()
+            return _json(413, {"message": "Export is too large to return inline, use dest=s3"})
+        body.append(chunk)
+    payload = b"".join(body)
+
+    headers = {
+        "Content-Type": _EXPORT_FORMATS[fmt],
+        "Content-Disposition": f'attachment; filename="reports.{fmt}"',
+        "X-Export-Rows": str(stats["rows"]),
+    }
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return {"statusCode": 200, "headers": headers, "isBase64Encoded": True,
+                "body": base64.b64encode(gzip.compress(payload)).decode("ascii")}
+    return {"statusCode": 200, "headers": headers, "body": payload.decode("utf-8")}
+
 def get_report_by_id(cur, report_id: str):
     cur.execute("SELECT * FROM tip_reports WHERE id = %s;", (report_id,))
     row = cur.fetchone()
@@ -123,6 +589,119 @@ def create_report(cur, conn, event):
     conn.commit()
     return _json(201, {"id": new_id})
 
+# --- Bulk ingestion (POST /reports/bulk) ---
+# Rows go in with one multi-row INSERT per batch and one commit per batch, rather
+# than a request, a statement and a commit per report.
+
+BULK_BATCH_SIZE = int(os.environ.get("REPORTS_BULK_BATCH_SIZE", 500))
+BULK_MAX_ROWS = int(os.environ.get("REPORTS_BULK_MAX_ROWS", 20000))
+_BULK_COLS = [c for c in _REPORT_COLS if c not in ("created_on", "modified_on")]
+
+def _parse_bulk_body(event):
+    """
+    Accepts a JSON array or NDJSON (one object per line).
+    Returns a list of (row, error) pairs, one per input record, in input order.
+    """
+    body = event.get("body") or ""
+    if event.get("isBase64Encoded"):
+        body = base64.b64decode(body).decode("utf-8")
+    body = body.strip()
+    if not body:
+        return []
+    if body.startswith("["):
+        return [(row, None) for row in json.loads(body)]
+    parsed = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            parsed.append((json.loads(line), None))
+        except ValueError as e:
+            parsed.append((None, f"Invalid JSON: {e}"))
+    return parsed
+
+def _validate_bulk_row(row):
+    """Same rules as create_report, plus unknown fields are rejected rather than dropped."""
+    if not isinstance(row, dict):
+        return "Each report must be a JSON object"
+    if not row.get("created_by") or not row.get("report_body"):
+        return "created_by and report_body are required"
+    unknown = sorted(k for k in row if k not in _REPORT_COLS)
+    if unknown:
+        return f"Unknown fields: {', '.join(unknown)}"
+    return None
+
+def _insert_batch(cur, batch):
+    """
+    Inserts (index, row) pairs. Rows are grouped by the columns they actually
+    carry so a missing field still gets the column default instead of NULL.
+    Returns {index: id}.
+    """
+    groups = {}
+    for index, row in batch:
+        cols = tuple(c for c in _BULK_COLS if c in row)
+        groups.setdefault(cols, []).append((index, row))
+
+    ids = {}
+    for cols, members in groups.items():
+        sql = f"INSERT INTO tip_reports (created_on, {', '.join(cols)}) VALUES %s RETURNING id"
+        template = "(NOW(), " + ", ".join(["%s"] * len(cols)) + ")"
+        values = [tuple(row[c] for c in cols) for _, row in members]
+        returned = execute_values(cur, sql, values, template=template, page_size=len(values), fetch=True)
+        for (index, _), (new_id,) in zip(members, returned):
+            ids[index] = str(new_id)
+    return ids
+
+def bulk_create_reports(cur, conn, event):
+    try:
+        parsed = _parse_bulk_body(event)
+    except (ValueError, UnicodeDecodeError) as e:
+        return _json(400, {"message": f"Body must be a JSON array or NDJSON: {e}"})
+    if not parsed:
+        return _json(400, {"message": "No reports in request body"})
+    if len(parsed) > BULK_MAX_ROWS:
+        return _json(413, {"message": f"At most {BULK_MAX_ROWS} reports per request"})
+
+    results = [None] * len(parsed)
+    valid = []
+    for index, (row, error) in enumerate(parsed):
+        error = error or _validate_bulk_row(row)
+        if error:
+            results[index] = {"index": index, "error": error}
+        else:
+            valid.append((index, row))
+
+    for start in range(0, len(valid), BULK_BATCH_SIZE):
+        batch = valid[start:start + BULK_BATCH_SIZE]
+        try:
+            ids = _insert_batch(cur, batch)
+            conn.commit()
+        except psycopg2.OperationalError:
+            raise
+        except psycopg2.Error:
+            # One bad row fails the whole statement, so redo this batch row by row
+            # under savepoints to find it and still load the rest.
+            conn.rollback()
+            ids = {}
+            for index, row in batch:
+                cur.execute("SAVEPOINT bulk_row;")
+                try:
+                    ids.update(_insert_batch(cur, [(index, row)]))
+                    cur.execute("RELEASE SAVEPOINT bulk_row;")
+                except psycopg2.Error as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT bulk_row;")
+                    results[index] = {"index": index, "error": (e.pgerror or str(e)).strip()}
+            conn.commit()
+        for index, new_id in ids.items():
+            results[index] = {"index": index, "id": new_id}
+
+    inserted = sum(1 for r in results if "id" in r)
+    return _json(200 if inserted else 400, {
+        "inserted": inserted,
+        "failed": len(results) - inserted,
+        "results": results
+    })
+
 def update_report(cur, conn, report_id: str, event):
     data = parse_body(event)
     updates, params = [], []
@@ -159,37 +738,78 @@ def lambda_handler(event, context):
     if event.get("httpMethod") == "OPTIONS":
         return with_cors(None)
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor() # Using a standard cursor to match original logic
-
-        http_method = event.get("httpMethod")
-        path_params = event.get("pathParameters") or {}
-        report_id = path_params.get("id")
-
-        if report_id and not _is_uuid(report_id):
-            return with_cors(_json(400, {"message": "Report ID must be a valid UUID"}))
-
-        response = None
-        if http_method == "GET":
-            response = get_report_by_id(cur, report_id) if report_id else get_all_reports(cur, event)
-        elif http_method == "POST":
-            response = create_report(cur, conn, event)
-        elif http_method == "PUT":
-            response = _json(400, {"message": "Missing report ID for update"}) if not report_id else update_report(cur, conn, report_id, event)
-        elif http_method == "DELETE":
-            response = _json(400, {"message": "Missing report ID for delete"}) if not report_id else delete_report(cur, conn, report_id)
-        else:
-            response = _json(405, {"message": "Method Not Allowed"})
+        with db_connection() as conn:
+            cur = conn.cursor() # Using a standard cursor to match original logic
+
+            http_method = event.get("httpMethod")
+            path_params = event.get("pathParameters") or {}
+            report_id = path_params.get("id")
+            path = (event.get("path") or event.get("resource") or "").rstrip("/")
+
+            if http_method == "GET" and path.endswith("/export"):
+                return with_cors(export_reports(conn, event))
+
+            if http_method == "GET" and path.endswith("/facets"):
+                return with_cors(get_report_facets(cur, event))
+            if http_method == "GET" and path.endswith("/rollup"):
+                return with_cors(get_report_rollup(cur, event))
+            if http_method == "POST" and path.endswith("/bulk"):
+                return with_cors(bulk_create_reports(cur, conn, event))
+
+            if report_id and not _is_uuid(report_id):
+                return with_cors(_json(400, {"message": "Report ID must be a valid UUID"}))
+
+            response = None
+            if http_method == "GET":
+                response = get_report_by_id(cur, report_id) if report_id else get_all_reports(cur, event)
+            elif http_method == "POST":
+                response = create_report(cur, conn, event)
+            elif http_method == "PUT":
+                response = _json(400, {"message": "Missing report ID for update"}) if not report_id else update_report(cur, conn, report_id, event)
+            elif http_method == "DELETE":
+                response = _json(400, {"message": "Missing report ID for delete"}) if not report_id else delete_report(cur, conn, report_id)
+            else:
+                response = _json(405, {"message": "Method Not Allowed"})
         
-        return with_cors(response)
+            return with_cors(response)
 
     except psycopg2.Error as e:
-        if conn: conn.rollback()
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Database error: {str(e)}"})})
     except Exception as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Server error: {str(e)}"})})
-    finally:
-        if conn:
-            conn.close()
+
+def stream_export(event):
+    """
+    Streams GET /reports/export as a chunked response straight off the database
+    cursor, with no size cap, when served through common.streaming. Anything else,
+    and exports to object storage, go through lambda_handler unchanged.
+    """
+    qp = event["queryStringParameters"]
+    if event["httpMethod"] != "GET" or not event["path"].rstrip("/").endswith("/export"):
+        return None
+    try:
+        fmt, dest, gzipped = _export_options(qp)
+        _build_filters(qp)
+        _select_fields(qp, "created_on")
+    except ValueError as e:
+        return _json(400, {"message": str(e)})
+    if dest == "s3":
+        return None
+
+    def chunks():
+        with db_connection() as conn:
+            compressor = zlib.compressobj(wbits=31) if gzipped else None
+            for chunk in iter_export(conn, qp, fmt):
+                yield compressor.compress(chunk) if compressor else chunk
+            if compressor:
+                yield compressor.flush()
+
+    headers = {"Content-Type": _EXPORT_FORMATS[fmt], "Content-Disposition": f'attachment; filename="reports.{fmt}"'}
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return headers, chunks()
+
+if __name__ == "__main__":
+    from common.streaming import serve
+    serve(lambda_handler, stream_export, "Reports")
@@ -5,8 +5,8 @@ import psycopg2
 from psycopg2.extras import execute_values, RealDictCursor
 
 # --- Common Lambda Layer ---
-from common.db import get_db_connection
-from common.utils import with_cors, parse_body
+from common.db import db_connection
+from common.utils import with_cors, parse_body, versioned_response
 
 def _json(status, payload):
     return {"statusCode": status, "body": json.dumps(payload, default=str)}
@@ -15,18 +15,19 @@ def _json(status, payload):
 # 1. GET: Fetch Requirements (Grouped for Dropdowns)
 # ---------------------------------------------------------
 def get_requirements(cur, event):
-    sql = """
-        SELECT 
-            category_name,
-            category_id as category_code,
-            json_agg(requirement_id ORDER BY requirement_id) as requirements
-        FROM requirements
-        GROUP BY category_name, category_id
-        ORDER BY category_name;
-    """
-    cur.execute(sql)
-    rows = cur.fetchall()
-    return _json(200, rows)
+    def load():
+        sql = """
+            SELECT 
+                category_name,
+                category_id as category_code,
+                json_agg(requirement_id ORDER BY requirement_id) as requirements
+            FROM requirements
+            GROUP BY category_name, category_id
+            ORDER BY category_name;
+        """
+        cur.execute(sql)
+        return cur.fetchall()
+    return versioned_response(cur, event, "requirements", load)
 
 # ---------------------------------------------------------
 # 2. POST Logic: Dispatcher
@@ -118,48 +119,44 @@ def lambda_handler(event, context):
     if event.get("httpMethod") == "OPTIONS":
         return with_cors(None)
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        http_method = event.get("httpMethod")
-        path_params = event.get("pathParameters") or {}
-        req_id = path_params.get("id")
+            http_method = event.get("httpMethod")
+            path_params = event.get("pathParameters") or {}
+            req_id = path_params.get("id")
 
-        response = None
+            response = None
 
-        if http_method == "GET":
-            response = get_requirements(cur, event)
+            if http_method == "GET":
+                response = get_requirements(cur, event)
             
-        elif http_method == "POST":
-            response = handle_post(cur, conn, event)
-
-        elif http_method == "DELETE":
-            if req_id:
-                # Delete Single Requirement
-                cur.execute("DELETE FROM requirements WHERE requirement_id = %s", (req_id,))
-                if cur.rowcount == 0:
-                    response = _json(404, {"message": "Requirement not found"})
+            elif http_method == "POST":
+                response = handle_post(cur, conn, event)
+
+            elif http_method == "DELETE":
+                if req_id:
+                    # Delete Single Requirement
+                    cur.execute("DELETE FROM requirements WHERE requirement_id = %s", (req_id,))
+                    if cur.rowcount == 0:
+                        response = _json(404, {"message": "Requirement not found"})
+                    else:
+                        conn.commit()
+                        response = _json(200, {"message": "Deleted"})
                 else:
+                    # === NEW: Clear All Logic ===
+                    cur.execute("TRUNCATE TABLE requirements;")
                     conn.commit()
-                    response = _json(200, {"message": "Deleted"})
-            else:
-                # === NEW: Clear All Logic ===
-                cur.execute("TRUNCATE TABLE requirements;")
-                conn.commit()
-                response = _json(200, {"message": "All requirements cleared"})
+                    response = _json(200, {"message": "All requirements cleared"})
 
-        else:
-            response = _json(405, {"message": "Method Not Allowed"})
+            else:
+                response = _json(405, {"message": "Method Not Allowed"})
 
-        # This return statement must be aligned exactly with the if/else block above
-        return with_cors(response)
+            # This return statement must be aligned exactly with the if/else block above
+            return with_cors(response)
 
     except psycopg2.Error as e:
-        if conn: conn.rollback()
         return with_cors(_json(500, {"message": f"Database error: {str(e)}"}))
     except Exception as e:
         return with_cors(_json(500, {"message": f"Server error: {str(e)}"}))
-    finally:
-        if conn: conn.close()
\ No newline at end of file
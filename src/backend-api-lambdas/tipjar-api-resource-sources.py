@@ -5,7 +5,7 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 
 # --- Common Lambda Layer ---
-from common.db import get_db_connection
+from common.db import db_connection
 from common.utils import with_cors, parse_body
 
 def get_sources(cur, event):
@@ -115,41 +115,36 @@ def lambda_handler(event, context):
     if event.get("httpMethod") == "OPTIONS":
         return with_cors(None)
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        http_method = event.get("httpMethod")
-        path_params = event.get("pathParameters") or {}
-        source_id_str = path_params.get("id")
-
-        source_id = None
-        if source_id_str:
-            try:
-                source_id = int(source_id_str)
-            except ValueError:
-                return with_cors({'statusCode': 400, 'body': json.dumps({"message": "Source ID must be an integer"})})
-
-        response = None
-        if http_method == "GET":
-            response = get_source_by_id(cur, source_id) if source_id is not None else get_sources(cur, event)
-        elif http_method == "POST":
-            response = create_source(cur, conn, event)
-        elif http_method == "PUT":
-            response = {"statusCode": 400, "body": json.dumps({"message": "Missing source ID for update"})} if source_id is None else update_source(cur, conn, source_id, event)
-        elif http_method == "DELETE":
-            response = {"statusCode": 400, "body": json.dumps({"message": "Missing source ID for delete"})} if source_id is None else delete_source(cur, conn, source_id)
-        else:
-            response = {"statusCode": 405, "body": json.dumps({"message": "Method Not Allowed"})}
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            http_method = event.get("httpMethod")
+            path_params = event.get("pathParameters") or {}
+            source_id_str = path_params.get("id")
+
+            source_id = None
+            if source_id_str:
+                try:
+                    source_id = int(source_id_str)
+                except ValueError:
+                    return with_cors({'statusCode': 400, 'body': json.dumps({"message": "Source ID must be an integer"})})
+
+            response = None
+            if http_method == "GET":
+                response = get_source_by_id(cur, source_id) if source_id is not None else get_sources(cur, event)
+            elif http_method == "POST":
+                response = create_source(cur, conn, event)
+            elif http_method == "PUT":
+                response = {"statusCode": 400, "body": json.dumps({"message": "Missing source ID for update"})} if source_id is None else update_source(cur, conn, source_id, event)
+            elif http_method == "DELETE":
+                response = {"statusCode": 400, "body": json.dumps({"message": "Missing source ID for delete"})} if source_id is None else delete_source(cur, conn, source_id)
+            else:
+                response = {"statusCode": 405, "body": json.dumps({"message": "Method Not Allowed"})}
         
-        return with_cors(response)
+            return with_cors(response)
 
     except psycopg2.Error as e:
-        if conn: conn.rollback()
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Database error: {str(e)}"})})
     except Exception as e:
         return with_cors({"statusCode": 500, "body": json.dumps({"message": f"Server error: {str(e)}"})})
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
@@ -1,11 +1,27 @@
 # website.url/translate
 
+import hashlib
 import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 from botocore.exceptions import ClientError
 
 # --- Common Lambda Layer ---
-from common.utils import with_cors
+from common.db import db_connection
+from common.utils import with_cors, parse_body
+
+# --- Batch / Translation Memory Config (table: translation_memory, see sql/006) ---
+TRANSLATE_CONCURRENCY = int(os.environ.get("TRANSLATE_CONCURRENCY", 4))
+TRANSLATE_BATCH_MAX_SEGMENTS = int(os.environ.get("TRANSLATE_BATCH_MAX_SEGMENTS", 200))
+TRANSLATION_MEMORY_MAX_ROWS = int(os.environ.get("TRANSLATION_MEMORY_MAX_ROWS", 50000))
+
+# --- Long Document Config ---
+# TranslateText takes at most 10,000 bytes of UTF-8 per call; chunks stay under this.
+TRANSLATE_CHUNK_BYTES = int(os.environ.get("TRANSLATE_CHUNK_BYTES", 9000))
+TRANSLATE_DOCUMENT_MAX_CHARS = int(os.environ.get("TRANSLATE_DOCUMENT_MAX_CHARS", 200000))
 
 # --- Service Client ---
 # Initialize the client outside the handler for reuse
@@ -74,6 +90,274 @@ def handle_translation(event):
         # --- FIX 1 WAS HERE ---
         return {"statusCode": 500, "body": json.dumps({"message": f"Server error: {str(e)}"})}
 
+# --- Batch Translation (POST /translate/batch) ---
+
+def _segment_hash(text):
+    """Translation memory key for a segment. NFC so visually identical text from different sources matches."""
+    return hashlib.sha256(unicodedata.normalize("NFC", text).encode("utf-8")).hexdigest()
+
+def _client_error_message(e, source_language, target_language):
+    """Same wording as handle_translation for the errors callers can fix."""
+    error_code = e.response.get("Error", {}).get("Code")
+    error_message = e.response.get("Error", {}).get("Message")
+    if error_code == "ValidationException":
+        return f"Invalid parameter: {error_message}"
+    if error_code == "UnsupportedLanguagePairException":
+        return f"Language pair not supported: from '{source_language}' to '{target_language}'"
+    return f"Translation service error: {error_message}"
+
+def _translate_segment(text, source_language, target_language):
+    """Returns (translated_text, detected_source, error) for one segment."""
+    try:
+        response = translate_client.translate_text(
+            Text=text,
+            SourceLanguageCode=source_language,
+            TargetLanguageCode=target_language
+        )
+        return response.get("TranslatedText"), response.get("SourceLanguageCode"), None
+    except ClientError as e:
+        return None, None, _client_error_message(e, source_language, target_language)
+    except Exception as e:
+        return None, None, f"Server error: {str(e)}"
+
+def _memory_lookup(source_language, target_language, hashes):
+    """Returns {hash: (translated_text, detected_source)} for known segments. Memory errors never block translation."""
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE translation_memory
+                SET last_hit_on = NOW(), hit_count = hit_count + 1
+                WHERE source_lang = %s AND target_lang = %s AND text_hash = ANY(%s)
+                RETURNING text_hash, translated_text, detected_source;
+            """, (source_language, target_language, list(hashes)))
+            found = {h: (t, d) for h, t, d in cur.fetchall()}
+            conn.commit()
+            return found
+    except Exception as e:
+        print(f"Translation memory lookup failed: {e}")
+        return {}
+
+def _memory_store(source_language, target_language, entries):
+    """Saves (hash, text, translated, detected) rows, then trims the table to its size cap (LRU)."""
+    if not entries:
+        return
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.executemany("""
+                INSERT INTO translation_memory
+                    (source_lang, target_lang, text_hash, source_text, translated_text, detected_source)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (source_lang, target_lang, text_hash) DO UPDATE
+                SET translated_text = EXCLUDED.translated_text, detected_source = EXCLUDED.detected_source,
+                    last_hit_on = NOW();
+            """, [(source_language, target_language, h, text, translated, detected)
+                  for h, text, translated, detected in entries])
+            cur.execute("""
+                DELETE FROM translation_memory
+                WHERE (source_lang, target_lang, text_hash) IN (
+                    SELECT source_lang, target_lang, text_hash FROM translation_memory
+                    ORDER BY last_hit_on DESC OFFSET %s
+                );
+            """, (TRANSLATION_MEMORY_MAX_ROWS,))
+            conn.commit()
+    except Exception as e:
+        print(f"Translation memory store failed: {e}")
+
+def _translate_segments(segments, source_language, target_language):
+    """
+    Translates a list of strings. Repeated segments are translated once, known ones
+    come from the translation memory, and the rest go to AWS Translate
+    TRANSLATE_CONCURRENCY at a time. Returns (results in input order, stats).
+    """
+    # 1. Dedupe by hash, keeping the first occurrence of each text
+    unique = {}
+    for text in segments:
+        if text.strip():
+            unique.setdefault(_segment_hash(text), text)
+
+    # 2. Translation memory
+    known = _memory_lookup(source_language, target_language, unique.keys()) if unique else {}
+
+    # 3. Everything else goes to Translate with bounded parallelism
+    misses = [(h, text) for h, text in unique.items() if h not in known]
+    translated = {}
+    if misses:
+        with ThreadPoolExecutor(max_workers=max(1, min(TRANSLATE_CONCURRENCY, len(misses)))) as pool:
+            outcomes = pool.map(lambda m: _translate_segment(m[1], source_language, target_language), misses)
+            translated = {h: outcome for (h, _), outcome in zip(misses, outcomes)}
+    _memory_store(source_language, target_language, [
+        (h, text, translated[h][0], translated[h][1]) for h, text in misses if translated[h][2] is None
+    ])
+
+    # 4. Reassemble in request order
+    results = []
+    for text in segments:
+        if not text.strip():
+            results.append({"translatedText": text, "sourceLanguage": None, "cached": False})
+            continue
+        h = _segment_hash(text)
+        if h in known:
+            results.append({"translatedText": known[h][0], "sourceLanguage": known[h][1], "cached": True})
+        elif translated[h][2] is None:
+            results.append({"translatedText": translated[h][0], "sourceLanguage": translated[h][1], "cached": False})
+        else:
+            results.append({"error": translated[h][2]})
+
+    stats = {
+        "segments": len(segments),
+        "unique": len(unique),
+        "memory_hits": len(known),
+        "translated": sum(1 for o in translated.values() if o[2] is None),
+        "failed": sum(1 for o in translated.values() if o[2] is not None),
+    }
+    # Share of non-blank segments that didn't need a Translate call (memory hits plus in-request repeats)
+    non_blank = sum(1 for text in segments if text.strip())
+    stats["hit_rate"] = round(1 - len(misses) / non_blank, 3) if non_blank else 0.0
+    stats["memory_hit_rate"] = round(len(known) / len(unique), 3) if unique else 0.0
+
+    return results, stats
+
+def handle_batch_translation(event):
+    """
+    Handles POST /translate/batch with {"segments": [...], "targetLang": ..., "sourceLang": ...}.
+    Results keep the order of "segments"; a failed segment carries "error" instead.
+    """
+    if not translate_client:
+        return {"statusCode": 500, "body": json.dumps({"message": "Translation service is not available"})}
+
+    data = parse_body(event)
+    segments = data.get("segments")
+    target_language = data.get("targetLang")
+    source_language = data.get("sourceLang") or "auto"
+    if not isinstance(segments, list) or not segments or not target_language:
+        return {"statusCode": 400, "body": json.dumps({
+            "message": "Missing required fields: 'segments' (a non-empty list) and 'targetLang'"
+        })}
+    if len(segments) > TRANSLATE_BATCH_MAX_SEGMENTS:
+        return {"statusCode": 400, "body": json.dumps({
+            "message": f"At most {TRANSLATE_BATCH_MAX_SEGMENTS} segments per request"
+        })}
+
+    segments = ["" if s is None else str(s) for s in segments]
+    results, stats = _translate_segments(segments, source_language, target_language)
+    return {"statusCode": 200, "body": json.dumps({
+        "targetLanguage": target_language,
+        "results": results,
+        "stats": stats
+    })}
+
+# --- Long Documents (POST /translate) ---
+
+_PARAGRAPH_BREAK = re.compile(r"(\n\s*\n)")
+# End of sentence: Latin, CJK and Arabic terminators, then whitespace (kept)
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?\u3002\uff01\uff1f\u061f\u06d4])(\s+)")
+_WORD_BREAK = re.compile(r"(\s+)")
+
+def _nbytes(text):
+    return len(text.encode("utf-8"))
+
+def _split_units(text, limit):
+    """
+    Breaks text into pieces no bigger than `limit` bytes, preferring paragraph
+    breaks, then sentence ends, then spaces. Joining the pieces gives back the text.
+    """
+    if _nbytes(text) <= limit:
+        return [text]
+    for pattern in (_PARAGRAPH_BREAK, _SENTENCE_BREAK, _WORD_BREAK):
+        parts = pattern.split(text)
+        # Keep each separator attached to the piece before it
+        pieces = [parts[i] + (parts[i + 1] if i + 1 < len(parts) else "") for i in range(0, len(parts), 2)]
+        pieces = [piece for piece in pieces if piece]
+        if len(pieces) > 1:
+            return [u for piece in pieces for u in _split_units(piece, limit)]
+    # One unbroken run (e.g. a long URL): cut on character boundaries
+    units, current = [], ""
+    for c in text:
+        if _nbytes(current + c) > limit:
+            units.append(current)
+            current = ""
+        current += c
+    return units + [current]
+
+def split_for_translation(text, limit=None):
+    """
+    Packs the units from _split_units greedily into chunks of at most `limit` bytes.
+    Returns (leading whitespace, chunk text, trailing whitespace) triples so the
+    whitespace between chunks survives translation untouched.
+    """
+    limit = limit or TRANSLATE_CHUNK_BYTES
+    chunks, current = [], ""
+    for unit in _split_units(text, limit):
+        if current and _nbytes(current + unit) > limit:
+            chunks.append(current)
+            current = ""
+        current += unit
+    if current:
+        chunks.append(current)
+
+    triples = []
+    for chunk in chunks:
+        core = chunk.strip()
+        lead = chunk[:len(chunk) - len(chunk.lstrip())]
+        trail = chunk[len(chunk.rstrip()):] if core else ""
+        triples.append((lead, core, trail))
+    return triples
+
+def handle_document_translation(event):
+    """
+    Handles POST /translate with {"text": ..., "targetLang": ..., "sourceLang": ...}
+    for text of any length. Long text is split at paragraph/sentence boundaries into
+    chunks under the per-call byte cap and translated in parallel. With sourceLang
+    "auto" the first chunk is translated alone and its detected language is used
+    for the rest, so the document isn't re-detected piece by piece.
+    Responds like GET /translate, plus chunk count and stats.
+    """
+    if not translate_client:
+        return {"statusCode": 500, "body": json.dumps({"message": "Translation service is not available"})}
+
+    data = parse_body(event)
+    text = data.get("text")
+    target_language = data.get("targetLang")
+    source_language = data.get("sourceLang") or "auto"
+    if not isinstance(text, str) or not text.strip() or not target_language:
+        return {"statusCode": 400, "body": json.dumps({"message": "Missing required fields: 'text' and 'targetLang'"})}
+    if len(text) > TRANSLATE_DOCUMENT_MAX_CHARS:
+        return {"statusCode": 400, "body": json.dumps({
+            "message": f"Text is limited to {TRANSLATE_DOCUMENT_MAX_CHARS} characters"
+        })}
+
+    chunks = [c for c in split_for_translation(text) if c[1]]
+    cores = [core for _, core, _ in chunks]
+    results, stats = [], None
+    if source_language == "auto":
+        results, stats = _translate_segments(cores[:1], "auto", target_language)
+        source_language = results[0].get("sourceLanguage") or "auto"
+        cores = cores[1:]
+    if cores:
+        rest, rest_stats = _translate_segments(cores, source_language, target_language)
+        results += rest
+        stats = rest_stats if stats is None else {
+            k: stats[k] + rest_stats[k] for k in ("segments", "unique", "memory_hits", "translated", "failed")
+        }
+
+    failed = [(i, r["error"]) for i, r in enumerate(results) if "error" in r]
+    if failed:
+        i, error = failed[0]
+        return {"statusCode": 502, "body": json.dumps({
+            "message": f"Chunk {i + 1} of {len(results)} failed: {error}", "failed_chunks": len(failed)
+        })}
+
+    translated = "".join(lead + r["translatedText"] + trail for (lead, _, trail), r in zip(chunks, results))
+    return {"statusCode": 200, "body": json.dumps({
+        "translatedText": translated,
+        "sourceLanguage": source_language,
+        "targetLanguage": target_language,
+        "chunks": len(chunks),
+        "stats": {k: stats[k] for k in ("translated", "memory_hits", "failed")}
+    })}
+
 # --- Lambda Entry Point ---
 
 def lambda_handler(event, context):
@@ -89,8 +373,13 @@ def lambda_handler(event, context):
     try:
         http_method = event.get("httpMethod")
 
+        path = (event.get("path") or event.get("resource") or "").rstrip("/")
         if http_method == "GET":
             response = handle_translation(event)
+        elif http_method == "POST" and path.endswith("/batch"):
+            response = handle_batch_translation(event)
+        elif http_method == "POST":
+            response = handle_document_translation(event)
         else:
             response = {"statusCode": 405, "body": json.dumps({"message": "Method Not Allowed"})}
         
@@ -5,16 +5,16 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 
 # --- Common Lambda Layer ---
-from common.db import get_db_connection
-from common.utils import with_cors, parse_body
+from common.db import db_connection
+from common.utils import with_cors, parse_body, versioned_response
 
-# --- CORRECTED: Returns a Python list in the body ---
-def get_all_users(cur):
+# --- Versioned: body is already serialized, see common.utils.versioned_response ---
+def get_all_users(cur, event):
     """Fetches all users and returns them as a list of dictionaries."""
-    cur.execute("SELECT * FROM users ORDER BY last_name, first_name;")
-    users = cur.fetchall()
-    # The body is now a Python list, not a JSON string
-    return {'statusCode': 200, 'body': users}
+    def load():
+        cur.execute("SELECT * FROM users ORDER BY last_name, first_name;")
+        return cur.fetchall()
+    return versioned_response(cur, event, "users", load)
 
 # --- CORRECTED: Returns a Python dict in the body ---
 def get_user_by_cin(cur, cin):
@@ -91,36 +91,34 @@ def lambda_handler(event, context):
     if event.get("httpMethod") == "OPTIONS":
         return with_cors(None)
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        http_method = event.get("httpMethod")
-        path_params = event.get("pathParameters") or {}
-        cin = path_params.get("id")
+            http_method = event.get("httpMethod")
+            path_params = event.get("pathParameters") or {}
+            cin = path_params.get("id")
 
-        response = None
-        if http_method == "GET":
-            response = get_user_by_cin(cur, cin) if cin else get_all_users(cur)
-        elif http_method == "POST":
-            response = create_user(cur, conn, event)
-        elif http_method == "PUT":
-            response = {"statusCode": 400, "body": {"message": "Missing user 'cin' for update"}} if not cin else update_user(cur, conn, cin, event)
-        elif http_method == "DELETE":
-            response = {"statusCode": 400, "body": {"message": "Missing user 'cin' for delete"}} if not cin else delete_user(cur, conn, cin)
-        else:
-            response = {"statusCode": 405, "body": {"message": "Method Not Allowed"}}
+            response = None
+            if http_method == "GET":
+                response = get_user_by_cin(cur, cin) if cin else get_all_users(cur, event)
+            elif http_method == "POST":
+                response = create_user(cur, conn, event)
+            elif http_method == "PUT":
+                response = {"statusCode": 400, "body": {"message": "Missing user 'cin' for update"}} if not cin else update_user(cur, conn, cin, event)
+            elif http_method == "DELETE":
+                response = {"statusCode": 400, "body": {"message": "Missing user 'cin' for delete"}} if not cin else delete_user(cur, conn, cin)
+            else:
+                response = {"statusCode": 405, "body": {"message": "Method Not Allowed"}}
         
-        # <<< --- ADD THIS BLOCK TO CENTRALIZE JSON SERIALIZATION --- >>>
-        if response and 'body' in response:
-            response['body'] = json.dumps(response['body'], default=str)
-        # <<< --- END OF NEW BLOCK --- >>>
+            # <<< --- ADD THIS BLOCK TO CENTRALIZE JSON SERIALIZATION --- >>>
+            if response and 'body' in response and not isinstance(response['body'], str):
+                response['body'] = json.dumps(response['body'], default=str)
+            # <<< --- END OF NEW BLOCK --- >>>
         
-        return with_cors(response)
+            return with_cors(response)
 
     except psycopg2.Error as e:
-        if conn: conn.rollback()
         # Ensure error messages are also properly formatted
         error_response = {"statusCode": 500, "body": json.dumps({"message": f"Database error: {str(e)}"}) }
         return with_cors(error_response)
@@ -128,6 +126,3 @@ def lambda_handler(event, context):
         # Ensure error messages are also properly formatted
         error_response = {"statusCode": 500, "body": json.dumps({"message": f"Server error: {str(e)}"}) }
         return with_cors(error_response)
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
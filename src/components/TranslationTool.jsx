@@ -130,19 +130,20 @@ export default function TranslationTool() {
         throw new Error("API URL or Key is missing from environment variables.");
       }
       
-      const params = new URLSearchParams({
-        text: inputText,
-        targetLang: targetLang,
-        sourceLang: sourceLang //
-      });
-
-      const endpoint = `${String(API_URL).replace(/\/+$/, "")}/translate?${params.toString()}`;
+      // POST so long articles aren't cut off by URL limits; the Lambda chunks them
+      const endpoint = `${String(API_URL).replace(/\/+$/, "")}/translate`;
 
       const res = await fetch(endpoint, {
-        method: 'GET', //
+        method: 'POST',
         headers: {
-          'x-api-key': API_KEY
-        }
+          'x-api-key': API_KEY,
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+          text: inputText,
+          targetLang: targetLang,
+          sourceLang: sourceLang
+        })
       });
 
       if (!res.ok) {
@@ -138,6 +138,20 @@ export default function IntsumBuilder({ initialReports }) {
 
   const toApiDate = (dateObj) => dateObj.toISOString().split("T")[0];
 
+  // /reports/rollup answers at most 92 days per request, so longer ranges are fetched in windows
+  const ROLLUP_MAX_DAYS = 92;
+  const rollupWindows = (startObj, endObj) => {
+    const windows = [];
+    const cursor = new Date(Date.UTC(startObj.getUTCFullYear(), startObj.getUTCMonth(), startObj.getUTCDate()));
+    while (cursor <= endObj) {
+      const windowEnd = new Date(cursor);
+      windowEnd.setUTCDate(windowEnd.getUTCDate() + ROLLUP_MAX_DAYS - 1);
+      windows.push([toApiDate(cursor), toApiDate(windowEnd < endObj ? windowEnd : endObj)]);
+      cursor.setUTCDate(cursor.getUTCDate() + ROLLUP_MAX_DAYS);
+    }
+    return windows;
+  };
+
   // Fetch Logic
   const handleFetch = async (startObj, endObj, label) => {
     setLoading(true);
@@ -151,16 +165,18 @@ export default function IntsumBuilder({ initialReports }) {
     setReportType("INTSUM");
 
     try {
-      const apiFrom = toApiDate(startObj);
-      const apiTo = toApiDate(endObj);
-      const url = `${API_URL}/reports?created_from=${apiFrom}&created_to=${apiTo}&limit=500`;
-
-      const res = await fetch(url, {
-        headers: { "x-api-key": API_KEY, "Content-Type": "application/json" },
-      });
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      const data = await res.json();
-      const rawRows = data.results || [];
+      // Day-level roll-up by date of information; the DTG filter below trims it to the exact window.
+      // Reports with an unparseable date of information come back matched on their creation date.
+      const rawRows = [];
+      for (const [apiFrom, apiTo] of rollupWindows(startObj, endObj)) {
+        const url = `${API_URL}/reports/rollup?from=${apiFrom}&to=${apiTo}&include=reports`;
+        const res = await fetch(url, {
+          headers: { "x-api-key": API_KEY, "Content-Type": "application/json" },
+        });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const data = await res.json();
+        rawRows.push(...(data.results || []));
+      }
 
       const validReports = rawRows.filter(r => {
         const dtgDate = parseDtgFromTitle(r.title);
@@ -1,6 +1,6 @@
 // src/pages/ReportSearch.jsx
 
-import { useState, useMemo, useEffect } from "react";
+import { useState, useMemo, useEffect, useRef } from "react";
 import { usePlatforms } from "../components/hooks/usePlatforms.js";
 
 export default function ReportSearch({ 
@@ -29,6 +29,9 @@ export default function ReportSearch({
   const [page, setPage] = useState(1);
   const [limit] = useState(25);
   const [total, setTotal] = useState(0); 
+  // AI search pages past the first are fetched with the signed token the previous page returned
+  const [hasMore, setHasMore] = useState(false);
+  const pageTokens = useRef({});
 
   const BASE = useMemo(() => (import.meta.env.VITE_API_URL || "").replace(/\/+$/, ""), []);
   const API_KEY = import.meta.env.VITE_API_KEY;
@@ -48,6 +51,8 @@ export default function ReportSearch({
     e.preventDefault();
     setPage(1); 
     setTotal(0);
+    setHasMore(false);
+    pageTokens.current = {};
     setInterpretedQuery(null);
     if (searchMode === "params") {
         setActiveQuery({ mode: "params", ...params });
@@ -68,6 +73,8 @@ export default function ReportSearch({
     setInterpretedQuery(null);
     setPage(1);
     setTotal(0);
+    setHasMore(false);
+    pageTokens.current = {};
   }
 
   useEffect(() => {
@@ -96,10 +103,13 @@ export default function ReportSearch({
                 headers: { "Content-Type": "application/json", "x-api-key": API_KEY },
             });
         } else {
+            const token = pageTokens.current[page];
             res = await fetch(`${BASE}/aisearch`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json", "x-api-key": API_KEY },
-                body: JSON.stringify({ query: activeQuery.prompt, limit: limit, offset: offset })
+                body: JSON.stringify(token
+                    ? { continuation_token: token, limit: limit }
+                    : { query: activeQuery.prompt, limit: limit, offset: offset })
             });
         }
 
@@ -109,7 +119,10 @@ export default function ReportSearch({
         if (cancel) return;
 
         setResults(Array.isArray(data.results) ? data.results : []);
-        setTotal(data.total || 0);
+        // AI search only knows the total once the last page has been read
+        setTotal(data.total ?? null);
+        setHasMore(Boolean(data.has_more));
+        if (data.next_token) pageTokens.current[page + 1] = data.next_token;
         if (data.query_interpreted) setInterpretedQuery(data.query_interpreted);
 
       } catch (e) {
@@ -125,7 +138,7 @@ export default function ReportSearch({
   const offset = (page - 1) * limit;
   const startItem = results.length > 0 ? offset + 1 : 0;
   const endItem = offset + results.length;
-  const hasNextPage = results.length === limit;
+  const hasNextPage = activeQuery?.mode === "ai" ? hasMore : results.length === limit;
 
   const getReportId = (r) => r.id ?? r.report_id ?? r._id;
   const allVisibleSelected = results.length > 0 && results.every(r => selectedMap.has(getReportId(r)));
@@ -350,7 +363,7 @@ function Input({ label, name, type = "text", value, onChange, placeholder = "" }
 }
 
 function PaginationHeader({ start, end, total, page, hasNextPage, onPageChange, loading }) {
-    if (start === 0 && total === 0) return null;
+    if (start === 0 && !total) return null;
     const showingText = total > 0 ? `Showing ${start} - ${end} of ${total}` : `Showing ${start} - ${end}`;
     return (
         <div className="flex justify-between items-center text-sm text-slate-400">